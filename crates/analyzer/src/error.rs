@@ -28,9 +28,18 @@ pub enum Error {
     #[error("{0}")]
     AnalyzerError(String),
 
+    #[error("Cancelled")]
+    Cancelled,
+
     #[error("Failed to read {0} database")]
     UserGroupLookupFailure(String),
 
+    #[error("Failed to decompress {0}")]
+    DecompressFailure(String),
+
+    #[error("{0} is required to decompress {1}")]
+    DecompressorMissing(String, String),
+
     #[error("Failed to parse getent output")]
     UserGroupDatabaseParseFailure(#[from] FromUtf8Error),
 }
@@ -0,0 +1,324 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::{HashMap, HashSet};
+
+use crate::events::db::{Seen, Window, DB};
+use crate::events::event::{decision_code, perm_code, Record};
+
+/// Field of a record that events can be grouped or counted by
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Field {
+    Uid,
+    Gid,
+    Subject,
+    Object,
+    RuleId,
+    Perm,
+    Decision,
+    Host,
+    /// time bucketed into spans of the given seconds
+    Time(i64),
+}
+
+/// Value of a field; paths are interned ids and perms and decisions are numeric codes
+#[derive(Clone, Copy, Debug, PartialEq, Eq, Hash, PartialOrd, Ord)]
+pub enum Value {
+    Int(i32),
+    Path(u32),
+    Code(u8),
+    /// id of a host in the db
+    Host(u16),
+    /// start of the time bucket, None for events without a timestamp
+    Time(Option<i64>),
+}
+
+impl Field {
+    fn value(&self, r: &Record, gid: i32) -> Value {
+        match self {
+            Field::Uid => Value::Int(r.uid),
+            Field::Gid => Value::Int(gid),
+            Field::Subject => Value::Path(r.subj),
+            Field::Object => Value::Path(r.obj),
+            Field::RuleId => Value::Int(r.rule_id),
+            Field::Perm => Value::Code(perm_code(&r.perm)),
+            Field::Decision => Value::Code(decision_code(&r.dec)),
+            Field::Host => Value::Host(r.host),
+            Field::Time(span) => {
+                let span = (*span).max(1);
+                Value::Time(r.when.map(|t| t - t.rem_euclid(span)))
+            }
+        }
+    }
+}
+
+/// Aggregates of the events that share a key
+#[derive(Clone, Debug, PartialEq)]
+pub struct Group {
+    /// values of the group by fields, in the order they were given
+    pub key: Vec<Value>,
+    /// number of events, counting every occurrence of a deduplicated event
+    pub count: usize,
+    pub first: Option<i64>,
+    pub last: Option<i64>,
+    /// number of distinct values of each distinct field, in the order they were given
+    pub distinct: Vec<usize>,
+}
+
+#[derive(Default)]
+struct Acc {
+    count: usize,
+    first: Option<i64>,
+    last: Option<i64>,
+    sets: Vec<HashSet<Value>>,
+}
+
+impl Acc {
+    fn add(&mut self, r: &Record, seen: &Seen, distinct: &[Field]) {
+        self.count += seen.count;
+        if let Some(t) = seen.first {
+            self.first = Some(self.first.map_or(t, |f| f.min(t)));
+        }
+        if let Some(t) = seen.last {
+            self.last = Some(self.last.map_or(t, |l| l.max(t)));
+        }
+        if self.sets.is_empty() {
+            self.sets = vec![HashSet::new(); distinct.len()];
+        }
+        for (f, set) in distinct.iter().zip(self.sets.iter_mut()) {
+            match f {
+                Field::Gid => set.extend(r.gid.iter().map(|g| Value::Int(*g))),
+                _ => {
+                    set.insert(f.value(r, 0));
+                }
+            }
+        }
+    }
+}
+
+/// Group the events of the db that fall within the window by the fields, in a single
+/// pass over the store. An event with several gids counts toward each of its gid groups.
+/// Groups are returned sorted by key.
+pub fn group_by(db: &DB, w: &Window, by: &[Field], distinct: &[Field]) -> Vec<Group> {
+    let by_gid = by.contains(&Field::Gid);
+    let mut groups: HashMap<Vec<Value>, Acc> = HashMap::new();
+    for (r, seen) in db.iter_seen_in(w) {
+        let gids: &[i32] = if by_gid { &r.gid } else { &[0] };
+        for (i, gid) in gids.iter().enumerate() {
+            // guard against a gid repeated within one record
+            if gids[..i].contains(gid) {
+                continue;
+            }
+            let key: Vec<Value> = by.iter().map(|f| f.value(r, *gid)).collect();
+            groups.entry(key).or_default().add(r, &seen, distinct);
+        }
+    }
+
+    let mut groups: Vec<Group> = groups
+        .into_iter()
+        .map(|(key, acc)| Group {
+            key,
+            count: acc.count,
+            first: acc.first,
+            last: acc.last,
+            distinct: acc.sets.iter().map(|s| s.len()).collect(),
+        })
+        .collect();
+    groups.sort_by(|a, b| a.key.cmp(&b.key));
+    groups
+}
+
+/// Event counts per time bucket, dense from the first bucket with events to the last
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct Histogram {
+    /// start of the first bucket, None when no event has a timestamp
+    pub start: Option<i64>,
+    /// width of the buckets in seconds
+    pub bucket: i64,
+    /// counts per bucket for each value of the series field in value order,
+    /// a single series without a value when there is no series field
+    pub series: Vec<(Option<Value>, Vec<usize>)>,
+    /// number of events without a timestamp, which fall in no bucket
+    pub untimed: usize,
+}
+
+impl Histogram {
+    /// Get the number of buckets
+    pub fn len(&self) -> usize {
+        self.series.first().map_or(0, |(_, counts)| counts.len())
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+}
+
+/// Count the events of the db that fall within the window into buckets of the given
+/// seconds, with a series per value of the field when one is given. Computed in a
+/// single pass over the time ordered store; a deduplicated event counts all of its
+/// occurrences toward the bucket it was first seen in.
+pub fn histogram(db: &DB, w: &Window, bucket: i64, by: Option<Field>) -> Histogram {
+    let bucket = bucket.max(1);
+    let mut h = Histogram {
+        bucket,
+        ..Histogram::default()
+    };
+    let mut series: HashMap<Option<Value>, Vec<usize>> = HashMap::new();
+    let mut len = 0;
+    for (r, seen) in db.iter_seen_in(w) {
+        let t = match r.when {
+            Some(t) => t,
+            None => {
+                h.untimed += seen.count;
+                continue;
+            }
+        };
+        let b = t - t.rem_euclid(bucket);
+        let i = ((b - *h.start.get_or_insert(b)) / bucket) as usize;
+        len = len.max(i + 1);
+
+        let gids: &[i32] = if by == Some(Field::Gid) { &r.gid } else { &[0] };
+        for (j, gid) in gids.iter().enumerate() {
+            // guard against a gid repeated within one record
+            if gids[..j].contains(gid) {
+                continue;
+            }
+            let counts = series.entry(by.map(|f| f.value(r, *gid))).or_default();
+            if counts.len() <= i {
+                counts.resize(i + 1, 0);
+            }
+            counts[i] += seen.count;
+        }
+    }
+
+    h.series = series
+        .into_iter()
+        .map(|(k, mut counts)| {
+            counts.resize(len, 0);
+            (k, counts)
+        })
+        .collect();
+    h.series.sort_by(|a, b| a.0.cmp(&b.0));
+    h
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::events::event::Event;
+    use chrono::{DateTime, NaiveDateTime, Utc};
+    use fapolicy_rules::Decision::*;
+    use fapolicy_rules::{Decision, Object, Permission, Subject};
+
+    fn event(s: &str, o: &str, dec: Decision, uid: i32, gid: Vec<i32>, t: i64) -> Event {
+        Event {
+            rule_id: 1,
+            dec,
+            perm: Permission::Any,
+            uid,
+            gid,
+            pid: 1,
+            subj: Subject::from_exe(s),
+            obj: Object::from_path(o),
+            when: Some(DateTime::from_utc(NaiveDateTime::from_timestamp(t, 0), Utc)),
+        }
+    }
+
+    fn events() -> Vec<Event> {
+        vec![
+            event("/bin/bash", "/foo", Deny, 1000, vec![1000], 10),
+            event("/bin/bash", "/bar", Deny, 1001, vec![1000, 1001], 20),
+            event("/bin/bash", "/foo", Allow, 1000, vec![1000], 70),
+            event("/bin/ls", "/foo", Deny, 1000, vec![1000, 1000], 130),
+        ]
+    }
+
+    #[test]
+    fn denials_per_subject() {
+        let db = DB::from(events());
+        let gs = group_by(
+            &db,
+            &Window::default(),
+            &[Field::Subject, Field::Decision],
+            &[Field::Uid, Field::Object],
+        );
+        assert_eq!(gs.len(), 3);
+
+        let bash = db.paths().id("/bin/bash").unwrap();
+        let denied = gs
+            .iter()
+            .find(|g| g.key == vec![Value::Path(bash), Value::Code(decision_code(&Deny))])
+            .unwrap();
+        assert_eq!(denied.count, 2);
+        assert_eq!((denied.first, denied.last), (Some(10), Some(20)));
+        assert_eq!(denied.distinct, vec![2, 2]);
+    }
+
+    #[test]
+    fn gid_groups_and_time_buckets() {
+        let db = DB::from(events());
+        let gs = group_by(&db, &Window::default(), &[Field::Gid], &[Field::Gid]);
+        let counts: Vec<(Vec<Value>, usize)> = gs.into_iter().map(|g| (g.key, g.count)).collect();
+        assert_eq!(
+            counts,
+            vec![(vec![Value::Int(1000)], 4), (vec![Value::Int(1001)], 1)]
+        );
+
+        let gs = group_by(&db, &Window::new(Some(15), None), &[Field::Time(60)], &[]);
+        let buckets: Vec<(Vec<Value>, usize)> = gs.into_iter().map(|g| (g.key, g.count)).collect();
+        assert_eq!(
+            buckets,
+            vec![
+                (vec![Value::Time(Some(0))], 1),
+                (vec![Value::Time(Some(60))], 1),
+                (vec![Value::Time(Some(120))], 1)
+            ]
+        );
+    }
+
+    #[test]
+    fn histograms() {
+        let mut es = events();
+        es.push(Event {
+            when: None,
+            ..event("/bin/ls", "/bar", Allow, 1002, vec![1002], 0)
+        });
+        let db = DB::from(es);
+
+        let h = histogram(&db, &Window::default(), 60, None);
+        assert_eq!(h.start, Some(0));
+        assert_eq!(h.series, vec![(None, vec![2, 1, 1])]);
+        assert_eq!((h.len(), h.untimed), (3, 1));
+
+        let h = histogram(&db, &Window::default(), 60, Some(Field::Decision));
+        assert_eq!(
+            h.series,
+            vec![
+                (Some(Value::Code(decision_code(&Allow))), vec![0, 1, 0]),
+                (Some(Value::Code(decision_code(&Deny))), vec![2, 0, 1]),
+            ]
+        );
+
+        let h = histogram(&db, &Window::new(Some(60), None), 60, Some(Field::Uid));
+        assert_eq!(h.start, Some(60));
+        assert_eq!(h.series.len(), 1);
+        assert_eq!(h.series[0].1, vec![1, 1]);
+        assert!(histogram(&DB::default(), &Window::default(), 60, None).is_empty());
+    }
+
+    #[test]
+    fn counts_occurrences() {
+        let mut es = events();
+        es.extend(events());
+        let db = DB::deduplicated(es);
+        let gs = group_by(&db, &Window::default(), &[], &[Field::Subject]);
+        assert_eq!(gs.len(), 1);
+        assert_eq!(gs[0].count, 8);
+        assert_eq!(gs[0].distinct, vec![2]);
+    }
+}
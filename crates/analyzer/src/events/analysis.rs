@@ -6,128 +6,299 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use fapolicy_trust::db::DB as TrustDB;
-use std::collections::hash_map::Entry;
+use fapolicy_trust::db::{Rec, DB as TrustDB};
 use std::collections::HashMap;
+use std::sync::Arc;
 
 use crate::error::Error;
 use crate::error::Error::AnalyzerError;
-use crate::events::db::DB as EventDB;
-use crate::events::event::{Event, Perspective};
-use fapolicy_rules::Decision::*;
+use crate::events::db::{Access, AccessCode, Seen, Window, DB as EventDB};
+use crate::events::event::{Perspective, Record};
+use crate::events::graph::Link;
 use fapolicy_rules::Permission;
 use fapolicy_trust::stat::Status::{Discrepancy, Missing, Trusted};
 
 #[derive(Clone, Debug)]
 pub struct Analysis {
-    pub event: Event,
+    pub event: Record,
     pub subject: SubjAnalysis,
     pub object: ObjAnalysis,
+    /// occurrences of the event, more than one when the db collapses duplicates
+    pub seen: Seen,
 }
 
 #[derive(Clone, Debug)]
 pub struct SubjAnalysis {
-    pub file: String,
-    pub trust: String,
-    pub status: String,
-    pub access: String,
+    pub file: Arc<str>,
+    pub trust: TrustCode,
+    pub status: StatusCode,
+    pub access: AccessCode,
 }
 
 #[derive(Clone, Debug)]
 pub struct ObjAnalysis {
-    pub file: String,
-    pub trust: String,
-    pub status: String,
-    pub access: String,
-    pub perm: String,
+    pub file: Arc<str>,
+    pub trust: TrustCode,
+    pub status: StatusCode,
+    pub access: AccessCode,
+    pub perm: Permission,
+}
+
+/// Trust source code; (S)ystem (T)rust, (A)ncillary (T)rust, or (U)nknown
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum TrustCode {
+    System,
+    Ancillary,
+    Unknown,
+}
+
+impl TrustCode {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            TrustCode::System => "ST",
+            TrustCode::Ancillary => "AT",
+            TrustCode::Unknown => "U",
+        }
+    }
+}
+
+/// Trust status code; (T)rusted, (D)iscrepancy, or (U)nknown
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum StatusCode {
+    Trusted,
+    Discrepancy,
+    Unknown,
+}
+
+impl StatusCode {
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            StatusCode::Trusted => "T",
+            StatusCode::Discrepancy => "D",
+            StatusCode::Unknown => "U",
+        }
+    }
+}
+
+/// Trust source and status of a path
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub struct Verdict {
+    pub trust: TrustCode,
+    pub status: StatusCode,
+}
+
+/// Memo of the trust verdicts of the interned paths of an event db, so that each
+/// distinct path is looked up in the trust db once. A memo is only valid for the
+/// generation of the trust db it was filled from, each change of the trust db being
+/// a new generation.
+#[derive(Clone, Debug, Default)]
+pub struct TrustMemo {
+    generation: u64,
+    verdicts: Vec<Option<Verdict>>,
+}
+
+impl TrustMemo {
+    /// An empty memo for a generation of the trust db
+    pub fn new(generation: u64) -> Self {
+        TrustMemo {
+            generation,
+            verdicts: vec![],
+        }
+    }
+
+    /// Generation of the trust db the verdicts were looked up in
+    pub fn generation(&self) -> u64 {
+        self.generation
+    }
+
+    /// Move the memo to a generation of the trust db, dropping the verdicts of
+    /// any other generation
+    pub fn sync(&mut self, generation: u64) {
+        if self.generation != generation {
+            self.generation = generation;
+            self.verdicts.clear();
+        }
+    }
+
+    /// Get the verdict of an interned path, looking it up on first use
+    pub fn get(&mut self, id: u32, path: &str, trust: &TrustDB) -> Result<Verdict, Error> {
+        let i = id as usize;
+        if let Some(Some(v)) = self.verdicts.get(i) {
+            return Ok(*v);
+        }
+        let v = verdict(path, trust)?;
+        if self.verdicts.len() <= i {
+            self.verdicts.resize(i + 1, None);
+        }
+        self.verdicts[i] = Some(v);
+        Ok(v)
+    }
 }
 
 pub fn analyze(db: &EventDB, from: Perspective, trust: &TrustDB) -> Vec<Analysis> {
-    let fit_events: Vec<Event> = db.events.iter().cloned().filter(|e| from.fit(e)).collect();
-    let mut access_map: HashMap<String, String> = HashMap::new();
-
-    fit_events
-        .iter()
-        .map(|e| {
-            let sp = e.subj.exe().unwrap();
-            let op = e.obj.path().unwrap();
-
-            let ed = match e.dec {
-                Allow | AllowLog | AllowSyslog | AllowAudit => "A".to_string(),
-                Deny | DenyLog | DenySyslog | DenyAudit => "D".to_string(),
-            };
-
-            let sa = match access_map.entry(sp.clone()) {
-                Entry::Occupied(e) => e.get().clone(),
-                Entry::Vacant(e) => {
-                    let sa = match (
-                        any_allows_for_subject(&sp, &fit_events),
-                        any_denials_for_subject(&sp, &fit_events),
-                    ) {
-                        (true, false) => "A".to_string(),
-                        (false, true) => "D".to_string(),
-                        _ => "P".to_string(),
-                    };
-                    e.insert(sa.clone());
-                    sa
-                }
-            };
-
-            Analysis {
-                event: e.clone(),
-                subject: SubjAnalysis {
-                    trust: trust_source(&sp, trust).unwrap(),
-                    status: trust_status(&sp, trust).unwrap(),
-                    access: sa,
-                    file: sp,
-                },
-                object: ObjAnalysis {
-                    trust: trust_source(&op, trust).unwrap(),
-                    status: trust_status(&op, trust).unwrap(),
-                    access: ed,
-                    perm: perm_to_display(&e.perm),
-                    file: op,
-                },
-            }
+    analyze_in(db, from, &Window::default(), trust)
+}
+
+/// Analyze the events that fit the perspective and fall within the time window
+pub fn analyze_in(
+    db: &EventDB,
+    from: Perspective,
+    window: &Window,
+    trust: &TrustDB,
+) -> Vec<Analysis> {
+    let mut memo = TrustMemo::default();
+    fit_in(db, &from, window)
+        .into_iter()
+        .filter_map(|(id, access)| {
+            db.get(id)
+                .map(|r| analyze_record(db, r, db.seen(id), access, trust, &mut memo))
         })
         .collect()
 }
 
-const PERM_SPLIT: usize = "perm=".len();
-fn perm_to_display(p: &Permission) -> String {
-    p.to_string().split_at(PERM_SPLIT).1.to_string()
+/// Get the ids of the records that fit the perspective and fall within the time window,
+/// each with the access of its subject relative to the records that fit
+pub fn fit_in(db: &EventDB, from: &Perspective, window: &Window) -> Vec<(u32, AccessCode)> {
+    let ids = db.find_ids_in(from, window);
+    match from {
+        // subject access over all time is the summary held by the db
+        Perspective::Subject(_) if window.is_open() => {
+            let a = ids
+                .first()
+                .and_then(|id| db.get(*id))
+                .and_then(|r| db.access_of(r.subj))
+                .copied()
+                .unwrap_or_default();
+            ids.into_iter().map(|id| (id, a.code())).collect()
+        }
+        _ => fit_ids(db, ids),
+    }
 }
 
-fn trust_source(path: &str, db: &TrustDB) -> Result<String, Error> {
-    match db.get(path) {
-        Some(r) if r.is_system() => Ok("ST".into()),
-        Some(r) if r.is_ancillary() => Ok("AT".into()),
-        None => Ok("U".into()),
-        _ => Err(AnalyzerError("unexpected trust check state".into())),
+/// Pair each record id with the access of its subject relative to the given records
+pub fn fit_ids(db: &EventDB, ids: Vec<u32>) -> Vec<(u32, AccessCode)> {
+    let mut access_map: HashMap<u32, Access> = HashMap::new();
+    for id in &ids {
+        if let Some(r) = db.get(*id) {
+            access_map
+                .entry(r.subj)
+                .or_default()
+                .add_n(&r.dec, db.seen(*id).count);
+        }
     }
+    ids.into_iter()
+        .filter_map(|id| {
+            let r = db.get(id)?;
+            let a = access_map.get(&r.subj).copied().unwrap_or_default();
+            Some((id, a.code()))
+        })
+        .collect()
+}
+
+/// Analyze records of the db by id, such as those that were just appended,
+/// with subject access taken from the db summary
+pub fn analyze_records(db: &EventDB, ids: &[u32], trust: &TrustDB) -> Vec<Analysis> {
+    let mut memo = TrustMemo::default();
+    ids.iter()
+        .filter_map(|id| db.get(*id).map(|r| (r, db.seen(*id))))
+        .map(|(r, seen)| {
+            let sa = db.access_of(r.subj).copied().unwrap_or_default();
+            analyze_record(db, r, seen, sa.code(), trust, &mut memo)
+        })
+        .collect()
 }
 
-fn trust_status(path: &str, db: &TrustDB) -> Result<String, Error> {
-    match db.get(path) {
-        Some(r) if r.status.as_ref().is_some() => match r.status.as_ref().unwrap() {
-            Trusted(_, _) => Ok("T".into()),
-            Discrepancy(_, _) => Ok("D".into()),
-            Missing(_) => Ok("U".into()),
+fn analyze_record(
+    db: &EventDB,
+    r: &Record,
+    seen: Seen,
+    access: AccessCode,
+    trust: &TrustDB,
+    memo: &mut TrustMemo,
+) -> Analysis {
+    let sp = shared_path(db, r.subj);
+    let op = shared_path(db, r.obj);
+    let sv = memo.get(r.subj, &sp, trust).unwrap();
+    let ov = memo.get(r.obj, &op, trust).unwrap();
+    Analysis {
+        event: r.clone(),
+        subject: SubjAnalysis {
+            trust: sv.trust,
+            status: sv.status,
+            file: sp,
+            access,
         },
-        _ => Ok("U".into()),
+        object: ObjAnalysis {
+            trust: ov.trust,
+            status: ov.status,
+            access: AccessCode::of(&r.dec),
+            perm: r.perm.clone(),
+            file: op,
+        },
+        seen,
     }
 }
 
-fn any_denials_for_subject(p: &str, events: &[Event]) -> bool {
-    events
-        .iter()
-        .filter(|e| matches!( e.subj.exe(), Some(exe) if exe == p))
-        .any(|e| matches!(e.dec, Deny | DenyLog | DenySyslog | DenyAudit))
+fn shared_path(db: &EventDB, id: u32) -> Arc<str> {
+    db.paths()
+        .shared(id)
+        .cloned()
+        .unwrap_or_else(|| Arc::from(""))
+}
+
+/// Analyze a subject given its access rollup
+pub fn analyze_subject(path: Arc<str>, access: &Access, trust: &TrustDB) -> SubjAnalysis {
+    SubjAnalysis {
+        trust: trust_source(&path, trust).unwrap(),
+        status: trust_status(&path, trust),
+        access: access.code(),
+        file: path,
+    }
 }
 
-fn any_allows_for_subject(p: &str, events: &[Event]) -> bool {
-    events
-        .iter()
-        .filter(|e| matches!(e.subj.exe(), Some(exe) if exe == p))
-        .any(|e| matches!(e.dec, Allow | AllowLog | AllowSyslog | AllowAudit))
+/// Analyze an object given its link from a subject
+pub fn analyze_object(path: Arc<str>, link: &Link, trust: &TrustDB) -> ObjAnalysis {
+    ObjAnalysis {
+        trust: trust_source(&path, trust).unwrap(),
+        status: trust_status(&path, trust),
+        access: AccessCode::of(&link.dec),
+        perm: link.perm.clone(),
+        file: path,
+    }
+}
+
+/// Get the trust source code of a path
+pub fn trust_source(path: &str, db: &TrustDB) -> Result<TrustCode, Error> {
+    source_code(db.get(path))
+}
+
+/// Get the trust status code of a path
+pub fn trust_status(path: &str, db: &TrustDB) -> StatusCode {
+    status_code(db.get(path))
+}
+
+/// Get the trust source and status of a path with a single lookup
+pub fn verdict(path: &str, db: &TrustDB) -> Result<Verdict, Error> {
+    let rec = db.get(path);
+    Ok(Verdict {
+        trust: source_code(rec)?,
+        status: status_code(rec),
+    })
+}
+
+fn source_code(rec: Option<&Rec>) -> Result<TrustCode, Error> {
+    match rec {
+        Some(r) if r.is_system() => Ok(TrustCode::System),
+        Some(r) if r.is_ancillary() => Ok(TrustCode::Ancillary),
+        None => Ok(TrustCode::Unknown),
+        _ => Err(AnalyzerError("unexpected trust check state".into())),
+    }
+}
+
+fn status_code(rec: Option<&Rec>) -> StatusCode {
+    match rec.and_then(|r| r.status.as_ref()) {
+        Some(Trusted(_, _)) => StatusCode::Trusted,
+        Some(Discrepancy(_, _)) => StatusCode::Discrepancy,
+        Some(Missing(_)) | None => StatusCode::Unknown,
+    }
 }
@@ -0,0 +1,381 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::{HashMap, VecDeque};
+
+use chrono::{DateTime, NaiveDateTime, Utc};
+use memchr::memchr;
+
+use fapolicy_rules::{Decision, Object, Permission, Subject};
+
+use crate::events::event::Event;
+
+// fanotify responses, the decision is logged to audit by the _audit rules
+const FAN_ALLOW: u32 = 1;
+const FAN_DENY: u32 = 2;
+
+/// Part of an audited decision, the records of one decision share a serial
+#[derive(Clone, Debug, PartialEq)]
+pub enum Part {
+    Fanotify {
+        rule_id: i32,
+        dec: Decision,
+    },
+    Syscall {
+        perm: Permission,
+        uid: i32,
+        gid: i32,
+        pid: i32,
+        exe: String,
+    },
+    Cwd(String),
+    Path(String),
+}
+
+/// Audit record of a decision, with the time in ms and the serial of its event
+#[derive(Clone, Debug, PartialEq)]
+pub struct Record {
+    pub when: i64,
+    pub serial: u64,
+    pub part: Part,
+}
+
+/// Parse the records of a block of whole lines that can be part of a decision
+pub fn parse_records(chunk: &[u8]) -> Vec<Record> {
+    let mut records = vec![];
+    let mut rem = chunk;
+    while !rem.is_empty() {
+        let (line, next) = match memchr(b'\n', rem) {
+            Some(i) => (&rem[..i], &rem[i + 1..]),
+            None => (rem, &rem[rem.len()..]),
+        };
+        rem = next;
+        if let Some(r) = parse_record(line) {
+            records.push(r);
+        }
+    }
+    records
+}
+
+/// Parse a FANOTIFY, SYSCALL, CWD or PATH record, other records are skipped
+pub fn parse_record(line: &[u8]) -> Option<Record> {
+    let line = std::str::from_utf8(line).ok()?;
+    let rest = line.strip_prefix("type=")?;
+    let (kind, rest) = rest.split_at(rest.find(' ')?);
+    let (when, serial) = stamp(rest)?;
+    let part = match kind {
+        "FANOTIFY" => {
+            let dec = match field(rest, "resp")?.parse().ok()? {
+                FAN_ALLOW => Decision::AllowAudit,
+                FAN_DENY => Decision::DenyAudit,
+                _ => return None,
+            };
+            // the rule number is only logged by newer kernels
+            let rule_id = field(rest, "fan_info")
+                .and_then(|v| i32::from_str_radix(v, 16).ok())
+                .unwrap_or(0);
+            Part::Fanotify { rule_id, dec }
+        }
+        "SYSCALL" => Part::Syscall {
+            perm: permission(field(rest, "arch")?, field(rest, "syscall")?.parse().ok()?),
+            uid: field(rest, "uid")?.parse().ok()?,
+            gid: field(rest, "gid")?.parse().ok()?,
+            pid: field(rest, "pid")?.parse().ok()?,
+            exe: untrusted(field(rest, "exe")?)?,
+        },
+        "CWD" => Part::Cwd(untrusted(field(rest, "cwd")?)?),
+        // later items are the parents and interpreters of the path
+        "PATH" if field(rest, "item") == Some("0") => Part::Path(untrusted(field(rest, "name")?)?),
+        _ => return None,
+    };
+    Some(Record { when, serial, part })
+}
+
+/// Parse the msg=audit(secs.ms:serial) stamp
+fn stamp(i: &str) -> Option<(i64, u64)> {
+    let i = &i[i.find("msg=audit(")? + "msg=audit(".len()..];
+    let i = &i[..i.find(')')?];
+    let (t, serial) = i.split_at(i.find(':')?);
+    let (secs, ms) = t.split_at(t.find('.')?);
+    let when = secs.parse::<i64>().ok()? * 1000 + ms[1..].parse::<i64>().ok()?;
+    Some((when, serial[1..].parse().ok()?))
+}
+
+/// Get the value of a key=value field; fields are space separated
+fn field<'a>(i: &'a str, key: &str) -> Option<&'a str> {
+    for (at, _) in i.match_indices(key) {
+        let starts = at == 0 || i.as_bytes()[at - 1] == b' ';
+        let v = &i[at + key.len()..];
+        if starts && v.starts_with('=') {
+            let v = &v[1..];
+            let end = if v.starts_with('"') {
+                v[1..].find('"').map(|e| e + 2)
+            } else {
+                v.find(' ')
+            };
+            return Some(&v[..end.unwrap_or_else(|| v.len())]);
+        }
+    }
+    None
+}
+
+/// Decode a string field that audit logs either quoted or hex encoded
+fn untrusted(v: &str) -> Option<String> {
+    if let Some(v) = v.strip_prefix('"') {
+        return Some(v.strip_suffix('"').unwrap_or(v).to_string());
+    }
+    if v == "(null)" || v.len() % 2 != 0 {
+        return None;
+    }
+    let bytes: Option<Vec<u8>> = (0..v.len())
+        .step_by(2)
+        .map(|i| u8::from_str_radix(&v[i..i + 2], 16).ok())
+        .collect();
+    String::from_utf8(bytes?).ok()
+}
+
+/// Access of the syscall, the exec family is an execute and all others an open
+fn permission(arch: &str, syscall: u32) -> Permission {
+    let exec = match arch {
+        // x86_64
+        "c000003e" => syscall == 59 || syscall == 322,
+        // aarch64
+        "c00000b7" => syscall == 221 || syscall == 281,
+        // i386
+        "40000003" => syscall == 11 || syscall == 358,
+        _ => false,
+    };
+    if exec {
+        Permission::Execute
+    } else {
+        Permission::Open
+    }
+}
+
+#[derive(Default)]
+struct Pending {
+    when: i64,
+    fanotify: Option<(i32, Decision)>,
+    syscall: Option<(Permission, i32, i32, i32, String)>,
+    cwd: Option<String>,
+}
+
+/// Correlates the records of audited decisions by serial. A decision is complete
+/// at its PATH record; the records of a decision can be interleaved with those of
+/// others, so up to window incomplete decisions are kept and the oldest dropped.
+pub struct Correlator {
+    window: usize,
+    pending: HashMap<u64, Pending>,
+    // serials in the order they were first seen, including those of decisions
+    // that completed since, which are skipped when they reach the front
+    order: VecDeque<u64>,
+    dropped: usize,
+}
+
+impl Correlator {
+    pub fn new(window: usize) -> Self {
+        Correlator {
+            window: window.max(1),
+            pending: HashMap::new(),
+            order: VecDeque::new(),
+            dropped: 0,
+        }
+    }
+
+    /// Number of decisions that were dropped before they were complete
+    pub fn dropped(&self) -> usize {
+        self.dropped
+    }
+
+    /// Add a record, returning the event when it completes a decision
+    pub fn add(&mut self, r: Record) -> Option<Event> {
+        if !self.pending.contains_key(&r.serial) {
+            if let Part::Path(_) = r.part {
+                // nothing can be made of a path without its decision
+                return None;
+            }
+            // only incomplete decisions take up the window
+            while self.pending.len() >= self.window {
+                match self.order.pop_front() {
+                    Some(old) => {
+                        if self.pending.remove(&old).is_some() {
+                            self.dropped += 1;
+                        }
+                    }
+                    None => break,
+                }
+            }
+            if self.order.len() > 2 * self.window {
+                let pending = &self.pending;
+                self.order.retain(|s| pending.contains_key(s));
+            }
+            self.order.push_back(r.serial);
+        }
+        let p = self.pending.entry(r.serial).or_default();
+        p.when = r.when;
+        match r.part {
+            Part::Fanotify { rule_id, dec } => p.fanotify = Some((rule_id, dec)),
+            Part::Syscall {
+                perm,
+                uid,
+                gid,
+                pid,
+                exe,
+            } => p.syscall = Some((perm, uid, gid, pid, exe)),
+            Part::Cwd(cwd) => p.cwd = Some(cwd),
+            Part::Path(name) => {
+                let p = self.pending.remove(&r.serial)?;
+                return p.complete(&name);
+            }
+        }
+        None
+    }
+
+    /// Drop the decisions that are still incomplete
+    pub fn finish(&mut self) {
+        self.dropped += self.pending.len();
+        self.pending.clear();
+        self.order.clear();
+    }
+}
+
+impl Pending {
+    fn complete(self, name: &str) -> Option<Event> {
+        let (rule_id, dec) = self.fanotify?;
+        let (perm, uid, gid, pid, exe) = self.syscall?;
+        let path = match (name.starts_with('/'), self.cwd) {
+            (false, Some(cwd)) => format!("{}/{}", cwd.trim_end_matches('/'), name),
+            _ => name.to_string(),
+        };
+        let when = NaiveDateTime::from_timestamp_opt(
+            self.when.div_euclid(1000),
+            (self.when.rem_euclid(1000) * 1_000_000) as u32,
+        )?;
+        Some(Event {
+            rule_id,
+            dec,
+            perm,
+            uid,
+            gid: vec![gid],
+            pid,
+            subj: Subject::from_exe(&exe),
+            obj: Object::from_path(&path),
+            when: Some(DateTime::from_utc(when, Utc)),
+        })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    const FANOTIFY: &str = "type=FANOTIFY msg=audit(1635790373.683:13386): resp=2 fan_type=1 fan_info=11 subj_trust=2 obj_trust=2";
+    const SYSCALL: &str = r#"type=SYSCALL msg=audit(1635790373.683:13386): arch=c000003e syscall=257 success=no exit=-1 ppid=1 pid=1234 auid=1000 uid=1001 gid=1002 euid=0 comm="cat" exe="/usr/bin/cat" key=(null)"#;
+    const CWD: &str = r#"type=CWD msg=audit(1635790373.683:13386): cwd="/root""#;
+    const PATH: &str = "type=PATH msg=audit(1635790373.683:13386): item=0 name=2F746D702F6120622E747874 inode=1 nametype=NORMAL";
+
+    #[test]
+    fn parse_records() {
+        let r = parse_record(FANOTIFY.as_bytes()).unwrap();
+        assert_eq!((r.when, r.serial), (1635790373683, 13386));
+        assert_eq!(
+            r.part,
+            Part::Fanotify {
+                rule_id: 17,
+                dec: Decision::DenyAudit
+            }
+        );
+        match parse_record(SYSCALL.as_bytes()).unwrap().part {
+            Part::Syscall {
+                perm,
+                uid,
+                gid,
+                pid,
+                exe,
+            } => {
+                assert_eq!(perm, Permission::Open);
+                assert_eq!((uid, gid, pid), (1001, 1002, 1234));
+                assert_eq!(exe, "/usr/bin/cat");
+            }
+            p => panic!("unexpected {:?}", p),
+        }
+        // hex encoded names
+        assert_eq!(
+            parse_record(PATH.as_bytes()).unwrap().part,
+            Part::Path("/tmp/a b.txt".to_string())
+        );
+        assert!(
+            parse_record(b"type=PROCTITLE msg=audit(1635790373.683:13386): proctitle=636174")
+                .is_none()
+        );
+    }
+
+    #[test]
+    fn correlate_interleaved() {
+        let other = |l: &str| {
+            l.replace(":13386)", ":13387)").replace(
+                "item=0 name=2F746D702F6120622E747874",
+                "item=0 name=\"hosts\"",
+            )
+        };
+        let lines = vec![
+            FANOTIFY.to_string(),
+            other(FANOTIFY),
+            SYSCALL.to_string(),
+            other(SYSCALL),
+            other(CWD),
+            other(PATH),
+            CWD.to_string(),
+            PATH.to_string(),
+        ];
+        let mut c = Correlator::new(8);
+        let es: Vec<Event> = lines
+            .iter()
+            .filter_map(|l| parse_record(l.as_bytes()))
+            .filter_map(|r| c.add(r))
+            .collect();
+        assert_eq!(es.len(), 2);
+        assert_eq!(es[0].obj.path().unwrap(), "/root/hosts");
+        assert_eq!(es[1].obj.path().unwrap(), "/tmp/a b.txt");
+        assert_eq!((es[1].rule_id, es[1].uid), (17, 1001));
+        assert_eq!(es[1].subj.exe().unwrap(), "/usr/bin/cat");
+
+        // a window of one cannot hold the interleaved decisions
+        let mut c = Correlator::new(1);
+        let n = lines
+            .iter()
+            .filter_map(|l| parse_record(l.as_bytes()))
+            .filter_map(|r| c.add(r))
+            .count();
+        c.finish();
+        assert_eq!(n, 0);
+        assert!(c.dropped() > 0);
+    }
+
+    #[test]
+    fn completed_decisions_leave_the_window() {
+        let serial = |l: &str, s: u64| l.replace(":13386)", &format!(":{})", s));
+        let mut lines = vec![FANOTIFY.to_string()];
+        for s in 1..=10 {
+            lines.extend([FANOTIFY, SYSCALL, CWD, PATH].iter().map(|l| serial(l, s)));
+        }
+        lines.extend([SYSCALL, CWD, PATH].iter().map(|l| l.to_string()));
+
+        // the decision that is still pending outlasts the completed ones
+        let mut c = Correlator::new(2);
+        let es: Vec<Event> = lines
+            .iter()
+            .filter_map(|l| parse_record(l.as_bytes()))
+            .filter_map(|r| c.add(r))
+            .collect();
+        assert_eq!(es.len(), 11);
+        assert_eq!(es[10].obj.path().unwrap(), "/tmp/a b.txt");
+        assert_eq!(c.dropped(), 0);
+        assert!(c.order.len() <= 2 * c.window + 1);
+    }
+}
@@ -0,0 +1,725 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+use std::convert::TryInto;
+use std::fs;
+use std::fs::File;
+use std::io::{Read, Seek, SeekFrom};
+use std::os::unix::fs::MetadataExt;
+use std::path::PathBuf;
+
+use chrono::{DateTime, NaiveDateTime, Utc};
+
+use fapolicy_rules::*;
+use fapolicy_util::sha::sha256_digest;
+
+use crate::error::Error;
+use crate::events::db::Window;
+use crate::events::event::{decision_code, decision_of, perm_code, perm_of, Event};
+use crate::events::read::{Format, Progress, Tail};
+
+const MAGIC: &[u8; 8] = b"FAPEVC\x00\x01";
+// bytes at the head and tail of the parsed prefix that are digested
+const DIGEST_SPAN: u64 = 64 * 1024;
+
+/// Persistent cache of the events parsed from logs, stored under the app data dir.
+/// An entry is keyed by the identity, size and mtime of the log, and by a digest
+/// of the head and tail of the part that was parsed. When the log has grown since
+/// the entry was written only the appended lines are parsed.
+pub struct Cache {
+    dir: PathBuf,
+}
+
+/// What the entry was parsed from
+struct Key {
+    format: Format,
+    dev: u64,
+    ino: u64,
+    size: u64,
+    mtime: i64,
+    head: String,
+    tail: String,
+    // events before this time were skipped, None when the log was read from the start
+    since: Option<i64>,
+}
+
+impl Cache {
+    pub fn new(data_dir: &str) -> Self {
+        Cache {
+            dir: PathBuf::from(data_dir).join("events"),
+        }
+    }
+
+    /// Load the events of a log at or after since, or all of them when since is None.
+    /// Returns the events and a tail positioned at the end of what was read.
+    /// Failing to read or write the cache only costs a full parse.
+    pub fn load(
+        &self,
+        format: Format,
+        path: &str,
+        since: Option<i64>,
+    ) -> Result<(Vec<Event>, Tail), Error> {
+        self.load_with(format, path, since, None)
+    }
+
+    /// Load the events, reporting the parse of the log to the progress when one is given.
+    /// Events that are read from the cache are not counted.
+    pub fn load_with(
+        &self,
+        format: Format,
+        path: &str,
+        since: Option<i64>,
+        progress: Option<&Progress>,
+    ) -> Result<(Vec<Event>, Tail), Error> {
+        let m = fs::metadata(path)?;
+        let w = Window::new(since, None);
+        let entry = self.entry(path, format);
+
+        let (mut events, mut tail, from) = match read_entry(&entry, path, format, &m) {
+            Some((k, es)) if k.since.is_none() || since.map_or(false, |t| Some(t) >= k.since) => {
+                let tail = Tail::resume(format, path, k.dev, k.ino, k.size);
+                (es, tail, k.since)
+            }
+            _ => {
+                let mut tail = Tail::new(format, path);
+                if let Some(t) = since {
+                    tail.seek(t)?;
+                }
+                (vec![], tail, since)
+            }
+        };
+
+        let cached = tail.offset();
+        events.extend(tail.read_with(progress)?);
+        if tail.offset() != cached {
+            let _ = self.store(&entry, path, format, &tail, from, &events);
+        }
+        // debug logs are complete dumps, so a last line without a newline is
+        // returned, but it is neither cached nor consumed until it is complete
+        if format == Format::Debug && tail.offset() < m.len() {
+            events.extend(tail.peek()?);
+        }
+
+        if since.is_some() {
+            events.retain(|e| w.contains(e));
+        }
+        Ok((events, tail))
+    }
+
+    fn entry(&self, path: &str, format: Format) -> PathBuf {
+        let name = format!(
+            "{:016x}-{}.bin",
+            fnv1a(path.as_bytes()),
+            format_code(format)
+        );
+        self.dir.join(name)
+    }
+
+    fn store(
+        &self,
+        entry: &PathBuf,
+        path: &str,
+        format: Format,
+        tail: &Tail,
+        since: Option<i64>,
+        events: &[Event],
+    ) -> Result<(), Error> {
+        let m = fs::metadata(path)?;
+        let (head, tail_digest) = digests(path, tail.offset())?;
+        let key = Key {
+            format,
+            dev: m.dev(),
+            ino: m.ino(),
+            size: tail.offset(),
+            mtime: m.mtime(),
+            head,
+            tail: tail_digest,
+            since,
+        };
+        fs::create_dir_all(&self.dir)?;
+        let tmp = entry.with_extension("tmp");
+        fs::write(&tmp, encode(&key, events))?;
+        fs::rename(&tmp, entry)?;
+        Ok(())
+    }
+}
+
+/// Read a cache entry that is still valid for the log
+fn read_entry(
+    entry: &PathBuf,
+    path: &str,
+    format: Format,
+    m: &fs::Metadata,
+) -> Option<(Key, Vec<Event>)> {
+    let bytes = fs::read(entry).ok()?;
+    let mut d = Decoder::new(&bytes);
+    let key = d.key()?;
+
+    let same_file = key.format == format && (key.dev, key.ino) == (m.dev(), m.ino());
+    // an unchanged size with a new mtime means the log was rewritten in place
+    let unchanged = key.size < m.len() || key.mtime == m.mtime();
+    if !same_file || !unchanged || key.size > m.len() {
+        return None;
+    }
+    if digests(path, key.size).ok()? != (key.head.clone(), key.tail.clone()) {
+        return None;
+    }
+    let events = d.events()?;
+    Some((key, events))
+}
+
+/// Digest the head and tail of the first size bytes of the log
+fn digests(path: &str, size: u64) -> Result<(String, String), Error> {
+    let mut f = File::open(path)?;
+    let head = sha256_digest((&mut f).take(size.min(DIGEST_SPAN)))
+        .map_err(|e| Error::AnalyzerError(e.to_string()))?;
+    f.seek(SeekFrom::Start(size.saturating_sub(DIGEST_SPAN)))?;
+    let tail = sha256_digest(f.take(size.min(DIGEST_SPAN)))
+        .map_err(|e| Error::AnalyzerError(e.to_string()))?;
+    Ok((head, tail))
+}
+
+fn fnv1a(bytes: &[u8]) -> u64 {
+    bytes.iter().fold(0xcbf29ce484222325, |h, b| {
+        (h ^ *b as u64).wrapping_mul(0x100000001b3)
+    })
+}
+
+fn format_code(f: Format) -> &'static str {
+    match f {
+        Format::Debug => "debug",
+        Format::Syslog => "syslog",
+    }
+}
+
+//
+// binary encoding; strings are interned in a table that precedes the events
+//
+
+fn encode(key: &Key, events: &[Event]) -> Vec<u8> {
+    let mut body = Encoder::default();
+    body.u64(events.len() as u64);
+    for e in events {
+        body.event(e);
+    }
+
+    let mut out = Encoder::default();
+    out.buf.extend_from_slice(MAGIC);
+    out.u8(match key.format {
+        Format::Debug => 0,
+        Format::Syslog => 1,
+    });
+    out.u64(key.dev);
+    out.u64(key.ino);
+    out.u64(key.size);
+    out.i64(key.mtime);
+    out.bytes(key.head.as_bytes());
+    out.bytes(key.tail.as_bytes());
+    out.opt_i64(key.since);
+    out.u32(body.table.len() as u32);
+    for s in &body.table {
+        out.bytes(s.as_bytes());
+    }
+    out.buf.extend_from_slice(&body.buf);
+    out.buf
+}
+
+#[derive(Default)]
+struct Encoder {
+    buf: Vec<u8>,
+    ids: HashMap<String, u32>,
+    table: Vec<String>,
+}
+
+impl Encoder {
+    fn u8(&mut self, v: u8) {
+        self.buf.push(v);
+    }
+
+    fn u32(&mut self, v: u32) {
+        self.buf.extend_from_slice(&v.to_le_bytes());
+    }
+
+    fn i32(&mut self, v: i32) {
+        self.buf.extend_from_slice(&v.to_le_bytes());
+    }
+
+    fn u64(&mut self, v: u64) {
+        self.buf.extend_from_slice(&v.to_le_bytes());
+    }
+
+    fn i64(&mut self, v: i64) {
+        self.buf.extend_from_slice(&v.to_le_bytes());
+    }
+
+    fn opt_i64(&mut self, v: Option<i64>) {
+        match v {
+            Some(v) => {
+                self.u8(1);
+                self.i64(v);
+            }
+            None => self.u8(0),
+        }
+    }
+
+    fn bytes(&mut self, b: &[u8]) {
+        self.u32(b.len() as u32);
+        self.buf.extend_from_slice(b);
+    }
+
+    fn str(&mut self, s: &str) {
+        let id = match self.ids.get(s) {
+            Some(id) => *id,
+            None => {
+                let id = self.table.len() as u32;
+                self.ids.insert(s.to_string(), id);
+                self.table.push(s.to_string());
+                id
+            }
+        };
+        self.u32(id);
+    }
+
+    fn event(&mut self, e: &Event) {
+        self.i32(e.rule_id);
+        self.u8(decision_code(&e.dec));
+        self.u8(perm_code(&e.perm));
+        self.i32(e.uid);
+        self.u32(e.gid.len() as u32);
+        for g in &e.gid {
+            self.i32(*g);
+        }
+        self.i32(e.pid);
+        match e.when {
+            Some(t) => {
+                self.u8(1);
+                self.i64(t.timestamp());
+                self.u32(t.timestamp_subsec_nanos());
+            }
+            None => self.u8(0),
+        }
+        self.u32(e.subj.parts.len() as u32);
+        for p in &e.subj.parts {
+            self.subj_part(p);
+        }
+        self.u32(e.obj.parts.len() as u32);
+        for p in &e.obj.parts {
+            self.obj_part(p);
+        }
+    }
+
+    fn subj_part(&mut self, p: &SubjPart) {
+        match p {
+            SubjPart::All => self.u8(0),
+            SubjPart::Comm(s) => {
+                self.u8(1);
+                self.str(s);
+            }
+            SubjPart::Uid(v) => {
+                self.u8(2);
+                self.u32(*v);
+            }
+            SubjPart::Gid(v) => {
+                self.u8(3);
+                self.u32(*v);
+            }
+            SubjPart::Pid(v) => {
+                self.u8(4);
+                self.u32(*v);
+            }
+            SubjPart::Exe(s) => {
+                self.u8(5);
+                self.str(s);
+            }
+            SubjPart::Pattern(s) => {
+                self.u8(6);
+                self.str(s);
+            }
+            SubjPart::Trust(b) => {
+                self.u8(7);
+                self.u8(*b as u8);
+            }
+        }
+    }
+
+    fn obj_part(&mut self, p: &ObjPart) {
+        match p {
+            ObjPart::All => self.u8(0),
+            ObjPart::Device(s) => {
+                self.u8(1);
+                self.str(s);
+            }
+            ObjPart::Dir(d) => {
+                self.u8(2);
+                match d {
+                    DirType::Path(s) => {
+                        self.u8(0);
+                        self.str(s);
+                    }
+                    DirType::ExecDirs => self.u8(1),
+                    DirType::SystemDirs => self.u8(2),
+                    DirType::Untrusted => self.u8(3),
+                }
+            }
+            ObjPart::FileType(r) => {
+                self.u8(3);
+                match r {
+                    Rvalue::Any => self.u8(0),
+                    Rvalue::Literal(s) => {
+                        self.u8(1);
+                        self.str(s);
+                    }
+                    Rvalue::SetRef(set) => {
+                        self.u8(2);
+                        self.str(&set.name);
+                        self.u32(set.values.len() as u32);
+                        for v in &set.values {
+                            self.str(v);
+                        }
+                    }
+                }
+            }
+            ObjPart::Path(s) => {
+                self.u8(4);
+                self.str(s);
+            }
+            ObjPart::Trust(b) => {
+                self.u8(5);
+                self.u8(*b as u8);
+            }
+        }
+    }
+}
+
+/// Decodes an entry, any malformed input yields None
+struct Decoder<'a> {
+    buf: &'a [u8],
+    pos: usize,
+    table: Vec<String>,
+}
+
+impl<'a> Decoder<'a> {
+    fn new(buf: &'a [u8]) -> Self {
+        Decoder {
+            buf,
+            pos: 0,
+            table: vec![],
+        }
+    }
+
+    fn take(&mut self, n: usize) -> Option<&'a [u8]> {
+        let end = self.pos.checked_add(n)?;
+        let b = self.buf.get(self.pos..end)?;
+        self.pos = end;
+        Some(b)
+    }
+
+    fn u8(&mut self) -> Option<u8> {
+        self.take(1).map(|b| b[0])
+    }
+
+    fn u32(&mut self) -> Option<u32> {
+        self.take(4)
+            .map(|b| u32::from_le_bytes(b.try_into().unwrap()))
+    }
+
+    fn i32(&mut self) -> Option<i32> {
+        self.take(4)
+            .map(|b| i32::from_le_bytes(b.try_into().unwrap()))
+    }
+
+    fn u64(&mut self) -> Option<u64> {
+        self.take(8)
+            .map(|b| u64::from_le_bytes(b.try_into().unwrap()))
+    }
+
+    fn i64(&mut self) -> Option<i64> {
+        self.take(8)
+            .map(|b| i64::from_le_bytes(b.try_into().unwrap()))
+    }
+
+    fn opt_i64(&mut self) -> Option<Option<i64>> {
+        match self.u8()? {
+            0 => Some(None),
+            _ => self.i64().map(Some),
+        }
+    }
+
+    fn bytes(&mut self) -> Option<String> {
+        let n = self.u32()? as usize;
+        String::from_utf8(self.take(n)?.to_vec()).ok()
+    }
+
+    fn str(&mut self) -> Option<String> {
+        let id = self.u32()? as usize;
+        self.table.get(id).cloned()
+    }
+
+    fn key(&mut self) -> Option<Key> {
+        if self.take(MAGIC.len())? != MAGIC {
+            return None;
+        }
+        let format = match self.u8()? {
+            0 => Format::Debug,
+            1 => Format::Syslog,
+            _ => return None,
+        };
+        let key = Key {
+            format,
+            dev: self.u64()?,
+            ino: self.u64()?,
+            size: self.u64()?,
+            mtime: self.i64()?,
+            head: self.bytes()?,
+            tail: self.bytes()?,
+            since: self.opt_i64()?,
+        };
+        let n = self.u32()?;
+        for _ in 0..n {
+            let s = self.bytes()?;
+            self.table.push(s);
+        }
+        Some(key)
+    }
+
+    fn events(&mut self) -> Option<Vec<Event>> {
+        let n = self.u64()? as usize;
+        // each event takes at least 30 bytes, guard the allocation against a bad count
+        let mut events = Vec::with_capacity(n.min(self.buf.len() / 30));
+        for _ in 0..n {
+            events.push(self.event()?);
+        }
+        Some(events)
+    }
+
+    fn event(&mut self) -> Option<Event> {
+        let rule_id = self.i32()?;
+        let dec = decision_of(self.u8()?)?;
+        let perm = perm_of(self.u8()?)?;
+        let uid = self.i32()?;
+        let n = self.u32()?;
+        let mut gid = Vec::with_capacity(n.min(64) as usize);
+        for _ in 0..n {
+            gid.push(self.i32()?);
+        }
+        let pid = self.i32()?;
+        let when = match self.u8()? {
+            0 => None,
+            _ => {
+                let secs = self.i64()?;
+                let nanos = self.u32()?;
+                let t = NaiveDateTime::from_timestamp_opt(secs, nanos)?;
+                Some(DateTime::<Utc>::from_utc(t, Utc))
+            }
+        };
+        let mut subj = Subject { parts: vec![] };
+        for _ in 0..self.u32()? {
+            subj.parts.push(self.subj_part()?);
+        }
+        let mut obj = Object { parts: vec![] };
+        for _ in 0..self.u32()? {
+            obj.parts.push(self.obj_part()?);
+        }
+        Some(Event {
+            rule_id,
+            dec,
+            perm,
+            uid,
+            gid,
+            pid,
+            subj,
+            obj,
+            when,
+        })
+    }
+
+    fn subj_part(&mut self) -> Option<SubjPart> {
+        Some(match self.u8()? {
+            0 => SubjPart::All,
+            1 => SubjPart::Comm(self.str()?),
+            2 => SubjPart::Uid(self.u32()?),
+            3 => SubjPart::Gid(self.u32()?),
+            4 => SubjPart::Pid(self.u32()?),
+            5 => SubjPart::Exe(self.str()?),
+            6 => SubjPart::Pattern(self.str()?),
+            7 => SubjPart::Trust(self.u8()? != 0),
+            _ => return None,
+        })
+    }
+
+    fn obj_part(&mut self) -> Option<ObjPart> {
+        Some(match self.u8()? {
+            0 => ObjPart::All,
+            1 => ObjPart::Device(self.str()?),
+            2 => ObjPart::Dir(match self.u8()? {
+                0 => DirType::Path(self.str()?),
+                1 => DirType::ExecDirs,
+                2 => DirType::SystemDirs,
+                3 => DirType::Untrusted,
+                _ => return None,
+            }),
+            3 => ObjPart::FileType(match self.u8()? {
+                0 => Rvalue::Any,
+                1 => Rvalue::Literal(self.str()?),
+                2 => {
+                    let name = self.str()?;
+                    let mut values = vec![];
+                    for _ in 0..self.u32()? {
+                        values.push(self.str()?);
+                    }
+                    Rvalue::SetRef(Set::new(&name, values))
+                }
+                _ => return None,
+            }),
+            4 => ObjPart::Path(self.str()?),
+            5 => ObjPart::Trust(self.u8()? != 0),
+            _ => return None,
+        })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::fs::OpenOptions;
+    use std::io::Write;
+
+    const EVENT: &str = "rule=9 dec=allow perm=execute uid=1003 gid=999,1000 pid=5555 exe=/usr/bin/bash : path=/usr/bin/vi ftype=application/x-executable trust=1";
+
+    fn log(n: usize) -> String {
+        (0..n).map(|_| format!("{}\n", EVENT)).collect()
+    }
+
+    #[test]
+    fn roundtrip() {
+        let e: Event = EVENT.parse().unwrap();
+        let key = Key {
+            format: Format::Debug,
+            dev: 1,
+            ino: 2,
+            size: 3,
+            mtime: 4,
+            head: "h".to_string(),
+            tail: "t".to_string(),
+            since: Some(5),
+        };
+        let bytes = encode(&key, &[e.clone(), e.clone()]);
+        let mut d = Decoder::new(&bytes);
+        let k = d.key().unwrap();
+        assert_eq!(
+            (k.dev, k.ino, k.size, k.mtime, k.since),
+            (1, 2, 3, 4, Some(5))
+        );
+        assert_eq!(d.events().unwrap(), vec![e.clone(), e]);
+
+        // truncated input is a miss rather than a panic
+        let mut d = Decoder::new(&bytes[..bytes.len() - 3]);
+        d.key().unwrap();
+        assert!(d.events().is_none());
+    }
+
+    #[test]
+    fn reuse_and_extend() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("debug.log");
+        let p = path.to_str().unwrap();
+        let cache = Cache::new(dir.path().join("data").to_str().unwrap());
+        fs::write(&path, log(100)).unwrap();
+
+        let (es, _) = cache.load(Format::Debug, p, None).unwrap();
+        assert_eq!(es.len(), 100);
+        let entry = cache.entry(p, Format::Debug);
+        assert!(entry.exists());
+
+        // served from the cache, which is untouched
+        let stamp = fs::metadata(&entry).unwrap().modified().unwrap();
+        let (es, _) = cache.load(Format::Debug, p, None).unwrap();
+        assert_eq!(es.len(), 100);
+        assert_eq!(fs::metadata(&entry).unwrap().modified().unwrap(), stamp);
+
+        // appended lines are parsed on top of the cached prefix
+        let mut f = OpenOptions::new().append(true).open(&path).unwrap();
+        f.write_all(log(10).as_bytes()).unwrap();
+        let (es, tail) = cache.load(Format::Debug, p, None).unwrap();
+        assert_eq!(es.len(), 110);
+        assert_eq!(tail.offset(), fs::metadata(&path).unwrap().len());
+    }
+
+    #[test]
+    fn half_written_line_is_not_cached() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("debug.log");
+        let p = path.to_str().unwrap();
+        let cache = Cache::new(dir.path().join("data").to_str().unwrap());
+        let (head, rest) = EVENT.split_at(EVENT.find("uid=").unwrap() + 6);
+        fs::write(&path, format!("{}{}", log(10), head)).unwrap();
+
+        let (es, tail) = cache.load(Format::Debug, p, None).unwrap();
+        assert_eq!(es.len(), 10);
+        assert_eq!(tail.offset(), log(10).len() as u64);
+
+        // the rest of the line is parsed with its head once it is written
+        let mut f = OpenOptions::new().append(true).open(&path).unwrap();
+        writeln!(f, "{}", rest).unwrap();
+        let (es, tail) = cache.load(Format::Debug, p, None).unwrap();
+        assert_eq!(es.len(), 11);
+        assert_eq!(es[10].uid, 1003);
+        assert_eq!(tail.offset(), fs::metadata(&path).unwrap().len());
+    }
+
+    #[test]
+    fn syslog_since() {
+        let line = |t: usize| {
+            format!(
+                "2022-01-01T00:00:{:02}.000000+00:00 host fapolicyd[1]: {}\n",
+                t, EVENT
+            )
+        };
+        let t0 = 1640995200;
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("messages");
+        let p = path.to_str().unwrap();
+        let cache = Cache::new(dir.path().join("data").to_str().unwrap());
+        fs::write(&path, (0..60).map(line).collect::<String>()).unwrap();
+
+        let (es, _) = cache.load(Format::Syslog, p, Some(t0 + 30)).unwrap();
+        assert_eq!(es.len(), 30);
+        let entry = cache.entry(p, Format::Syslog);
+        let stamp = fs::metadata(&entry).unwrap().modified().unwrap();
+
+        // a later start is served from the entry
+        let (es, _) = cache.load(Format::Syslog, p, Some(t0 + 50)).unwrap();
+        assert_eq!(es.len(), 10);
+        assert_eq!(fs::metadata(&entry).unwrap().modified().unwrap(), stamp);
+
+        // an earlier start was skipped by the entry, so the log is read again
+        let (es, tail) = cache.load(Format::Syslog, p, Some(t0 + 10)).unwrap();
+        assert_eq!(es.len(), 50);
+        assert_eq!(tail.offset(), fs::metadata(&path).unwrap().len());
+    }
+
+    #[test]
+    fn changed_prefix_is_a_miss() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("debug.log");
+        let p = path.to_str().unwrap();
+        let cache = Cache::new(dir.path().join("data").to_str().unwrap());
+        fs::write(&path, log(100)).unwrap();
+        cache.load(Format::Debug, p, None).unwrap();
+
+        // rewrite the head in place and grow the log
+        let mut f = OpenOptions::new().write(true).open(&path).unwrap();
+        f.write_all(b"# ").unwrap();
+        let mut f = OpenOptions::new().append(true).open(&path).unwrap();
+        f.write_all(log(1).as_bytes()).unwrap();
+
+        let (es, _) = cache.load(Format::Debug, p, None).unwrap();
+        assert_eq!(es.len(), 100);
+    }
+}
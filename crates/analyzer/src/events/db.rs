@@ -6,29 +6,878 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use crate::events::event::Event;
-use std::slice::Iter;
+use std::collections::{BTreeMap, HashMap};
+use std::ops::Bound;
+use std::sync::Arc;
 
+use fapolicy_rules::Decision;
+use fapolicy_rules::Decision::*;
+
+use crate::error::Error;
+use crate::events::event::{decision_code, is_under, perm_code, Event, Gids, Perspective, Record};
+use crate::events::intern::Paths;
+
+/// Tally of the decisions that were made for a subject
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct Access {
+    pub allowed: usize,
+    pub denied: usize,
+}
+
+impl Access {
+    pub fn add(&mut self, dec: &Decision) {
+        self.add_n(dec, 1)
+    }
+
+    /// Add n occurrences of a decision
+    pub fn add_n(&mut self, dec: &Decision, n: usize) {
+        match dec {
+            Allow | AllowLog | AllowSyslog | AllowAudit => self.allowed += n,
+            Deny | DenyLog | DenySyslog | DenyAudit => self.denied += n,
+        }
+    }
+
+    pub fn code(&self) -> AccessCode {
+        match (self.allowed > 0, self.denied > 0) {
+            (true, false) => AccessCode::Allowed,
+            (false, true) => AccessCode::Denied,
+            _ => AccessCode::Partial,
+        }
+    }
+}
+
+/// Access code; (A)llowed, (D)enied, or (P)artial
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum AccessCode {
+    Allowed,
+    Denied,
+    Partial,
+}
+
+impl AccessCode {
+    /// Access code of a single decision
+    pub fn of(dec: &Decision) -> Self {
+        match dec {
+            Allow | AllowLog | AllowSyslog | AllowAudit => AccessCode::Allowed,
+            Deny | DenyLog | DenySyslog | DenyAudit => AccessCode::Denied,
+        }
+    }
+
+    pub fn as_str(&self) -> &'static str {
+        match self {
+            AccessCode::Allowed => "A",
+            AccessCode::Denied => "D",
+            AccessCode::Partial => "P",
+        }
+    }
+}
+
+/// Inclusive time window in epoch seconds, an unset bound is open.
+/// Events without a timestamp fall within every window.
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq, Hash)]
+pub struct Window {
+    pub start: Option<i64>,
+    pub stop: Option<i64>,
+}
+
+impl Window {
+    pub fn new(start: Option<i64>, stop: Option<i64>) -> Self {
+        Window { start, stop }
+    }
+
+    pub fn is_open(&self) -> bool {
+        self.start.is_none() && self.stop.is_none()
+    }
+
+    /// Check if the event falls in the window, events without a timestamp always do
+    pub fn contains(&self, e: &Event) -> bool {
+        match e.when.map(|t| t.timestamp()) {
+            Some(t) => self.start.map_or(true, |s| t >= s) && self.stop.map_or(true, |s| t <= s),
+            None => true,
+        }
+    }
+}
+
+/// Occurrences of a distinct event when the db collapses duplicates
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub struct Seen {
+    pub count: usize,
+    pub first: Option<i64>,
+    pub last: Option<i64>,
+}
+
+impl Seen {
+    /// A single occurrence of the record
+    pub fn of(r: &Record) -> Self {
+        Seen::once(r.when)
+    }
+
+    fn once(when: Option<i64>) -> Self {
+        Seen {
+            count: 1,
+            first: when,
+            last: when,
+        }
+    }
+
+    fn add(&mut self, when: Option<i64>) {
+        self.count += 1;
+        if let Some(t) = when {
+            self.first = Some(self.first.map_or(t, |f| f.min(t)));
+            self.last = Some(self.last.map_or(t, |l| l.max(t)));
+        }
+    }
+}
+
+// what makes an event distinct when duplicates are collapsed; the pid is not part of it
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
+struct Key {
+    rule_id: i32,
+    dec: u8,
+    perm: u8,
+    uid: i32,
+    gid: Gids,
+    subj: u32,
+    obj: u32,
+    host: u16,
+}
+
+impl Key {
+    fn of(r: &Record) -> Self {
+        Key {
+            rule_id: r.rule_id,
+            dec: decision_code(&r.dec),
+            perm: perm_code(&r.perm),
+            uid: r.uid,
+            gid: r.gid.clone(),
+            subj: r.subj,
+            obj: r.obj,
+            host: r.host,
+        }
+    }
+}
+
+/// Records and the secondary indexes built over them.
+/// Events are interned into compact records as they are added; a record keeps
+/// its id for the life of the db. The time order of the records, with those
+/// lacking a timestamp first, is held by the order list and every index is a
+/// list of record ids in that same order.
+/// A deduplicating db keeps one record per distinct tuple with its occurrences,
+/// ordered by the time it was first seen.
 #[derive(Default, Clone)]
 pub struct DB {
-    pub(crate) events: Vec<Event>,
+    records: Vec<Record>,
+    paths: Paths,
+    order: Vec<u32>,
+    // number of records that have no timestamp
+    untimed: usize,
+    subjects: HashMap<u32, Vec<u32>>,
+    objects: HashMap<u32, Vec<u32>>,
+    // object paths in sorted order, for lookups by directory
+    object_paths: BTreeMap<Arc<str>, u32>,
+    users: HashMap<i32, Vec<u32>>,
+    groups: HashMap<i32, Vec<u32>>,
+    // a deduplicated record holds the pid of its first occurrence
+    pids: HashMap<i32, Vec<u32>>,
+    // names of the hosts by id, id 0 is the unnamed host
+    hosts: Vec<Arc<str>>,
+    host_ids: HashMap<Arc<str>, u16>,
+    by_host: HashMap<u16, Vec<u32>>,
+    access: HashMap<u32, Access>,
+    // occurrences of each record, only kept when deduplicating
+    seen: Vec<Seen>,
+    keys: Option<HashMap<Key, u32>>,
+    // bumped by every append that changes the records
+    version: u64,
 }
 
 impl DB {
     pub fn from(es: Vec<Event>) -> Self {
-        DB { events: es }
+        let mut db = DB::default();
+        db.append(es);
+        db
+    }
+
+    /// Create a db that collapses duplicate events into one with a count and
+    /// the times it was first and last seen
+    pub fn deduplicated(es: Vec<Event>) -> Self {
+        let mut db = DB {
+            keys: Some(HashMap::new()),
+            ..DB::default()
+        };
+        db.append(es);
+        db
+    }
+
+    pub fn is_deduplicated(&self) -> bool {
+        self.keys.is_some()
+    }
+
+    /// Get the version of the records, which changes with every append of events
+    pub fn version(&self) -> u64 {
+        self.version
+    }
+
+    /// Append events to the db, updating the indexes in place.
+    /// Events that would not land at the end in time order cause a reorder.
+    /// Returns the ids of the records that were added or updated, ascending.
+    pub fn append(&mut self, es: Vec<Event>) -> Vec<u32> {
+        self.append_tagged(es.into_iter().map(|e| (0, e)).collect())
+    }
+
+    /// Get the id of a host by name, adding it when it is new.
+    /// Fails when there are more hosts than a record can refer to.
+    pub fn intern_host(&mut self, name: &str) -> Result<u16, Error> {
+        if let Some(id) = self.host_ids.get(name) {
+            return Ok(*id);
+        }
+        if self.hosts.is_empty() {
+            self.hosts.push(Arc::from(""));
+        }
+        if self.hosts.len() > u16::MAX as usize {
+            return Err(Error::AnalyzerError(format!("too many hosts at {}", name)));
+        }
+        let id = self.hosts.len() as u16;
+        let name: Arc<str> = Arc::from(name);
+        self.hosts.push(name.clone());
+        self.host_ids.insert(name, id);
+        Ok(id)
+    }
+
+    /// Append events tagged with the ids of the hosts they were logged on
+    pub fn append_tagged(&mut self, mut es: Vec<(u16, Event)>) -> Vec<u32> {
+        es.sort_by_key(|(_, e)| e.when);
+        if !es.is_empty() {
+            self.version += 1;
+        }
+        if self.keys.is_some() {
+            return self.append_deduplicated(es);
+        }
+        let in_order = match (self.order.last(), es.first()) {
+            (Some(last), Some((_, first))) => {
+                let t = first.when.map(|t| t.timestamp());
+                t.is_some() && t >= self.records[*last as usize].when
+            }
+            _ => true,
+        };
+
+        let first = self.records.len() as u32;
+        for (host, e) in es {
+            let r = self.intern(host, e);
+            self.records.push(r);
+        }
+        let ids: Vec<u32> = (first..self.records.len() as u32).collect();
+        for id in &ids {
+            self.index(*id);
+        }
+        if !in_order {
+            self.reorder();
+        }
+        ids
+    }
+
+    fn append_deduplicated(&mut self, es: Vec<(u16, Event)>) -> Vec<u32> {
+        let mut reorder = false;
+        let mut ids = Vec::with_capacity(es.len());
+        for (host, e) in es {
+            let r = self.intern(host, e);
+            let keys = self.keys.get_or_insert_with(HashMap::new);
+            let key = Key::of(&r);
+            let id = match keys.get(&key) {
+                Some(id) => {
+                    let id = *id;
+                    self.seen[id as usize].add(r.when);
+                    self.access.entry(r.subj).or_default().add(&r.dec);
+                    // an earlier occurrence moves the record back in time order
+                    let rec = &mut self.records[id as usize];
+                    if r.when.is_some() && (r.when < rec.when || rec.when.is_none()) {
+                        rec.when = r.when;
+                        reorder = true;
+                    }
+                    id
+                }
+                None => {
+                    let id = self.records.len() as u32;
+                    keys.insert(key, id);
+                    reorder |= match self.order.last() {
+                        Some(last) => {
+                            r.when.is_none() || r.when < self.records[*last as usize].when
+                        }
+                        None => false,
+                    };
+                    self.seen.push(Seen::once(r.when));
+                    self.records.push(r);
+                    self.index(id);
+                    id
+                }
+            };
+            ids.push(id);
+        }
+        if reorder {
+            self.reorder();
+        }
+        ids.sort_unstable();
+        ids.dedup();
+        ids
+    }
+
+    fn intern(&mut self, host: u16, e: Event) -> Record {
+        Record {
+            host,
+            subj: self.paths.intern(&e.subj.exe().unwrap_or_default()),
+            obj: self.paths.intern(&e.obj.path().unwrap_or_default()),
+            rule_id: e.rule_id,
+            dec: e.dec,
+            perm: e.perm,
+            uid: e.uid,
+            gid: Gids::from_vec(e.gid),
+            pid: e.pid,
+            when: e.when.map(|t| t.timestamp()),
+        }
+    }
+
+    fn index(&mut self, id: u32) {
+        let r = &self.records[id as usize];
+        let n = self.seen.get(id as usize).map_or(1, |s| s.count);
+        if r.when.is_none() {
+            self.untimed += 1;
+        }
+        self.order.push(id);
+        self.access.entry(r.subj).or_default().add_n(&r.dec, n);
+        self.subjects.entry(r.subj).or_default().push(id);
+        let objects = self.objects.entry(r.obj).or_default();
+        if objects.is_empty() {
+            if let Some(p) = self.paths.shared(r.obj) {
+                self.object_paths.insert(p.clone(), r.obj);
+            }
+        }
+        objects.push(id);
+        self.users.entry(r.uid).or_default().push(id);
+        self.pids.entry(r.pid).or_default().push(id);
+        self.by_host.entry(r.host).or_default().push(id);
+        for gid in &r.gid {
+            let g = self.groups.entry(*gid).or_default();
+            // guard against a gid repeated within one record
+            if g.last() != Some(&id) {
+                g.push(id);
+            }
+        }
+    }
+
+    /// Restore the time order of the id lists, records themselves never move
+    fn reorder(&mut self) {
+        let records = &self.records;
+        let key = |id: &u32| (records[*id as usize].when, *id);
+        self.order.sort_by_key(key);
+        for ids in self
+            .subjects
+            .values_mut()
+            .chain(self.objects.values_mut())
+            .chain(self.users.values_mut())
+            .chain(self.groups.values_mut())
+            .chain(self.pids.values_mut())
+            .chain(self.by_host.values_mut())
+        {
+            ids.sort_by_key(key);
+        }
+        self.untimed = self
+            .order
+            .partition_point(|id| records[*id as usize].when.is_none());
     }
 
     pub fn len(&self) -> usize {
-        self.events.len()
+        self.records.len()
     }
 
     pub fn is_empty(&self) -> bool {
-        self.events.is_empty()
+        self.records.is_empty()
+    }
+
+    /// Get the record with the id
+    pub fn get(&self, id: u32) -> Option<&Record> {
+        self.records.get(id as usize)
+    }
+
+    /// Get the interned paths of the records
+    pub fn paths(&self) -> &Paths {
+        &self.paths
+    }
+
+    /// Get the path of an interned path id
+    pub fn path(&self, id: u32) -> &str {
+        self.paths.get(id).unwrap_or_default()
+    }
+
+    /// Get the occurrences of the record with the id
+    pub fn seen(&self, id: u32) -> Seen {
+        match self.seen.get(id as usize) {
+            Some(s) => *s,
+            None => Seen::of(&self.records[id as usize]),
+        }
+    }
+
+    /// Get an iterator to the records in time order
+    pub fn iter(&self) -> impl Iterator<Item = &Record> {
+        self.order.iter().map(move |id| &self.records[*id as usize])
+    }
+
+    /// Get the ids of a list that fall within the window, the list being in time order.
+    /// Deduplicated records are ordered by when they were first seen, so
+    /// only the stop bound narrows the range for those.
+    fn window<'a>(&'a self, ids: &'a [u32], w: &Window) -> impl Iterator<Item = u32> + 'a {
+        let when = |id: &u32| self.records[*id as usize].when;
+        let untimed = ids.partition_point(|id| when(id).is_none());
+        let timed = &ids[untimed..];
+        let lo = match w.start {
+            Some(t) if self.keys.is_none() => timed.partition_point(|id| when(id) < Some(t)),
+            _ => 0,
+        };
+        let hi = match w.stop {
+            Some(t) => timed.partition_point(|id| when(id) <= Some(t)),
+            None => timed.len(),
+        };
+        let w = *w;
+        ids[..untimed]
+            .iter()
+            .chain(timed[lo..hi.max(lo)].iter())
+            .copied()
+            .filter(move |id| self.seen_since(*id, &w))
+    }
+
+    /// Check that a deduplicated record was last seen at or after the window start
+    fn seen_since(&self, id: u32, w: &Window) -> bool {
+        match (self.seen.get(id as usize), w.start) {
+            (Some(Seen { last: Some(l), .. }), Some(t)) => *l >= t,
+            _ => true,
+        }
+    }
+
+    /// Get an iterator to the records that fall within the window
+    pub fn iter_in(&self, w: &Window) -> impl Iterator<Item = &Record> {
+        self.window(&self.order, w)
+            .map(move |id| &self.records[id as usize])
     }
 
-    /// Get an iterator to the underlying events
-    pub fn iter(&self) -> Iter<'_, Event> {
-        self.events.iter()
+    /// Get an iterator to the records that fall within the window with their occurrences
+    pub fn iter_seen_in(&self, w: &Window) -> impl Iterator<Item = (&Record, Seen)> {
+        self.window(&self.order, w)
+            .map(move |id| (&self.records[id as usize], self.seen(id)))
+    }
+
+    /// Get the ids of the records that fall within the window, in time order
+    pub fn ids_in(&self, w: &Window) -> impl Iterator<Item = u32> + '_ {
+        self.window(&self.order, w)
+    }
+
+    /// Get the distinct subject paths
+    pub fn subjects(&self) -> impl Iterator<Item = &str> {
+        self.subjects.keys().map(move |id| self.path(*id))
+    }
+
+    /// Get the distinct object paths
+    pub fn objects(&self) -> impl Iterator<Item = &str> {
+        self.objects.keys().map(move |id| self.path(*id))
+    }
+
+    /// Get the distinct object paths at or beneath a directory, in path order
+    pub fn objects_in<'a>(&'a self, dir: &'a str) -> impl Iterator<Item = &'a str> + 'a {
+        self.object_ids_in(dir).map(move |id| self.path(id))
+    }
+
+    // the object path ids under the dir, a range scan over the sorted paths
+    fn object_ids_in<'a>(&'a self, dir: &'a str) -> impl Iterator<Item = u32> + 'a {
+        let prefix = dir.trim_end_matches('/');
+        self.object_paths
+            .range::<str, _>((Bound::Included(prefix), Bound::Unbounded))
+            .take_while(move |(p, _)| p.starts_with(prefix))
+            .filter(move |(p, _)| is_under(p, dir))
+            .map(|(_, id)| *id)
+    }
+
+    // the ids of the records on objects under the dir, merged into time order
+    fn objects_under(&self, dir: &str) -> Vec<u32> {
+        let mut ids: Vec<u32> = self
+            .object_ids_in(dir)
+            .flat_map(|obj| self.objects[&obj].iter().copied())
+            .collect();
+        ids.sort_by_key(|id| (self.records[*id as usize].when, *id));
+        ids
+    }
+
+    /// Get the distinct user ids
+    pub fn users(&self) -> impl Iterator<Item = &i32> {
+        self.users.keys()
+    }
+
+    /// Get the distinct group ids
+    pub fn groups(&self) -> impl Iterator<Item = &i32> {
+        self.groups.keys()
+    }
+
+    /// Get the distinct process ids
+    pub fn pids(&self) -> impl Iterator<Item = &i32> {
+        self.pids.keys()
+    }
+
+    /// Get the names of the hosts that have events, the unnamed host is ""
+    pub fn hosts(&self) -> impl Iterator<Item = &str> {
+        self.by_host.keys().map(move |id| self.host(*id))
+    }
+
+    /// Get the name of a host id
+    pub fn host(&self, id: u16) -> &str {
+        self.hosts.get(id as usize).map_or("", |h| h)
+    }
+
+    /// Get the id of a host name, the unnamed host is 0
+    pub fn host_id(&self, name: &str) -> Option<u16> {
+        match name {
+            "" => Some(0),
+            _ => self.host_ids.get(name).copied(),
+        }
+    }
+
+    /// Get the access summary of all events for the subject
+    pub fn access(&self, subject: &str) -> Option<&Access> {
+        self.paths.id(subject).and_then(|id| self.access_of(id))
+    }
+
+    /// Get the access summary of all events for the subject path id
+    pub fn access_of(&self, subject: u32) -> Option<&Access> {
+        self.access.get(&subject)
+    }
+
+    /// Get the records that fit the perspective, in time order
+    pub fn find(&self, from: &Perspective) -> Vec<&Record> {
+        self.find_in(from, &Window::default())
+    }
+
+    /// Get the records that fit the perspective and fall within the window, in time order
+    pub fn find_in(&self, from: &Perspective, w: &Window) -> Vec<&Record> {
+        self.find_ids_in(from, w)
+            .into_iter()
+            .map(|id| &self.records[id as usize])
+            .collect()
+    }
+
+    /// Get the records that fit the perspective and fall within the window with their
+    /// occurrences, in time order
+    pub fn find_seen_in(&self, from: &Perspective, w: &Window) -> Vec<(&Record, Seen)> {
+        self.find_ids_in(from, w)
+            .into_iter()
+            .map(|id| (&self.records[id as usize], self.seen(id)))
+            .collect()
+    }
+
+    /// Get the ids of the records that fit the perspective and fall within the window,
+    /// in time order
+    pub fn find_ids_in(&self, from: &Perspective, w: &Window) -> Vec<u32> {
+        let ids = match from {
+            Perspective::User(uid) => self.users.get(uid),
+            Perspective::Group(gid) => self.groups.get(gid),
+            Perspective::Subject(path) => self.paths.id(path).and_then(|id| self.subjects.get(&id)),
+            Perspective::Object(path) => self.paths.id(path).and_then(|id| self.objects.get(&id)),
+            Perspective::Pid(pid) => self.pids.get(pid),
+            Perspective::Host(name) => self.host_id(name).and_then(|id| self.by_host.get(&id)),
+            Perspective::ObjectDir(dir) => {
+                let ids = self.objects_under(dir);
+                return if w.is_open() {
+                    ids
+                } else {
+                    self.window(&ids, w).collect()
+                };
+            }
+        };
+        match ids {
+            Some(ids) if w.is_open() => ids.clone(),
+            Some(ids) => self.window(ids, w).collect(),
+            None => vec![],
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use chrono::{DateTime, NaiveDateTime, Utc};
+    use fapolicy_rules::{Object, Permission, Subject};
+
+    fn event(s: &str, o: &str, dec: Decision, uid: i32, gid: Vec<i32>) -> Event {
+        Event {
+            rule_id: 1,
+            dec,
+            perm: Permission::Any,
+            uid,
+            gid,
+            pid: 1,
+            subj: Subject::from_exe(s),
+            obj: Object::from_path(o),
+            when: None,
+        }
+    }
+
+    fn db() -> DB {
+        DB::from(vec![
+            event("/bin/bash", "/foo", Allow, 1000, vec![1000]),
+            event("/bin/bash", "/bar", Deny, 1001, vec![1000, 1001]),
+            event("/bin/ls", "/foo", AllowSyslog, 1000, vec![1000, 1000]),
+        ])
+    }
+
+    #[test]
+    fn find_by_perspective() {
+        let db = db();
+        assert_eq!(db.find(&Perspective::User(1000)).len(), 2);
+        assert_eq!(db.find(&Perspective::User(1001)).len(), 1);
+        assert_eq!(db.find(&Perspective::Group(1000)).len(), 3);
+        assert_eq!(db.find(&Perspective::Group(1001)).len(), 1);
+        assert_eq!(db.find(&Perspective::Subject("/bin/ls".into())).len(), 1);
+        assert!(db.find(&Perspective::User(9999)).is_empty());
+        assert!(db.find(&Perspective::Subject("/bin/sh".into())).is_empty());
+    }
+
+    #[test]
+    fn find_preserves_order() {
+        let db = db();
+        let objs: Vec<String> = db
+            .find(&Perspective::Group(1000))
+            .iter()
+            .map(|r| db.path(r.obj).to_string())
+            .collect();
+        assert_eq!(objs, vec!["/foo", "/bar", "/foo"]);
+    }
+
+    #[test]
+    fn find_by_object() {
+        let mut db = db();
+        db.append(vec![
+            event("/bin/ls", "/etc/passwd", Allow, 1000, vec![1000]),
+            event("/bin/ls", "/etc/ssh/sshd_config", Deny, 1000, vec![1000]),
+            event("/bin/ls", "/etcetera", Allow, 1000, vec![1000]),
+            event("/bin/ls", "/etc", Allow, 1000, vec![1000]),
+        ]);
+        assert_eq!(db.find(&Perspective::Object("/foo".into())).len(), 2);
+        assert!(db.find(&Perspective::Object("/etc/ssh".into())).is_empty());
+
+        let objs = |dir: &str| -> Vec<String> {
+            db.find(&Perspective::ObjectDir(dir.into()))
+                .iter()
+                .map(|r| db.path(r.obj).to_string())
+                .collect()
+        };
+        assert_eq!(
+            objs("/etc"),
+            vec!["/etc/passwd", "/etc/ssh/sshd_config", "/etc"]
+        );
+        assert_eq!(objs("/etc/ssh/"), vec!["/etc/ssh/sshd_config"]);
+        assert_eq!(objs("/").len(), 7);
+        assert!(objs("/et").is_empty());
+        assert_eq!(
+            db.objects_in("/etc").collect::<Vec<&str>>(),
+            vec!["/etc", "/etc/passwd", "/etc/ssh/sshd_config"]
+        );
+    }
+
+    #[test]
+    fn distinct_keys() {
+        let db = db();
+        assert_eq!(db.subjects().count(), 2);
+        assert_eq!(db.objects().count(), 2);
+        assert_eq!(db.users().count(), 2);
+        assert_eq!(db.groups().count(), 2);
+    }
+
+    #[test]
+    fn append_updates_indexes() {
+        let mut db = db();
+        let ids = db.append(vec![
+            event("/bin/ls", "/baz", Deny, 1002, vec![1000]),
+            event("/bin/cat", "/baz", Allow, 1002, vec![1002]),
+        ]);
+        assert_eq!(ids, vec![3, 4]);
+        assert_eq!(db.len(), 5);
+        assert_eq!(db.version(), 2);
+        db.append(vec![]);
+        assert_eq!(db.version(), 2);
+        assert_eq!(db.find(&Perspective::User(1002)).len(), 2);
+        assert_eq!(db.find(&Perspective::Group(1000)).len(), 4);
+        assert_eq!(db.subjects().count(), 3);
+        assert_eq!(db.access("/bin/ls").unwrap().code(), AccessCode::Partial);
+
+        let last = db.find(&Perspective::Group(1000)).pop().unwrap();
+        assert_eq!(db.path(last.obj), "/baz");
+    }
+
+    #[test]
+    fn records_are_interned() {
+        let mut db = db();
+        let bash = db.get(0).unwrap().clone();
+        assert_eq!(db.get(1).unwrap().subj, bash.subj);
+        assert_eq!(db.get(2).unwrap().obj, bash.obj);
+        assert_eq!(db.paths().len(), 4);
+
+        // ids are stable when an out of order append moves records in time
+        db.append(vec![
+            timed("/bin/cat", 1, Some(1)),
+            timed("/bin/cat", 1, None),
+        ]);
+        assert_eq!(db.get(0), Some(&bash));
+        assert_eq!(db.path(db.get(4).unwrap().subj), "/bin/cat");
+        assert_eq!(times(db.iter().collect()).pop(), Some(Some(1)));
+    }
+
+    fn timed(s: &str, uid: i32, t: Option<i64>) -> Event {
+        Event {
+            when: t.map(|t| DateTime::from_utc(NaiveDateTime::from_timestamp(t, 0), Utc)),
+            ..event(s, "/foo", Allow, uid, vec![uid])
+        }
+    }
+
+    fn times(rs: Vec<&Record>) -> Vec<Option<i64>> {
+        rs.iter().map(|r| r.when).collect()
+    }
+
+    #[test]
+    fn sorted_by_time() {
+        let db = DB::from(vec![
+            timed("/bin/ls", 1, Some(3)),
+            timed("/bin/ls", 1, Some(1)),
+            timed("/bin/ls", 2, None),
+            timed("/bin/ls", 1, Some(2)),
+        ]);
+        assert_eq!(
+            times(db.iter().collect()),
+            vec![None, Some(1), Some(2), Some(3)]
+        );
+        assert_eq!(
+            times(db.find(&Perspective::User(1))),
+            vec![Some(1), Some(2), Some(3)]
+        );
+    }
+
+    #[test]
+    fn time_windows() {
+        let mut es: Vec<Event> = (0..10)
+            .map(|t| timed("/bin/ls", t as i32 % 2, Some(t)))
+            .collect();
+        es.push(timed("/bin/ls", 0, None));
+        let db = DB::from(es);
+
+        let w = Window::new(Some(3), Some(6));
+        assert_eq!(
+            times(db.iter_in(&w).collect()),
+            vec![None, Some(3), Some(4), Some(5), Some(6)]
+        );
+        assert_eq!(
+            times(db.find_in(&Perspective::User(0), &w)),
+            vec![None, Some(4), Some(6)]
+        );
+        assert_eq!(
+            times(db.find_in(&Perspective::User(1), &Window::new(Some(8), None))),
+            vec![Some(9)]
+        );
+        assert_eq!(
+            times(db.find_in(&Perspective::User(1), &Window::new(None, Some(2)))),
+            vec![Some(1)]
+        );
+        assert_eq!(
+            db.find_in(&Perspective::User(1), &Window::new(Some(6), Some(3)))
+                .len(),
+            0
+        );
+        assert_eq!(db.iter_in(&Window::new(Some(100), None)).count(), 1);
+        assert_eq!(
+            db.find_in(&Perspective::Subject("/bin/ls".into()), &Window::default())
+                .len(),
+            11
+        );
+    }
+
+    #[test]
+    fn append_out_of_order() {
+        let mut db = DB::from(vec![
+            timed("/bin/ls", 1, Some(5)),
+            timed("/bin/ls", 1, Some(7)),
+        ]);
+        db.append(vec![timed("/bin/ls", 1, Some(8))]);
+        db.append(vec![
+            timed("/bin/ls", 1, Some(6)),
+            timed("/bin/ls", 1, None),
+        ]);
+        assert_eq!(
+            times(db.find(&Perspective::User(1))),
+            vec![None, Some(5), Some(6), Some(7), Some(8)]
+        );
+        assert_eq!(db.access("/bin/ls").unwrap().allowed, 5);
+        assert_eq!(
+            db.find_in(&Perspective::User(1), &Window::new(Some(6), Some(7)))
+                .len(),
+            3
+        );
+    }
+
+    #[test]
+    fn subject_access() {
+        let db = db();
+        let bash = db.access("/bin/bash").unwrap();
+        assert_eq!(bash.allowed, 1);
+        assert_eq!(bash.denied, 1);
+        assert_eq!(bash.code(), AccessCode::Partial);
+        assert_eq!(db.access("/bin/ls").unwrap().code(), AccessCode::Allowed);
+        assert!(db.access("/bin/sh").is_none());
+    }
+
+    #[test]
+    fn deduplicate() {
+        let mut es: Vec<Event> = (0..10).map(|t| timed("/bin/ls", 1, Some(t))).collect();
+        es.push(timed("/bin/ls", 2, Some(4)));
+        es.push(Event {
+            pid: 99,
+            ..timed("/bin/ls", 1, Some(20))
+        });
+        let db = DB::deduplicated(es);
+        assert!(db.is_deduplicated());
+        assert_eq!(db.len(), 2);
+        assert_eq!(db.access("/bin/ls").unwrap().allowed, 12);
+
+        let rows = db.find_seen_in(&Perspective::User(1), &Window::default());
+        assert_eq!(rows.len(), 1);
+        assert_eq!(
+            rows[0].1,
+            Seen {
+                count: 11,
+                first: Some(0),
+                last: Some(20)
+            }
+        );
+
+        // an event is in a window that overlaps the time it was seen
+        let w = Window::new(Some(15), None);
+        assert_eq!(db.find_in(&Perspective::User(1), &w).len(), 1);
+        assert!(db.find_in(&Perspective::User(2), &w).is_empty());
+        assert_eq!(db.iter_in(&w).count(), 1);
+        assert_eq!(db.iter_in(&Window::new(None, Some(3))).count(), 1);
+    }
+
+    #[test]
+    fn deduplicate_out_of_order() {
+        let mut db = DB::deduplicated(vec![
+            timed("/bin/ls", 1, Some(5)),
+            timed("/bin/ls", 2, Some(6)),
+        ]);
+        db.append(vec![
+            timed("/bin/ls", 2, Some(1)),
+            timed("/bin/ls", 3, None),
+        ]);
+        assert_eq!(db.len(), 3);
+        assert_eq!(times(db.iter().collect()), vec![None, Some(1), Some(5)]);
+        let rows = db.find_seen_in(&Perspective::User(2), &Window::default());
+        assert_eq!(rows[0].1.count, 2);
+        assert_eq!((rows[0].1.first, rows[0].1.last), (Some(1), Some(6)));
+
+        // still collapses after the reorder
+        assert_eq!(db.append(vec![timed("/bin/ls", 1, Some(9))]), vec![0]);
+        assert_eq!(db.len(), 3);
+        assert_eq!(db.access("/bin/ls").unwrap().allowed, 5);
     }
 }
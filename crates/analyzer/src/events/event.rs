@@ -11,6 +11,7 @@ use std::iter::Iterator;
 use std::str::FromStr;
 
 use chrono::{DateTime, Utc};
+use smallvec::SmallVec;
 
 use fapolicy_rules::*;
 
@@ -68,11 +69,88 @@ impl Display for Event {
     }
 }
 
-#[derive(Clone)]
+/// Group ids of an event, a few are held inline
+pub type Gids = SmallVec<[i32; 2]>;
+
+/// Compact form of an event as it is held by the event db.
+/// Subject and object paths are ids into the path interner of the db.
+#[derive(Clone, Debug, PartialEq)]
+pub struct Record {
+    pub rule_id: i32,
+    pub dec: Decision,
+    pub perm: Permission,
+    pub uid: i32,
+    pub gid: Gids,
+    pub pid: i32,
+    pub subj: u32,
+    pub obj: u32,
+    /// id of the host the event was logged on, 0 when it is not known
+    pub host: u16,
+    /// epoch seconds
+    pub when: Option<i64>,
+}
+
+/// Stable numeric code of a decision
+pub fn decision_code(d: &Decision) -> u8 {
+    match d {
+        Decision::AllowAudit => 0,
+        Decision::AllowSyslog => 1,
+        Decision::AllowLog => 2,
+        Decision::Allow => 3,
+        Decision::Deny => 4,
+        Decision::DenyLog => 5,
+        Decision::DenyAudit => 6,
+        Decision::DenySyslog => 7,
+    }
+}
+
+/// Stable numeric code of a permission
+pub fn perm_code(p: &Permission) -> u8 {
+    match p {
+        Permission::Any => 0,
+        Permission::Open => 1,
+        Permission::Execute => 2,
+    }
+}
+
+/// Decision of a numeric code
+pub fn decision_of(code: u8) -> Option<Decision> {
+    match code {
+        0 => Some(Decision::AllowAudit),
+        1 => Some(Decision::AllowSyslog),
+        2 => Some(Decision::AllowLog),
+        3 => Some(Decision::Allow),
+        4 => Some(Decision::Deny),
+        5 => Some(Decision::DenyLog),
+        6 => Some(Decision::DenyAudit),
+        7 => Some(Decision::DenySyslog),
+        _ => None,
+    }
+}
+
+/// Permission of a numeric code
+pub fn perm_of(code: u8) -> Option<Permission> {
+    match code {
+        0 => Some(Permission::Any),
+        1 => Some(Permission::Open),
+        2 => Some(Permission::Execute),
+        _ => None,
+    }
+}
+
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
 pub enum Perspective {
     User(i32),
     Group(i32),
     Subject(String),
+    /// events on an object by its exact path
+    Object(String),
+    /// events on the objects at or beneath a directory
+    ObjectDir(String),
+    /// events of a process id, across every process that held it
+    Pid(i32),
+    /// events logged on a host, hosts are only known to the records of a db
+    Host(String),
 }
 
 impl Perspective {
@@ -81,6 +159,18 @@ impl Perspective {
             Perspective::User(uid) => *uid == e.uid,
             Perspective::Group(gid) => e.gid.contains(gid),
             Perspective::Subject(subj) => &e.subj.exe().unwrap() == subj,
+            Perspective::Object(path) => e.obj.path().as_ref() == Some(path),
+            Perspective::ObjectDir(dir) => e.obj.path().map_or(false, |p| is_under(&p, dir)),
+            Perspective::Pid(pid) => *pid == e.pid,
+            // an event is not tagged with its host until it is in a db
+            Perspective::Host(_) => false,
         }
     }
 }
+
+/// Check if a path is the directory or falls beneath it, a trailing slash on the
+/// directory is optional
+pub fn is_under(path: &str, dir: &str) -> bool {
+    let dir = dir.trim_end_matches('/');
+    path.starts_with(dir) && (path.len() == dir.len() || path[dir.len()..].starts_with('/'))
+}
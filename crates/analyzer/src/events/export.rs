@@ -0,0 +1,352 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::fs::File;
+use std::io::{BufWriter, Write};
+
+use fapolicy_trust::db::DB as TrustDB;
+
+use crate::error::Error;
+use crate::events::analysis::{TrustMemo, Verdict};
+use crate::events::db::{Window, DB};
+use crate::events::event::Record;
+
+// events per insert statement and per transaction of an sql export
+const SQL_ROWS: usize = 500;
+const SQL_TRANSACTION: usize = 100_000;
+const BUFFER_SIZE: usize = 1024 * 1024;
+
+/// Formats an event db can be exported as
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Format {
+    /// one row per event, with the paths and trust verdicts inline
+    Csv,
+    /// an SQL script that creates and fills path, host and event tables,
+    /// which loads into sqlite with `sqlite3 events.db < events.sql`
+    Sql,
+}
+
+impl Format {
+    pub fn of(name: &str) -> Result<Format, Error> {
+        match name {
+            "csv" => Ok(Format::Csv),
+            "sql" => Ok(Format::Sql),
+            _ => Err(Error::AnalyzerError(format!(
+                "unsupported export format {}",
+                name
+            ))),
+        }
+    }
+}
+
+/// Export the events of the db that fall within the window to a file, with the
+/// trust verdicts of their subjects and objects. Returns the number of events.
+pub fn to_file(
+    path: &str,
+    format: Format,
+    db: &DB,
+    w: &Window,
+    trust: &TrustDB,
+    memo: &mut TrustMemo,
+) -> Result<usize, Error> {
+    let mut out = BufWriter::with_capacity(BUFFER_SIZE, File::create(path)?);
+    let n = match format {
+        Format::Csv => to_csv(&mut out, db, w, trust, memo)?,
+        Format::Sql => to_sql(&mut out, db, w, trust, memo)?,
+    };
+    out.flush()?;
+    Ok(n)
+}
+
+/// Write the events as csv, a row per event with a header row
+pub fn to_csv<W: Write>(
+    out: &mut W,
+    db: &DB,
+    w: &Window,
+    trust: &TrustDB,
+    memo: &mut TrustMemo,
+) -> Result<usize, Error> {
+    writeln!(
+        out,
+        "id,host,time,rule_id,decision,perm,uid,gid,pid,\
+        subject,subject_trust,subject_status,object,object_trust,object_status,\
+        count,first_seen,last_seen"
+    )?;
+    let mut n = 0;
+    for id in db.ids_in(w) {
+        let r = match db.get(id) {
+            Some(r) => r,
+            None => continue,
+        };
+        let seen = db.seen(id);
+        let (subj, obj) = (db.path(r.subj), db.path(r.obj));
+        let (sv, ov) = (
+            memo.get(r.subj, subj, trust).ok(),
+            memo.get(r.obj, obj, trust).ok(),
+        );
+        writeln!(
+            out,
+            "{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{},{}",
+            id,
+            csv(db.host(r.host)),
+            opt(r.when),
+            r.rule_id,
+            r.dec,
+            perm(r),
+            r.uid,
+            csv(&gids(r)),
+            r.pid,
+            csv(subj),
+            trust_of(sv),
+            status_of(sv),
+            csv(obj),
+            trust_of(ov),
+            status_of(ov),
+            seen.count,
+            opt(seen.first),
+            opt(seen.last),
+        )?;
+        n += 1;
+    }
+    Ok(n)
+}
+
+/// Write the events as an SQL script. Paths and hosts are written once to their
+/// own tables and referenced by id from the events, which are inserted in
+/// multi row statements and committed in large transactions.
+pub fn to_sql<W: Write>(
+    out: &mut W,
+    db: &DB,
+    w: &Window,
+    trust: &TrustDB,
+    memo: &mut TrustMemo,
+) -> Result<usize, Error> {
+    writeln!(out, "PRAGMA foreign_keys=OFF;")?;
+    writeln!(out, "BEGIN TRANSACTION;")?;
+    writeln!(
+        out,
+        "CREATE TABLE paths(id INTEGER PRIMARY KEY, path TEXT NOT NULL, trust TEXT, status TEXT);"
+    )?;
+    writeln!(
+        out,
+        "CREATE TABLE hosts(id INTEGER PRIMARY KEY, name TEXT NOT NULL);"
+    )?;
+    writeln!(
+        out,
+        "CREATE TABLE events(id INTEGER PRIMARY KEY, host INTEGER REFERENCES hosts(id), \
+        time INTEGER, rule_id INTEGER, decision TEXT, perm TEXT, uid INTEGER, gid TEXT, \
+        pid INTEGER, subject INTEGER REFERENCES paths(id), object INTEGER REFERENCES paths(id), \
+        count INTEGER, first_seen INTEGER, last_seen INTEGER);"
+    )?;
+
+    let mut rows = Rows::new(out, "paths");
+    for id in 0..db.paths().len() as u32 {
+        let path = db.path(id);
+        let v = memo.get(id, path, trust).ok();
+        rows.add(format_args!(
+            "({},{},{},{})",
+            id,
+            sql(path),
+            sql(trust_of(v)),
+            sql(status_of(v))
+        ))?;
+    }
+    rows.end()?;
+
+    let mut hosts: Vec<&str> = db.hosts().collect();
+    hosts.sort_unstable();
+    let mut rows = Rows::new(out, "hosts");
+    for name in hosts {
+        if let Some(id) = db.host_id(name) {
+            rows.add(format_args!("({},{})", id, sql(name)))?;
+        }
+    }
+    rows.end()?;
+
+    let mut rows = Rows::new(out, "events");
+    let mut n = 0;
+    for id in db.ids_in(w) {
+        let r = match db.get(id) {
+            Some(r) => r,
+            None => continue,
+        };
+        let seen = db.seen(id);
+        rows.add(format_args!(
+            "({},{},{},{},'{}','{}',{},{},{},{},{},{},{},{})",
+            id,
+            r.host,
+            sql_opt(r.when),
+            r.rule_id,
+            r.dec,
+            perm(r),
+            r.uid,
+            sql(&gids(r)),
+            r.pid,
+            r.subj,
+            r.obj,
+            seen.count,
+            sql_opt(seen.first),
+            sql_opt(seen.last),
+        ))?;
+        n += 1;
+        if n % SQL_TRANSACTION == 0 {
+            rows.end()?;
+            writeln!(rows.out, "COMMIT;\nBEGIN TRANSACTION;")?;
+        }
+    }
+    rows.end()?;
+    writeln!(out, "CREATE INDEX events_time ON events(time);")?;
+    writeln!(out, "COMMIT;")?;
+    Ok(n)
+}
+
+/// Batches rows into multi row insert statements
+struct Rows<'a, W: Write> {
+    out: &'a mut W,
+    table: &'static str,
+    pending: usize,
+}
+
+impl<'a, W: Write> Rows<'a, W> {
+    fn new(out: &'a mut W, table: &'static str) -> Self {
+        Rows {
+            out,
+            table,
+            pending: 0,
+        }
+    }
+
+    fn add(&mut self, row: std::fmt::Arguments) -> Result<(), Error> {
+        if self.pending == 0 {
+            write!(self.out, "INSERT INTO {} VALUES\n{}", self.table, row)?;
+        } else {
+            write!(self.out, ",\n{}", row)?;
+        }
+        self.pending += 1;
+        if self.pending == SQL_ROWS {
+            self.end()?;
+        }
+        Ok(())
+    }
+
+    fn end(&mut self) -> Result<(), Error> {
+        if self.pending > 0 {
+            writeln!(self.out, ";")?;
+            self.pending = 0;
+        }
+        Ok(())
+    }
+}
+
+fn perm(r: &Record) -> String {
+    let p = r.perm.to_string();
+    p.trim_start_matches("perm=").to_string()
+}
+
+fn gids(r: &Record) -> String {
+    let gids: Vec<String> = r.gid.iter().map(|g| g.to_string()).collect();
+    gids.join(",")
+}
+
+fn trust_of(v: Option<Verdict>) -> &'static str {
+    v.map_or("", |v| v.trust.as_str())
+}
+
+fn status_of(v: Option<Verdict>) -> &'static str {
+    v.map_or("", |v| v.status.as_str())
+}
+
+fn opt(v: Option<i64>) -> String {
+    v.map(|v| v.to_string()).unwrap_or_default()
+}
+
+fn sql_opt(v: Option<i64>) -> String {
+    v.map(|v| v.to_string())
+        .unwrap_or_else(|| "NULL".to_string())
+}
+
+/// Quote a csv field when it holds a separator, quote or line break
+fn csv(v: &str) -> std::borrow::Cow<'_, str> {
+    if v.contains(|c| matches!(c, ',' | '"' | '\n' | '\r')) {
+        format!("\"{}\"", v.replace('"', "\"\"")).into()
+    } else {
+        v.into()
+    }
+}
+
+/// Quote an sql string literal
+fn sql(v: &str) -> String {
+    format!("'{}'", v.replace('\'', "''"))
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::events::event::Event;
+    use fapolicy_rules::Decision::*;
+    use fapolicy_rules::{Object, Permission, Subject};
+
+    fn db() -> DB {
+        let e = |s: &str, o: &str| Event {
+            rule_id: 1,
+            dec: Deny,
+            perm: Permission::Open,
+            uid: 1000,
+            gid: vec![1000, 10],
+            pid: 9,
+            subj: Subject::from_exe(s),
+            obj: Object::from_path(o),
+            when: None,
+        };
+        DB::from(vec![
+            e("/usr/bin/cat", "/etc/a,b"),
+            e("/usr/bin/cat", "/etc/it's"),
+        ])
+    }
+
+    #[test]
+    fn csv_rows() {
+        let mut out = vec![];
+        let n = to_csv(
+            &mut out,
+            &db(),
+            &Window::default(),
+            &TrustDB::default(),
+            &mut TrustMemo::default(),
+        )
+        .unwrap();
+        assert_eq!(n, 2);
+        let text = String::from_utf8(out).unwrap();
+        let lines: Vec<&str> = text.lines().collect();
+        assert_eq!(lines.len(), 3);
+        assert!(lines[0].starts_with("id,host,time,"));
+        assert_eq!(
+            lines[1],
+            "0,,,1,deny,open,1000,\"1000,10\",9,/usr/bin/cat,U,U,\"/etc/a,b\",U,U,1,,"
+        );
+    }
+
+    #[test]
+    fn sql_script() {
+        let mut out = vec![];
+        let n = to_sql(
+            &mut out,
+            &db(),
+            &Window::default(),
+            &TrustDB::default(),
+            &mut TrustMemo::default(),
+        )
+        .unwrap();
+        assert_eq!(n, 2);
+        let text = String::from_utf8(out).unwrap();
+        assert!(text.contains("INSERT INTO paths VALUES\n(0,'/usr/bin/cat','U','U'),"));
+        assert!(text.contains("'/etc/it''s'"));
+        assert!(text.contains("(1,0,NULL,1,'deny','open',1000,'1000,10',9,0,2,1,NULL,NULL);"));
+        assert!(text.trim_end().ends_with("COMMIT;"));
+    }
+}
@@ -0,0 +1,302 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+use std::sync::Arc;
+
+use fapolicy_rules::{Decision, Permission};
+
+use crate::events::db::{Access, Window, DB};
+use crate::events::event::Record;
+use crate::events::intern::Paths;
+
+/// The user or group that an event was attributed to
+#[derive(Clone, Copy, Debug, PartialEq, Eq, Hash)]
+pub enum Actor {
+    User(i32),
+    Group(i32),
+}
+
+/// Subject node of the graph
+#[derive(Clone, Debug, Default)]
+pub struct Node {
+    /// access rollup of all events for the subject
+    pub access: Access,
+    /// access rollup of the subject per actor
+    pub actors: HashMap<Actor, Access>,
+    /// subject has events that carry no timestamp
+    pub untimed: bool,
+}
+
+/// Edge from a subject to an object.
+/// The rule, decision and perm are those of the most recent event.
+#[derive(Clone, Debug)]
+pub struct Link {
+    pub rule_id: i32,
+    pub dec: Decision,
+    pub perm: Permission,
+    pub access: Access,
+}
+
+/// Object node of the graph
+#[derive(Clone, Debug)]
+pub struct ObjNode {
+    /// the most recent event on the object, with the access rollup of all of them
+    pub link: Link,
+    /// access rollup of the object per actor
+    pub actors: HashMap<Actor, Access>,
+    // access rollup of the object per subject path id
+    subjects: HashMap<u32, Access>,
+}
+
+impl Link {
+    fn of(r: &Record) -> Self {
+        Link {
+            rule_id: r.rule_id,
+            dec: r.dec.clone(),
+            perm: r.perm.clone(),
+            access: Access::default(),
+        }
+    }
+
+    // records are visited in time order, so the last one seen is the most recent
+    fn update(&mut self, r: &Record, n: usize) {
+        self.rule_id = r.rule_id;
+        self.dec = r.dec.clone();
+        self.perm = r.perm.clone();
+        self.access.add_n(&r.dec, n);
+    }
+}
+
+/// Adjacency of actors, subjects and objects, built in a single pass over the
+/// records of a db. Paths are held as the interned ids of the db.
+#[derive(Clone, Debug, Default)]
+pub struct Graph {
+    paths: Paths,
+    subjects: HashMap<u32, Node>,
+    actors: HashMap<Actor, HashMap<u32, Access>>,
+    objects: HashMap<(Actor, u32), HashMap<u32, Link>>,
+    targets: HashMap<u32, ObjNode>,
+}
+
+impl Graph {
+    /// Build from the records of the db that fall within the window,
+    /// each standing for its number of occurrences
+    pub fn build(db: &DB, w: &Window) -> Self {
+        let mut g = Graph {
+            paths: db.paths().clone(),
+            ..Graph::default()
+        };
+        for (r, seen) in db.iter_seen_in(w) {
+            let n = seen.count;
+            let actors = std::iter::once(Actor::User(r.uid))
+                .chain(r.gid.iter().map(|gid| Actor::Group(*gid)));
+
+            let node = g.subjects.entry(r.subj).or_default();
+            node.access.add_n(&r.dec, n);
+            node.untimed |= r.when.is_none();
+
+            let target = g.targets.entry(r.obj).or_insert_with(|| ObjNode {
+                link: Link::of(r),
+                actors: HashMap::new(),
+                subjects: HashMap::new(),
+            });
+            target.link.update(r, n);
+            target.subjects.entry(r.subj).or_default().add_n(&r.dec, n);
+
+            for a in actors {
+                target.actors.entry(a).or_default().add_n(&r.dec, n);
+                node.actors.entry(a).or_default().add_n(&r.dec, n);
+                g.actors
+                    .entry(a)
+                    .or_default()
+                    .entry(r.subj)
+                    .or_default()
+                    .add_n(&r.dec, n);
+
+                let link = g
+                    .objects
+                    .entry((a, r.subj))
+                    .or_default()
+                    .entry(r.obj)
+                    .or_insert_with(|| Link::of(r));
+                link.update(r, n);
+            }
+        }
+        g
+    }
+
+    fn path(&self, id: &u32) -> &Arc<str> {
+        // every id in the graph was interned by the db the paths were cloned from
+        self.paths.shared(*id).expect("path id from the db")
+    }
+
+    /// Get the interned paths of the graph, shared with the db it was built from
+    pub fn paths(&self) -> &Paths {
+        &self.paths
+    }
+
+    /// Get all subjects of the graph
+    pub fn subjects(&self) -> impl Iterator<Item = (&Arc<str>, &Node)> {
+        self.subjects.iter().map(move |(id, n)| (self.path(id), n))
+    }
+
+    /// Get the subject node for the path
+    pub fn subject(&self, path: &str) -> Option<&Node> {
+        self.paths.id(path).and_then(|id| self.subjects.get(&id))
+    }
+
+    /// Get all actors of the graph
+    pub fn actors(&self) -> impl Iterator<Item = &Actor> {
+        self.actors.keys()
+    }
+
+    /// Get the subjects of an actor with the access relative to that actor
+    pub fn subjects_of(&self, actor: &Actor) -> Vec<(&Arc<str>, &Access)> {
+        match self.actors.get(actor) {
+            Some(m) => m.iter().map(|(id, a)| (self.path(id), a)).collect(),
+            None => vec![],
+        }
+    }
+
+    /// Get the objects accessed by a subject on behalf of an actor
+    pub fn objects_of(&self, actor: &Actor, subject: &str) -> Vec<(&Arc<str>, &Link)> {
+        let m = self
+            .paths
+            .id(subject)
+            .and_then(|id| self.objects.get(&(*actor, id)));
+        match m {
+            Some(m) => m.iter().map(|(id, l)| (self.path(id), l)).collect(),
+            None => vec![],
+        }
+    }
+
+    /// Get all objects of the graph
+    pub fn objects(&self) -> impl Iterator<Item = (&Arc<str>, &ObjNode)> {
+        self.targets.iter().map(move |(id, n)| (self.path(id), n))
+    }
+
+    /// Get the object node for the path
+    pub fn object(&self, path: &str) -> Option<&ObjNode> {
+        self.paths.id(path).and_then(|id| self.targets.get(&id))
+    }
+
+    /// Get the subjects that accessed an object with the access relative to that object
+    pub fn subjects_by_object(&self, object: &str) -> Vec<(&Arc<str>, &Access)> {
+        match self.object(object) {
+            Some(n) => n
+                .subjects
+                .iter()
+                .map(|(id, a)| (self.path(id), a))
+                .collect(),
+            None => vec![],
+        }
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::events::db::AccessCode;
+    use crate::events::event::Event;
+    use fapolicy_rules::Decision::*;
+    use fapolicy_rules::{Object, Subject};
+
+    fn event(s: &str, o: &str, dec: Decision, rule_id: i32, uid: i32, gid: Vec<i32>) -> Event {
+        Event {
+            rule_id,
+            dec,
+            perm: Permission::Any,
+            uid,
+            gid,
+            pid: 1,
+            subj: Subject::from_exe(s),
+            obj: Object::from_path(o),
+            when: None,
+        }
+    }
+
+    fn graph() -> Graph {
+        let es = vec![
+            event("/bin/bash", "/foo", Allow, 1, 1000, vec![1000]),
+            event("/bin/bash", "/foo", Deny, 2, 1000, vec![1000]),
+            event("/bin/bash", "/bar", Allow, 1, 1001, vec![1000, 1001]),
+            event("/bin/ls", "/foo", Allow, 1, 1001, vec![1001]),
+        ];
+        Graph::build(&DB::from(es), &Window::default())
+    }
+
+    fn find<'a, T>(xs: &[(&Arc<str>, &'a T)], path: &str) -> &'a T {
+        xs.iter().find(|(p, _)| p.as_ref() == path).unwrap().1
+    }
+
+    #[test]
+    fn subject_rollups() {
+        let g = graph();
+        assert_eq!(g.subjects().count(), 2);
+
+        let bash = g.subject("/bin/bash").unwrap();
+        assert_eq!(bash.access.code(), AccessCode::Partial);
+        assert_eq!(bash.actors.len(), 4);
+        assert_eq!(bash.actors[&Actor::User(1001)].code(), AccessCode::Allowed);
+        assert_eq!(bash.actors[&Actor::Group(1000)].allowed, 2);
+        assert!(bash.untimed);
+    }
+
+    #[test]
+    fn actor_subjects() {
+        let g = graph();
+        assert_eq!(g.actors().count(), 4);
+
+        let u = g.subjects_of(&Actor::User(1000));
+        assert_eq!(u.len(), 1);
+        assert_eq!(find(&u, "/bin/bash").code(), AccessCode::Partial);
+
+        let u = g.subjects_of(&Actor::User(1001));
+        assert_eq!(u.len(), 2);
+        assert_eq!(find(&u, "/bin/bash").code(), AccessCode::Allowed);
+
+        assert!(g.subjects_of(&Actor::User(0)).is_empty());
+    }
+
+    #[test]
+    fn objects_keep_latest_event() {
+        let g = graph();
+        let os = g.objects_of(&Actor::User(1000), "/bin/bash");
+        assert_eq!(os.len(), 1);
+
+        let foo = find(&os, "/foo");
+        assert_eq!(foo.rule_id, 2);
+        assert_eq!(foo.dec, Deny);
+        assert_eq!(foo.access.allowed, 1);
+        assert_eq!(foo.access.denied, 1);
+
+        let os = g.objects_of(&Actor::Group(1000), "/bin/bash");
+        assert_eq!(os.len(), 2);
+        assert!(g.objects_of(&Actor::User(1000), "/bin/ls").is_empty());
+    }
+
+    #[test]
+    fn object_rollups() {
+        let g = graph();
+        assert_eq!(g.objects().count(), 2);
+
+        let foo = g.object("/foo").unwrap();
+        assert_eq!(foo.link.rule_id, 1);
+        assert_eq!(foo.link.access.code(), AccessCode::Partial);
+        assert_eq!(foo.actors.len(), 4);
+        assert_eq!(foo.actors[&Actor::User(1000)].code(), AccessCode::Partial);
+        assert_eq!(foo.actors[&Actor::Group(1001)].code(), AccessCode::Allowed);
+
+        let ss = g.subjects_by_object("/foo");
+        assert_eq!(ss.len(), 2);
+        assert_eq!(find(&ss, "/bin/bash").code(), AccessCode::Partial);
+        assert_eq!(find(&ss, "/bin/ls").code(), AccessCode::Allowed);
+        assert!(g.subjects_by_object("/baz").is_empty());
+    }
+}
@@ -0,0 +1,235 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::cmp::Reverse;
+use std::collections::BinaryHeap;
+use std::fs;
+use std::path::{Path, PathBuf};
+
+use rayon::prelude::*;
+
+use crate::error::Error;
+use crate::events::db::{Window, DB};
+use crate::events::event::Event;
+use crate::events::read;
+use crate::events::read::Progress;
+
+/// Kind of log a source is read as
+#[derive(Clone, Copy, Debug, PartialEq, Eq)]
+pub enum Log {
+    Debug,
+    Syslog,
+    Audit,
+}
+
+impl Log {
+    /// Guess the kind of a log from its file name, audit and syslog files are
+    /// known by their usual names and anything else is taken to be a debug log
+    pub fn of(path: &Path) -> Log {
+        let name = path
+            .file_name()
+            .map(|n| n.to_string_lossy())
+            .unwrap_or_default();
+        if name.starts_with("audit") {
+            Log::Audit
+        } else if name.starts_with("messages") || name.starts_with("syslog") {
+            Log::Syslog
+        } else {
+            Log::Debug
+        }
+    }
+}
+
+/// A log to ingest and the host it was collected from
+#[derive(Clone, Debug, PartialEq)]
+pub struct Source {
+    pub host: String,
+    pub path: PathBuf,
+    pub log: Log,
+}
+
+impl Source {
+    pub fn new(host: &str, path: &Path, log: Log) -> Self {
+        Source {
+            host: host.to_string(),
+            path: path.to_path_buf(),
+            log,
+        }
+    }
+}
+
+/// List the sources of a collection directory, which holds a directory per host
+/// with the logs collected from it. Hidden entries are skipped.
+pub fn sources_in(dir: &Path) -> Result<Vec<Source>, Error> {
+    let mut sources = vec![];
+    for host in fs::read_dir(dir)? {
+        let host = host?.path();
+        let name = match host.file_name().map(|n| n.to_string_lossy()) {
+            Some(n) if !n.starts_with('.') && host.is_dir() => n.to_string(),
+            _ => continue,
+        };
+        for log in fs::read_dir(&host)? {
+            let path = log?.path();
+            let hidden = path
+                .file_name()
+                .map_or(true, |n| n.to_string_lossy().starts_with('.'));
+            if !hidden && path.is_file() {
+                sources.push(Source::new(&name, &path, Log::of(&path)));
+            }
+        }
+    }
+    sources.sort_by(|a, b| (&a.host, &a.path).cmp(&(&b.host, &b.path)));
+    Ok(sources)
+}
+
+/// Read the events of the sources that fall within the window into one db,
+/// tagging each event with the host of its source. The sources are parsed in
+/// parallel and their time ordered runs k-way merged, so the db is built with
+/// a single in order append.
+/// With dedup set, duplicate events of a host are collapsed into occurrence counts.
+pub fn ingest(sources: &[Source], w: &Window, dedup: bool) -> Result<DB, Error> {
+    ingest_with(sources, w, dedup, None)
+}
+
+/// Ingest the sources, reporting the reads to the progress when one is given
+pub fn ingest_with(
+    sources: &[Source],
+    w: &Window,
+    dedup: bool,
+    progress: Option<&Progress>,
+) -> Result<DB, Error> {
+    let mut db = if dedup {
+        DB::deduplicated(vec![])
+    } else {
+        DB::default()
+    };
+    let hosts = sources
+        .iter()
+        .map(|s| db.intern_host(&s.host))
+        .collect::<Result<Vec<_>, _>>()?;
+
+    let runs = sources
+        .par_iter()
+        .map(|s| read_source(s, w, progress))
+        .collect::<Result<Vec<_>, _>>()?;
+    db.append_tagged(merge(hosts.into_iter().zip(runs).collect()));
+    Ok(db)
+}
+
+fn read_source(s: &Source, w: &Window, p: Option<&Progress>) -> Result<Vec<Event>, Error> {
+    let mut events = match s.log {
+        // syslogs are seeked to the window and may be compressed
+        Log::Syslog => return read::from_syslogs_with(&[s.path.clone()], w, p),
+        Log::Debug => read::from_debug_with(&s.path.to_string_lossy(), p)?,
+        Log::Audit => read::from_auditlog_with(&s.path.to_string_lossy(), p)?,
+    };
+    if !w.is_open() {
+        events.retain(|e| w.contains(e));
+    }
+    // debug logs are written in decision order, which can run slightly out of time order
+    events.sort_by_key(|e| e.when);
+    Ok(events)
+}
+
+/// Merge time ordered runs of events into one time ordered list.
+/// Events with the same time keep the order of their runs.
+fn merge(runs: Vec<(u16, Vec<Event>)>) -> Vec<(u16, Event)> {
+    let total = runs.iter().map(|(_, es)| es.len()).sum();
+    let mut merged = Vec::with_capacity(total);
+    let mut iters: Vec<_> = runs
+        .into_iter()
+        .map(|(host, es)| (host, es.into_iter().peekable()))
+        .collect();
+
+    let mut heads = BinaryHeap::with_capacity(iters.len());
+    for (i, (_, it)) in iters.iter_mut().enumerate() {
+        if let Some(e) = it.peek() {
+            heads.push(Reverse((e.when, i)));
+        }
+    }
+    while let Some(Reverse((_, i))) = heads.pop() {
+        let (host, it) = &mut iters[i];
+        if let Some(e) = it.next() {
+            merged.push((*host, e));
+        }
+        if let Some(e) = it.peek() {
+            heads.push(Reverse((e.when, i)));
+        }
+    }
+    merged
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::events::aggregate::{group_by, Field, Value};
+    use crate::events::event::Perspective;
+    use std::io::Write;
+
+    fn line(t: &str, uid: i32) -> String {
+        format!(
+            "{}+00:00 host fapolicyd[1]: rule=9 dec=deny_audit perm=open uid={} gid=0 pid=5 exe=/usr/bin/cat : path=/etc/hosts ftype=text/plain\n",
+            t, uid
+        )
+    }
+
+    fn write(dir: &Path, host: &str, name: &str, lines: &[String]) {
+        fs::create_dir_all(dir.join(host)).unwrap();
+        let mut f = fs::File::create(dir.join(host).join(name)).unwrap();
+        for l in lines {
+            f.write_all(l.as_bytes()).unwrap();
+        }
+    }
+
+    #[test]
+    fn merge_hosts() {
+        let dir = tempfile::tempdir().unwrap();
+        write(
+            dir.path(),
+            "alpha",
+            "messages",
+            &[
+                line("2022-01-01T00:00:01.000000", 1),
+                line("2022-01-01T00:00:04.000000", 1),
+            ],
+        );
+        write(
+            dir.path(),
+            "beta",
+            "messages",
+            &[
+                line("2022-01-01T00:00:02.000000", 2),
+                line("2022-01-01T00:00:03.000000", 2),
+                line("2022-01-01T00:00:05.000000", 2),
+            ],
+        );
+        fs::write(dir.path().join("beta").join(".hidden"), "").unwrap();
+
+        let sources = sources_in(dir.path()).unwrap();
+        assert_eq!(sources.len(), 2);
+        assert_eq!(
+            sources[1],
+            Source::new("beta", &dir.path().join("beta/messages"), Log::Syslog)
+        );
+
+        let db = ingest(&sources, &Window::default(), false).unwrap();
+        let uids: Vec<i32> = db.iter().map(|r| r.uid).collect();
+        assert_eq!(uids, vec![1, 2, 2, 1, 2]);
+        assert_eq!(db.find(&Perspective::Host("beta".to_string())).len(), 3);
+        assert!(db.find(&Perspective::Host("gamma".to_string())).is_empty());
+
+        let gs = group_by(&db, &Window::default(), &[Field::Host], &[]);
+        let alpha = db.host_id("alpha").unwrap();
+        assert_eq!(gs[0].key, vec![Value::Host(alpha)]);
+        assert_eq!(gs[0].count, 2);
+
+        // the same events on two hosts are distinct when deduplicated
+        let db = ingest(&sources, &Window::default(), true).unwrap();
+        assert_eq!(db.len(), 2);
+    }
+}
@@ -0,0 +1,73 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+use std::sync::Arc;
+
+/// Interner of paths; each distinct path is stored once and referred to by a u32 id
+#[derive(Clone, Debug, Default)]
+pub struct Paths {
+    ids: HashMap<Arc<str>, u32>,
+    table: Vec<Arc<str>>,
+}
+
+impl Paths {
+    /// Get the id of the path, adding it when it is new
+    pub fn intern(&mut self, path: &str) -> u32 {
+        if let Some(id) = self.ids.get(path) {
+            return *id;
+        }
+        let id = self.table.len() as u32;
+        let p: Arc<str> = Arc::from(path);
+        self.ids.insert(p.clone(), id);
+        self.table.push(p);
+        id
+    }
+
+    /// Get the id of a path that was interned
+    pub fn id(&self, path: &str) -> Option<u32> {
+        self.ids.get(path).copied()
+    }
+
+    /// Get the path of an id
+    pub fn get(&self, id: u32) -> Option<&str> {
+        self.table.get(id as usize).map(|p| p.as_ref())
+    }
+
+    /// Get the shared path of an id, without copying the string
+    pub fn shared(&self, id: u32) -> Option<&Arc<str>> {
+        self.table.get(id as usize)
+    }
+
+    pub fn len(&self) -> usize {
+        self.table.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.table.is_empty()
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn intern_once() {
+        let mut p = Paths::default();
+        let a = p.intern("/usr/bin/bash");
+        let b = p.intern("/usr/bin/ls");
+        assert_ne!(a, b);
+        assert_eq!(p.intern("/usr/bin/bash"), a);
+        assert_eq!(p.len(), 2);
+        assert_eq!(p.get(b), Some("/usr/bin/ls"));
+        assert_eq!(p.id("/usr/bin/ls"), Some(b));
+        assert!(p.id("/usr/bin/cat").is_none());
+        assert!(p.get(9).is_none());
+    }
+}
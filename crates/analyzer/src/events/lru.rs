@@ -0,0 +1,119 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+use std::hash::Hash;
+
+/// Bounded cache of analysis results that evicts the least recently used entry
+/// when full, counting the hits and misses of its lookups
+#[derive(Clone, Debug)]
+pub struct Lru<K, V> {
+    capacity: usize,
+    // time of last use, in lookups and inserts
+    tick: u64,
+    entries: HashMap<K, (u64, V)>,
+    hits: u64,
+    misses: u64,
+}
+
+impl<K: Hash + Eq + Clone, V: Clone> Lru<K, V> {
+    pub fn new(capacity: usize) -> Self {
+        Lru {
+            capacity: capacity.max(1),
+            tick: 0,
+            entries: HashMap::new(),
+            hits: 0,
+            misses: 0,
+        }
+    }
+
+    /// Get the value of a key, marking it as the most recently used
+    pub fn get(&mut self, k: &K) -> Option<V> {
+        self.tick += 1;
+        match self.entries.get_mut(k) {
+            Some((used, v)) => {
+                *used = self.tick;
+                self.hits += 1;
+                Some(v.clone())
+            }
+            None => {
+                self.misses += 1;
+                None
+            }
+        }
+    }
+
+    /// Insert a value, evicting the least recently used entry when full
+    pub fn insert(&mut self, k: K, v: V) {
+        self.tick += 1;
+        if self.entries.len() >= self.capacity && !self.entries.contains_key(&k) {
+            // a scan is cheap at the few dozen entries the cache is sized for
+            let oldest = self
+                .entries
+                .iter()
+                .min_by_key(|(_, (used, _))| *used)
+                .map(|(k, _)| k.clone());
+            if let Some(oldest) = oldest {
+                self.entries.remove(&oldest);
+            }
+        }
+        self.entries.insert(k, (self.tick, v));
+    }
+
+    /// Drop all entries, the counters are kept
+    pub fn clear(&mut self) {
+        self.entries.clear();
+    }
+
+    pub fn len(&self) -> usize {
+        self.entries.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.entries.is_empty()
+    }
+
+    pub fn capacity(&self) -> usize {
+        self.capacity
+    }
+
+    pub fn hits(&self) -> u64 {
+        self.hits
+    }
+
+    pub fn misses(&self) -> u64 {
+        self.misses
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn evicts_least_recently_used() {
+        let mut c: Lru<&str, i32> = Lru::new(2);
+        c.insert("a", 1);
+        c.insert("b", 2);
+        assert_eq!(c.get(&"a"), Some(1));
+        c.insert("c", 3);
+        assert_eq!(c.len(), 2);
+        assert_eq!(c.get(&"b"), None);
+        assert_eq!(c.get(&"a"), Some(1));
+        assert_eq!(c.get(&"c"), Some(3));
+        assert_eq!((c.hits(), c.misses()), (3, 1));
+
+        // replacing a key does not evict another
+        c.insert("c", 4);
+        assert_eq!(c.get(&"a"), Some(1));
+
+        c.clear();
+        assert!(c.is_empty());
+        assert_eq!(c.hits(), 4);
+    }
+}
@@ -6,8 +6,18 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+pub mod aggregate;
 pub mod analysis;
+pub mod audit;
+pub mod cache;
 pub mod db;
 pub mod event;
+pub mod export;
+pub mod graph;
+pub mod ingest;
+pub mod intern;
+pub mod lru;
 pub mod parse;
+pub mod process;
 pub mod read;
+pub mod source;
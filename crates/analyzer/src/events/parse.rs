@@ -56,7 +56,18 @@ pub fn parse_event(i: &str) -> nom::IResult<&str, Event> {
     }
 }
 
-fn rfc3339_date(i: &str) -> nom::IResult<&str, DateTime<Utc>> {
+/// Describe why an event failed to parse, with the start of the text the parser stopped at
+pub fn reason(e: nom::Err<nom::error::Error<&str>>) -> String {
+    match e {
+        nom::Err::Error(e) | nom::Err::Failure(e) => {
+            let at: String = e.input.chars().take(32).collect();
+            format!("{:?} at '{}'", e.code, at)
+        }
+        nom::Err::Incomplete(_) => "incomplete".to_string(),
+    }
+}
+
+pub(crate) fn rfc3339_date(i: &str) -> nom::IResult<&str, DateTime<Utc>> {
     match nom::combinator::complete(nom::sequence::tuple((
         terminated(digit1, tag("-")), // y
         terminated(digit1, tag("-")), // m
@@ -94,6 +105,13 @@ mod tests {
 
     use super::*;
 
+    #[test]
+    fn failure_reason() {
+        let e = "rule=9 dec=allow perm=launch uid=1003 gid=999 pid=5555 exe=/usr/bin/bash : path=/usr/bin/vi ftype=application/x-executable";
+        let r = reason(parse_event(e).err().unwrap());
+        assert!(r.contains(" at '"));
+    }
+
     #[test]
     fn simple() {
         let e = "rule=9 dec=allow perm=execute uid=1003 gid=999 pid=5555 exe=/usr/bin/bash : path=/usr/bin/vi ftype=application/x-executable";
@@ -0,0 +1,165 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use fapolicy_rules::Permission;
+
+use crate::events::db::{Window, DB};
+use crate::events::event::Perspective;
+
+/// Default number of seconds without events after which a pid is taken to be reused
+pub const REUSE_GAP: i64 = 300;
+
+/// One lifetime of a pid; a pid that the system hands out again starts another
+#[derive(Clone, Debug, PartialEq)]
+pub struct Process {
+    pub pid: i32,
+    /// ids of the records of the process, in time order
+    pub ids: Vec<u32>,
+    /// subject path ids the process ran as, in the order they were exec'd
+    pub execs: Vec<u32>,
+    pub first: Option<i64>,
+    pub last: Option<i64>,
+}
+
+impl Process {
+    fn new(pid: i32, id: u32, subj: u32, when: Option<i64>) -> Self {
+        Process {
+            pid,
+            ids: vec![id],
+            execs: vec![subj],
+            first: when,
+            last: when,
+        }
+    }
+
+    /// Get the subject path id the process last ran as
+    pub fn exe(&self) -> u32 {
+        // a process is never created without its first exe
+        self.execs[self.execs.len() - 1]
+    }
+}
+
+/// Split the timeline of a pid within the window into the processes that held it.
+/// A pid is taken to be reused when it goes quiet for longer than the gap, or when
+/// its exe changes to one the process was not seen executing. Each process lists
+/// the chain of exes it ran as, one entry per exec.
+pub fn processes(db: &DB, pid: i32, w: &Window, gap: i64) -> Vec<Process> {
+    let mut ps: Vec<Process> = vec![];
+    // objects the current process executed since its exe last changed
+    let mut executed: Vec<u32> = vec![];
+    for id in db.find_ids_in(&Perspective::Pid(pid), w) {
+        let r = match db.get(id) {
+            Some(r) => r,
+            None => continue,
+        };
+        let new = match ps.last() {
+            Some(p) => reused(p, r.subj, r.when, &executed, gap),
+            None => true,
+        };
+        if new {
+            executed.clear();
+            ps.push(Process::new(pid, id, r.subj, r.when));
+        } else if let Some(p) = ps.last_mut() {
+            if r.subj != p.exe() {
+                p.execs.push(r.subj);
+                executed.clear();
+            }
+            p.ids.push(id);
+            if r.when.is_some() {
+                p.first = p.first.or(r.when);
+                p.last = r.when;
+            }
+        }
+        if matches!(r.perm, Permission::Execute | Permission::Any) {
+            executed.push(r.obj);
+        }
+    }
+    ps
+}
+
+fn reused(p: &Process, subj: u32, when: Option<i64>, executed: &[u32], gap: i64) -> bool {
+    let quiet = match (p.last, when) {
+        (Some(last), Some(t)) => t - last > gap,
+        _ => false,
+    };
+    quiet || (subj != p.exe() && !executed.contains(&subj))
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::events::event::Event;
+    use chrono::{DateTime, NaiveDateTime, Utc};
+    use fapolicy_rules::Decision::Allow;
+    use fapolicy_rules::{Object, Subject};
+
+    fn event(pid: i32, s: &str, o: &str, perm: Permission, t: i64) -> Event {
+        Event {
+            rule_id: 1,
+            dec: Allow,
+            perm,
+            uid: 0,
+            gid: vec![0],
+            pid,
+            subj: Subject::from_exe(s),
+            obj: Object::from_path(o),
+            when: Some(DateTime::from_utc(NaiveDateTime::from_timestamp(t, 0), Utc)),
+        }
+    }
+
+    fn db() -> DB {
+        DB::from(vec![
+            event(7, "/bin/bash", "/etc/profile", Permission::Open, 1),
+            event(7, "/bin/bash", "/usr/bin/ls", Permission::Execute, 2),
+            event(
+                7,
+                "/usr/bin/ls",
+                "/usr/lib64/libc.so.6",
+                Permission::Open,
+                3,
+            ),
+            // same pid, new exe that was never executed: reused
+            event(7, "/usr/bin/cat", "/etc/hosts", Permission::Open, 4),
+            // quiet for too long: reused
+            event(7, "/usr/bin/cat", "/etc/hosts", Permission::Open, 1000),
+            event(8, "/bin/sh", "/etc/hosts", Permission::Open, 5),
+        ])
+    }
+
+    #[test]
+    fn pid_index() {
+        let db = db();
+        assert_eq!(db.pids().count(), 2);
+        assert_eq!(db.find(&Perspective::Pid(7)).len(), 5);
+        assert_eq!(db.find(&Perspective::Pid(8)).len(), 1);
+        assert!(db.find(&Perspective::Pid(9)).is_empty());
+    }
+
+    #[test]
+    fn exec_chains_and_reuse() {
+        let db = db();
+        let ps = processes(&db, 7, &Window::default(), REUSE_GAP);
+        assert_eq!(ps.len(), 3);
+
+        let chain: Vec<&str> = ps[0].execs.iter().map(|id| db.path(*id)).collect();
+        assert_eq!(chain, vec!["/bin/bash", "/usr/bin/ls"]);
+        assert_eq!(ps[0].ids.len(), 3);
+        assert_eq!((ps[0].first, ps[0].last), (Some(1), Some(3)));
+
+        assert_eq!(db.path(ps[1].exe()), "/usr/bin/cat");
+        assert_eq!((ps[1].first, ps[2].first), (Some(4), Some(1000)));
+
+        // a wider gap joins the last two
+        assert_eq!(processes(&db, 7, &Window::default(), 5000).len(), 2);
+        assert_eq!(
+            processes(&db, 7, &Window::new(Some(500), None), REUSE_GAP).len(),
+            1
+        );
+        assert!(processes(&db, 9, &Window::default(), REUSE_GAP).is_empty());
+    }
+}
@@ -6,32 +6,961 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use std::fmt;
 use std::fs::File;
 use std::io;
-use std::io::{BufRead, BufReader};
+use std::io::{Read, Seek, SeekFrom};
+use std::os::unix::fs::MetadataExt;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{Mutex, MutexGuard};
+use std::time::Duration;
+
+use memchr::{memchr, memchr_iter, memrchr};
+use rayon::prelude::*;
 
 use crate::error::Error;
+use crate::events::audit;
+use crate::events::audit::Correlator;
+use crate::events::db::Window;
 use crate::events::event::Event;
-use crate::events::parse::parse_event;
+use crate::events::parse::{parse_event, reason, rfc3339_date};
+use crate::events::source;
+use crate::events::source::Compression;
+
+// size of the blocks that are read and handed to the parser threads
+const CHUNK_SIZE: usize = 4 * 1024 * 1024;
+// a time seek stops narrowing once the byte range is this small
+const SEEK_SPAN: u64 = 64 * 1024;
+// number of audited decisions whose records can be awaited at once
+const AUDIT_WINDOW: usize = 4096;
+
+/// Formats of the logs that events are read from
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Format {
+    Debug,
+    Syslog,
+}
+
+impl Format {
+    fn predicate(&self) -> fn(&[u8]) -> bool {
+        match self {
+            Format::Debug => is_debug_line,
+            Format::Syslog => is_syslog_line,
+        }
+    }
+}
+
+// number of rejected lines that are kept as samples, and the bytes kept of each
+const REJECT_SAMPLES: usize = 16;
+const REJECT_LINE_LEN: usize = 256;
+
+/// A line that passed the prefilter but failed to parse, with the reason
+#[derive(Clone, Debug, PartialEq)]
+pub struct Reject {
+    pub line: String,
+    pub reason: String,
+}
+
+/// Accounting of the lines of a read; how many were read, how many passed the
+/// prefilter of the log format, and how many of those were parsed or rejected.
+/// A bounded sample of the rejected lines is kept to show why they failed.
+#[derive(Clone, Debug, Default, PartialEq)]
+pub struct Stats {
+    pub bytes: u64,
+    pub lines: u64,
+    pub matched: u64,
+    pub parsed: u64,
+    pub rejected: u64,
+    pub rejects: Vec<Reject>,
+    pub elapsed: Duration,
+}
+
+impl Stats {
+    /// Bytes read per second
+    pub fn rate(&self) -> f64 {
+        match self.elapsed.as_secs_f64() {
+            s if s > 0.0 => self.bytes as f64 / s,
+            _ => 0.0,
+        }
+    }
+
+    /// Add the counts of another read, keeping samples up to the bound
+    fn merge(&mut self, s: Stats) {
+        self.bytes += s.bytes;
+        self.lines += s.lines;
+        self.matched += s.matched;
+        self.parsed += s.parsed;
+        self.rejected += s.rejected;
+        let room = REJECT_SAMPLES.saturating_sub(self.rejects.len());
+        self.rejects.extend(s.rejects.into_iter().take(room));
+    }
+
+    fn reject(&mut self, line: &[u8], reason: String) {
+        self.rejected += 1;
+        if self.rejects.len() < REJECT_SAMPLES {
+            let line = &line[..line.len().min(REJECT_LINE_LEN)];
+            self.rejects.push(Reject {
+                line: String::from_utf8_lossy(line).to_string(),
+                reason,
+            });
+        }
+    }
+}
+
+impl fmt::Display for Stats {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        write!(
+            f,
+            "{} lines ({} bytes) in {:.3}s at {:.0} bytes/s; {} matched, {} parsed, {} rejected",
+            self.lines,
+            self.bytes,
+            self.elapsed.as_secs_f64(),
+            self.rate(),
+            self.matched,
+            self.parsed,
+            self.rejected
+        )
+    }
+}
+
+/// Progress of a read that is shared with the thread watching it.
+/// Bytes and lines are counted as the blocks are parsed, and the read
+/// stops at the next block once it is cancelled. The lines that were
+/// parsed and rejected are accounted for as well.
+#[derive(Debug, Default)]
+pub struct Progress {
+    bytes: AtomicU64,
+    lines: AtomicU64,
+    matched: AtomicU64,
+    parsed: AtomicU64,
+    rejected: AtomicU64,
+    rejects: Mutex<Vec<Reject>>,
+    cancelled: AtomicBool,
+}
+
+impl Progress {
+    /// Number of bytes parsed so far
+    pub fn bytes(&self) -> u64 {
+        self.bytes.load(Ordering::Relaxed)
+    }
+
+    /// Number of lines parsed so far
+    pub fn lines(&self) -> u64 {
+        self.lines.load(Ordering::Relaxed)
+    }
+
+    pub fn cancel(&self) {
+        self.cancelled.store(true, Ordering::Relaxed);
+    }
+
+    pub fn is_cancelled(&self) -> bool {
+        self.cancelled.load(Ordering::Relaxed)
+    }
+
+    /// Statistics of the reads so far, which took the elapsed time
+    pub fn stats(&self, elapsed: Duration) -> Stats {
+        Stats {
+            bytes: self.bytes(),
+            lines: self.lines(),
+            matched: self.matched.load(Ordering::Relaxed),
+            parsed: self.parsed.load(Ordering::Relaxed),
+            rejected: self.rejected.load(Ordering::Relaxed),
+            rejects: self.lock_rejects().clone(),
+            elapsed,
+        }
+    }
+
+    fn check(&self) -> Result<(), Error> {
+        if self.is_cancelled() {
+            Err(Error::Cancelled)
+        } else {
+            Ok(())
+        }
+    }
+
+    fn add(&self, s: Stats) {
+        self.bytes.fetch_add(s.bytes, Ordering::Relaxed);
+        self.lines.fetch_add(s.lines, Ordering::Relaxed);
+        self.matched.fetch_add(s.matched, Ordering::Relaxed);
+        self.parsed.fetch_add(s.parsed, Ordering::Relaxed);
+        self.rejected.fetch_add(s.rejected, Ordering::Relaxed);
+        if !s.rejects.is_empty() {
+            let mut rejects = self.lock_rejects();
+            let room = REJECT_SAMPLES.saturating_sub(rejects.len());
+            rejects.extend(s.rejects.into_iter().take(room));
+        }
+    }
+
+    fn lock_rejects(&self) -> MutexGuard<'_, Vec<Reject>> {
+        self.rejects.lock().unwrap_or_else(|e| e.into_inner())
+    }
+}
+
+/// Incremental reader of a log that remembers the identity of the file
+/// and the offset it has been read up to. Only whole lines are consumed.
+#[derive(Clone, Debug)]
+pub struct Tail {
+    pub format: Format,
+    pub path: String,
+    dev: u64,
+    ino: u64,
+    offset: u64,
+}
+
+impl Tail {
+    pub fn new(format: Format, path: &str) -> Self {
+        Tail {
+            format,
+            path: path.to_string(),
+            dev: 0,
+            ino: 0,
+            offset: 0,
+        }
+    }
+
+    /// Resume a tail at an offset into the file with the identity
+    pub(crate) fn resume(format: Format, path: &str, dev: u64, ino: u64, offset: u64) -> Self {
+        Tail {
+            format,
+            path: path.to_string(),
+            dev,
+            ino,
+            offset,
+        }
+    }
+
+    /// Byte offset that has been read up to
+    pub fn offset(&self) -> u64 {
+        self.offset
+    }
+
+    /// Position the tail at the first line stamped at or after the time,
+    /// so that the next read skips the older part of the log.
+    /// The position is conservative, earlier lines may still be returned.
+    pub fn seek(&mut self, t: i64) -> Result<(), Error> {
+        let mut f = File::open(&self.path)?;
+        let m = f.metadata()?;
+        self.dev = m.dev();
+        self.ino = m.ino();
+        self.offset = seek_time(&mut f, m.len(), t)?.0;
+        Ok(())
+    }
+
+    /// Read the events that were appended since the last read.
+    /// When the file was rotated or truncated it is read from the beginning.
+    /// A last line without a newline may still be being written, so it is left
+    /// to be read once it is complete.
+    pub fn read(&mut self) -> Result<Vec<Event>, Error> {
+        self.read_with(None)
+    }
+
+    /// Read the appended events, reporting to the progress when one is given
+    pub fn read_with(&mut self, progress: Option<&Progress>) -> Result<Vec<Event>, Error> {
+        let mut f = File::open(&self.path)?;
+        let m = f.metadata()?;
+        if (m.dev(), m.ino()) != (self.dev, self.ino) || m.len() < self.offset {
+            self.dev = m.dev();
+            self.ino = m.ino();
+            self.offset = 0;
+        }
+        if m.len() == self.offset {
+            return Ok(vec![]);
+        }
+
+        f.seek(SeekFrom::Start(self.offset))?;
+        let predicate = self.format.predicate();
+        let (events, consumed) = from_reader(f, predicate, CHUNK_SIZE, false, progress)?;
+        self.offset += consumed;
+        Ok(events)
+    }
+
+    /// Parse what follows the offset, such as a last line without a newline,
+    /// without consuming it
+    pub fn peek(&self) -> Result<Vec<Event>, Error> {
+        let mut f = File::open(&self.path)?;
+        f.seek(SeekFrom::Start(self.offset))?;
+        Ok(from_reader(f, self.format.predicate(), CHUNK_SIZE, true, None)?.0)
+    }
+}
 
 pub fn from_debug(path: &str) -> Result<Vec<Event>, Error> {
-    from_file(path, |s| !s.is_empty() && !s.starts_with('#'))
+    from_debug_with(path, None)
+}
+
+/// Read the events of a debug log, reporting to the progress when one is given
+pub fn from_debug_with(path: &str, progress: Option<&Progress>) -> Result<Vec<Event>, Error> {
+    from_file(path, is_debug_line, progress)
 }
 
 pub fn from_syslog(path: &str) -> Result<Vec<Event>, Error> {
-    from_file(path, |s| s.contains("fapolicyd") && s.contains("rule="))
-}
-
-fn from_file<P>(path: &str, predicate: P) -> Result<Vec<Event>, Error>
-where
-    P: FnMut(&&String) -> bool,
-{
-    let buff = BufReader::new(File::open(path)?);
-    let lines: Result<Vec<String>, io::Error> = buff.lines().collect();
-    Ok(lines?
-        .iter()
-        .filter(predicate)
-        // todo;; should log the failures here instead of just flattening
-        .flat_map(|l| parse_event(l).map(|r| r.1))
-        .collect())
+    from_file(path, is_syslog_line, None)
+}
+
+/// Read only the part of a syslog that falls in the window by seeking on
+/// the RFC3339 timestamps that start each line. Lines that are not stamped
+/// at the start make the seek fall back to reading more of the file.
+pub fn from_syslog_window(path: &str, w: &Window) -> Result<Vec<Event>, Error> {
+    syslog_window(path, w, None)
+}
+
+fn syslog_window(path: &str, w: &Window, p: Option<&Progress>) -> Result<Vec<Event>, Error> {
+    let mut f = File::open(path)?;
+    let len = f.metadata()?.len();
+    let start = match w.start {
+        Some(t) => seek_time(&mut f, len, t)?.0,
+        None => 0,
+    };
+    let end = match w.stop {
+        Some(t) => {
+            let (_, hi) = seek_time(&mut f, len, t.saturating_add(1))?;
+            line_at(&mut f, hi)?.0.min(len)
+        }
+        None => len,
+    };
+    if end <= start {
+        return Ok(vec![]);
+    }
+
+    f.seek(SeekFrom::Start(start))?;
+    let (mut events, _) = from_reader(f.take(end - start), is_syslog_line, CHUNK_SIZE, true, p)?;
+    events.retain(|e| w.contains(e));
+    Ok(events)
+}
+
+/// Read the syslog events at or after the time from the rotated logs and the
+/// live log. Rotated logs that end before the time are skipped without reading.
+/// Returns the events and a tail positioned at the end of the live log.
+pub fn from_syslog_since(path: &str, t: i64) -> Result<(Vec<Event>, Tail), Error> {
+    let w = Window::new(Some(t), None);
+    let mut events = from_rotated_since(path, t)?;
+
+    let mut tail = Tail::new(Format::Syslog, path);
+    tail.seek(t)?;
+    events.extend(tail.read()?.into_iter().filter(|e| w.contains(e)));
+    Ok((events, tail))
+}
+
+/// Read the syslog events at or after the time from the rotated logs only
+pub fn from_rotated_since(path: &str, t: i64) -> Result<Vec<Event>, Error> {
+    from_rotated_since_with(path, t, None)
+}
+
+/// Read the events of the rotated logs, reporting to the progress when one is given
+pub fn from_rotated_since_with(
+    path: &str,
+    t: i64,
+    progress: Option<&Progress>,
+) -> Result<Vec<Event>, Error> {
+    let rotated = source::rotated(path)?;
+    let mut keep = vec![];
+    for (i, p) in rotated.iter().enumerate() {
+        // a rotated log ends where the next one begins
+        let next = rotated.get(i + 1).map(|n| n.as_path());
+        match source::first_time(next.unwrap_or_else(|| Path::new(path))) {
+            Ok(Some(n)) if n < t => continue,
+            _ => keep.push(p.clone()),
+        }
+    }
+    from_syslogs_with(&keep, &Window::new(Some(t), None), progress)
+}
+
+/// Read the syslog events in the window from a set of logs, which may be
+/// compressed. The logs are decompressed and parsed in parallel and their
+/// events merged in time order.
+pub fn from_syslogs(paths: &[PathBuf], w: &Window) -> Result<Vec<Event>, Error> {
+    from_syslogs_with(paths, w, None)
+}
+
+/// Read the events of a set of syslogs, reporting to the progress when one is given
+pub fn from_syslogs_with(
+    paths: &[PathBuf],
+    w: &Window,
+    p: Option<&Progress>,
+) -> Result<Vec<Event>, Error> {
+    source::check(paths)?;
+    let parsed: Vec<Vec<Event>> = paths
+        .par_iter()
+        .map(|path| from_syslog_file(path, w, p))
+        .collect::<Result<_, _>>()?;
+    let mut events: Vec<Event> = parsed.into_iter().flatten().collect();
+    // each log is already in time order, the stable sort merges the runs
+    events.sort_by_key(|e| e.when);
+    Ok(events)
+}
+
+fn from_syslog_file(path: &Path, w: &Window, p: Option<&Progress>) -> Result<Vec<Event>, Error> {
+    match Compression::of(path) {
+        Compression::None => syslog_window(&path.to_string_lossy(), w, p),
+        _ => {
+            let (mut events, _) =
+                from_reader(source::open(path)?, is_syslog_line, CHUNK_SIZE, true, p)?;
+            events.retain(|e| w.contains(e));
+            Ok(events)
+        }
+    }
+}
+
+/// Read the decisions that fapolicyd logged to an audit log, which may be compressed.
+/// A decision is a FANOTIFY record followed by the SYSCALL, CWD and PATH records of
+/// the access, all sharing a serial. The records are parsed in parallel blocks and
+/// then correlated in log order, awaiting at most AUDIT_WINDOW decisions at once.
+pub fn from_auditlog(path: &str) -> Result<Vec<Event>, Error> {
+    from_auditlog_with(path, None)
+}
+
+/// Read the decisions of an audit log, reporting to the progress when one is given.
+/// The records of decisions are counted as matched lines, the complete decisions
+/// as parsed, and the decisions that were missing records as rejected.
+pub fn from_auditlog_with(path: &str, progress: Option<&Progress>) -> Result<Vec<Event>, Error> {
+    let r = source::open(Path::new(path))?;
+    from_audit_reader(r, CHUNK_SIZE, AUDIT_WINDOW, progress)
+}
+
+fn from_audit_reader<R: Read>(
+    mut r: R,
+    chunk_size: usize,
+    window: usize,
+    progress: Option<&Progress>,
+) -> Result<Vec<Event>, Error> {
+    let threads = rayon::current_num_threads().max(1);
+    let mut carry = vec![];
+    let mut correlator = Correlator::new(window);
+    let mut events = vec![];
+    loop {
+        if let Some(p) = progress {
+            p.check()?;
+        }
+        let mut chunks = Vec::with_capacity(threads);
+        while chunks.len() < threads {
+            match next_chunk(&mut r, &mut carry, chunk_size)? {
+                Some(c) => chunks.push(c),
+                None => break,
+            }
+        }
+        if chunks.is_empty() {
+            break;
+        }
+        let parsed: Vec<Vec<audit::Record>> =
+            chunks.par_iter().map(|c| audit::parse_records(c)).collect();
+        let records: usize = parsed.iter().map(|rs| rs.len()).sum();
+        let dropped = correlator.dropped();
+        let before = events.len();
+        // records are correlated in the order they were logged
+        events.extend(
+            parsed
+                .into_iter()
+                .flatten()
+                .filter_map(|r| correlator.add(r)),
+        );
+        if let Some(p) = progress {
+            let lines: usize = chunks
+                .par_iter()
+                .map(|c| memchr_iter(b'\n', c).count())
+                .sum();
+            p.add(Stats {
+                bytes: chunks.iter().map(|c| c.len() as u64).sum(),
+                lines: lines as u64,
+                matched: records as u64,
+                parsed: (events.len() - before) as u64,
+                rejected: (correlator.dropped() - dropped) as u64,
+                ..Stats::default()
+            });
+        }
+    }
+    let dropped = correlator.dropped();
+    correlator.finish();
+    if let Some(p) = progress {
+        // decisions still awaiting records at the end of the log are incomplete
+        p.add(Stats {
+            rejected: (correlator.dropped() - dropped) as u64,
+            ..Stats::default()
+        });
+    }
+    // decisions complete out of order when their records are interleaved
+    events.sort_by_key(|e| e.when);
+    Ok(events)
+}
+
+/// Binary search a time ordered log for the first line stamped at or after t.
+/// Returns offsets (lo, hi) that bracket that line, lo is a line start, lines
+/// before lo are older and lines starting from hi on are not. The range is
+/// narrowed to SEEK_SPAN, or left wider when an unstamped line is hit.
+fn seek_time(f: &mut File, len: u64, t: i64) -> io::Result<(u64, u64)> {
+    let (mut lo, mut hi) = (0, len);
+    while hi - lo > SEEK_SPAN {
+        let mid = lo + (hi - lo) / 2;
+        match line_at(f, mid)? {
+            (start, Some(ts)) if start < hi && ts < t => lo = start,
+            (start, Some(_)) if start < hi => hi = start,
+            (start, None) if start < hi => break,
+            // no line starts between mid and hi
+            _ => hi = mid,
+        }
+    }
+    Ok((lo, hi))
+}
+
+/// Find the first line that starts at or after pos, returning its offset and
+/// the timestamp at the start of the line when there is one
+fn line_at(f: &mut File, pos: u64) -> io::Result<(u64, Option<i64>)> {
+    let mut buf = [0u8; 4096];
+    let mut start = pos;
+    if pos > 0 {
+        // a line starts at pos when the byte before it is a newline
+        let mut off = pos - 1;
+        f.seek(SeekFrom::Start(off))?;
+        loop {
+            let n = read_some(f, &mut buf)?;
+            if n == 0 {
+                return Ok((off, None));
+            }
+            if let Some(i) = memchr(b'\n', &buf[..n]) {
+                start = off + i as u64 + 1;
+                break;
+            }
+            off += n as u64;
+        }
+    }
+
+    f.seek(SeekFrom::Start(start))?;
+    let n = read_some(f, &mut buf[..64])?;
+    let head = match std::str::from_utf8(&buf[..n]) {
+        Ok(s) => s,
+        Err(e) => std::str::from_utf8(&buf[..e.valid_up_to()]).unwrap_or_default(),
+    };
+    Ok((start, rfc3339_date(head).ok().map(|(_, t)| t.timestamp())))
+}
+
+fn read_some(f: &mut File, buf: &mut [u8]) -> io::Result<usize> {
+    loop {
+        match f.read(buf) {
+            Err(e) if e.kind() == io::ErrorKind::Interrupted => continue,
+            r => return r,
+        }
+    }
+}
+
+fn is_debug_line(l: &[u8]) -> bool {
+    !l.is_empty() && l[0] != b'#'
+}
+
+fn is_syslog_line(l: &[u8]) -> bool {
+    contains(l, b"rule=") && contains(l, b"fapolicyd")
+}
+
+/// memchr accelerated substring check
+fn contains(haystack: &[u8], needle: &[u8]) -> bool {
+    memchr_iter(needle[0], haystack).any(|i| haystack[i..].starts_with(needle))
+}
+
+fn from_file(
+    path: &str,
+    predicate: fn(&[u8]) -> bool,
+    progress: Option<&Progress>,
+) -> Result<Vec<Event>, Error> {
+    Ok(from_reader(File::open(path)?, predicate, CHUNK_SIZE, true, progress)?.0)
+}
+
+/// Stream lines from the reader in blocks of whole lines, parsing a window of
+/// blocks in parallel. Memory use beyond the parsed events is bounded by the
+/// chunk size and the number of parser threads.
+/// Returns the events and the number of bytes consumed; a trailing line without
+/// a newline is only consumed when partial is set.
+/// A progress is updated after each window of blocks, and a cancelled progress
+/// ends the read with an error.
+fn from_reader<R: Read>(
+    mut r: R,
+    predicate: fn(&[u8]) -> bool,
+    chunk_size: usize,
+    partial: bool,
+    progress: Option<&Progress>,
+) -> Result<(Vec<Event>, u64), Error> {
+    let window = rayon::current_num_threads().max(1);
+    let mut carry = vec![];
+    let mut events = vec![];
+    let mut consumed = 0;
+    loop {
+        if let Some(p) = progress {
+            p.check()?;
+        }
+        let mut chunks = Vec::with_capacity(window);
+        while chunks.len() < window {
+            match next_chunk(&mut r, &mut carry, chunk_size)? {
+                Some(c) => chunks.push(c),
+                None => break,
+            }
+        }
+        if !partial {
+            // only the final chunk can end without a newline
+            if let Some(last) = chunks.last_mut() {
+                if last.last() != Some(&b'\n') {
+                    let keep = memrchr(b'\n', last).map(|i| i + 1).unwrap_or(0);
+                    last.truncate(keep);
+                }
+            }
+        }
+        if chunks.iter().all(|c| c.is_empty()) {
+            break;
+        }
+        let bytes = chunks.iter().map(|c| c.len() as u64).sum::<u64>();
+        consumed += bytes;
+        let parsed: Vec<(Vec<Event>, Stats)> = chunks
+            .par_iter()
+            .map(|c| parse_chunk(c, predicate))
+            .collect();
+        let mut stats = Stats {
+            bytes,
+            ..Stats::default()
+        };
+        for (es, s) in parsed {
+            events.extend(es);
+            stats.merge(s);
+        }
+        if let Some(p) = progress {
+            p.add(stats);
+        }
+    }
+    Ok((events, consumed))
+}
+
+/// Read the next block of whole lines, carrying a trailing partial line over to the next read
+fn next_chunk<R: Read>(
+    r: &mut R,
+    carry: &mut Vec<u8>,
+    chunk_size: usize,
+) -> io::Result<Option<Vec<u8>>> {
+    let mut buf = std::mem::take(carry);
+    let mut filled = buf.len();
+    buf.resize(filled + chunk_size, 0);
+    loop {
+        let n = match r.read(&mut buf[filled..]) {
+            Ok(n) => n,
+            Err(e) if e.kind() == io::ErrorKind::Interrupted => continue,
+            Err(e) => return Err(e),
+        };
+        filled += n;
+        if n == 0 {
+            buf.truncate(filled);
+            return Ok(if buf.is_empty() { None } else { Some(buf) });
+        }
+        if filled == buf.len() {
+            match memrchr(b'\n', &buf) {
+                Some(i) => {
+                    carry.extend_from_slice(&buf[i + 1..]);
+                    buf.truncate(i + 1);
+                    return Ok(Some(buf));
+                }
+                // a single line longer than the chunk, keep reading
+                None => buf.resize(filled + chunk_size, 0),
+            }
+        }
+    }
+}
+
+/// Parse the lines of a block that pass the predicate, accounting for the
+/// lines read and those that were parsed or rejected
+fn parse_chunk(chunk: &[u8], predicate: fn(&[u8]) -> bool) -> (Vec<Event>, Stats) {
+    let mut events = vec![];
+    let mut stats = Stats::default();
+    let mut rem = chunk;
+    while !rem.is_empty() {
+        let (line, next) = match memchr(b'\n', rem) {
+            Some(i) => (&rem[..i], &rem[i + 1..]),
+            None => (rem, &rem[rem.len()..]),
+        };
+        rem = next;
+        stats.lines += 1;
+
+        let line = line.strip_suffix(b"\r").unwrap_or(line);
+        if !predicate(line) {
+            continue;
+        }
+        stats.matched += 1;
+        match std::str::from_utf8(line).map(parse_event) {
+            Ok(Ok((_, e))) => {
+                events.push(e);
+                stats.parsed += 1;
+            }
+            Ok(Err(e)) => stats.reject(line, reason(e)),
+            Err(e) => stats.reject(line, format!("invalid utf-8 at byte {}", e.valid_up_to())),
+        }
+    }
+    (events, stats)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::fs;
+    use std::fs::OpenOptions;
+    use std::io::{Cursor, Write};
+
+    const EVENT: &str = "rule=9 dec=allow perm=execute uid=1003 gid=999 pid=5555 exe=/usr/bin/bash : path=/usr/bin/vi ftype=application/x-executable";
+
+    fn syslog(n: usize) -> String {
+        (0..n)
+            .map(|i| {
+                format!(
+                    "2021-12-28T11:59:09.388568+00:00 fedora fapolicyd[{}]: {}\nfedora kernel: noise\n",
+                    i, EVENT
+                )
+            })
+            .collect()
+    }
+
+    #[test]
+    fn substring() {
+        assert!(contains(b"fedora fapolicyd[1]: rule=1", b"rule="));
+        assert!(contains(b"rule=", b"rule="));
+        assert!(!contains(b"fedora rul", b"rule="));
+        assert!(!contains(b"", b"rule="));
+    }
+
+    #[test]
+    fn chunk_boundaries() {
+        let log = syslog(100);
+        for chunk_size in &[1, 16, 100, 1024, CHUNK_SIZE] {
+            let es = from_reader(Cursor::new(&log), is_syslog_line, *chunk_size, true, None)
+                .unwrap()
+                .0;
+            assert_eq!(es.len(), 100);
+        }
+    }
+
+    #[test]
+    fn no_trailing_newline() {
+        let log = format!("{}\r\n{}", EVENT, EVENT);
+        let (es, _) = from_reader(Cursor::new(&log), is_debug_line, 32, true, None).unwrap();
+        assert_eq!(es.len(), 2);
+    }
+
+    #[test]
+    fn filter_debug_lines() {
+        let log = format!("# comment\n\n{}\nnot an event\n", EVENT);
+        let (es, _) =
+            from_reader(Cursor::new(&log), is_debug_line, CHUNK_SIZE, true, None).unwrap();
+        assert_eq!(es.len(), 1);
+    }
+
+    #[test]
+    fn whole_lines_only() {
+        let log = format!("{}\n{}", EVENT, &EVENT[..20]);
+        for chunk_size in &[16, CHUNK_SIZE] {
+            let (es, n) =
+                from_reader(Cursor::new(&log), is_debug_line, *chunk_size, false, None).unwrap();
+            assert_eq!(es.len(), 1);
+            assert_eq!(n as usize, EVENT.len() + 1);
+        }
+    }
+
+    #[test]
+    fn progress_and_cancel() {
+        let log = format!("# comment\n{}\n{}\n", EVENT, EVENT);
+        let p = Progress::default();
+        let (es, n) = from_reader(Cursor::new(&log), is_debug_line, 32, true, Some(&p)).unwrap();
+        assert_eq!(es.len(), 2);
+        assert_eq!((p.bytes(), p.lines()), (n, 3));
+
+        p.cancel();
+        let r = from_reader(Cursor::new(&log), is_debug_line, 32, true, Some(&p));
+        assert!(matches!(r, Err(Error::Cancelled)));
+    }
+
+    #[test]
+    fn parse_failures_are_accounted() {
+        let bad = EVENT.replace("perm=execute", "perm=launch");
+        let log = format!("# comment\n{}\n{}\n{}\n", EVENT, bad, bad);
+        for chunk_size in &[32, CHUNK_SIZE] {
+            let p = Progress::default();
+            let (es, n) = from_reader(
+                Cursor::new(&log),
+                is_debug_line,
+                *chunk_size,
+                true,
+                Some(&p),
+            )
+            .unwrap();
+            assert_eq!(es.len(), 1);
+
+            let s = p.stats(Duration::from_secs(2));
+            assert_eq!((s.bytes, s.lines), (n, 4));
+            assert_eq!((s.matched, s.parsed, s.rejected), (3, 1, 2));
+            assert_eq!(s.rejects.len(), 2);
+            assert_eq!(s.rejects[0].line, bad);
+            assert!(!s.rejects[0].reason.is_empty());
+            assert_eq!(s.rate(), n as f64 / 2.0);
+        }
+
+        // only a bounded sample of the rejects is kept
+        let log = format!("{}\n", bad).repeat(REJECT_SAMPLES * 2);
+        let p = Progress::default();
+        from_reader(Cursor::new(&log), is_debug_line, 64, true, Some(&p)).unwrap();
+        let s = p.stats(Duration::default());
+        assert_eq!(s.rejected as usize, REJECT_SAMPLES * 2);
+        assert_eq!(s.rejects.len(), REJECT_SAMPLES);
+    }
+
+    #[test]
+    fn audit_decisions() {
+        let log = "\
+type=FANOTIFY msg=audit(1635790373.683:13386): resp=2 fan_type=1 fan_info=11 subj_trust=2 obj_trust=2
+type=SYSCALL msg=audit(1635790373.683:13386): arch=c000003e syscall=59 success=no exit=-13 ppid=1 pid=77 auid=0 uid=0 gid=0 comm=\"ls\" exe=\"/bin/bash\" key=(null)
+type=USER_LOGIN msg=audit(1635790373.690:13390): pid=1 uid=0 res=success
+type=CWD msg=audit(1635790373.683:13386): cwd=\"/\"
+type=PATH msg=audit(1635790373.683:13386): item=0 name=\"/usr/bin/ls\" inode=2 nametype=NORMAL
+type=PATH msg=audit(1635790373.683:13386): item=1 name=\"/lib64/ld-linux-x86-64.so.2\" nametype=NORMAL
+type=PROCTITLE msg=audit(1635790373.683:13386): proctitle=6C73
+";
+        for chunk_size in &[64, CHUNK_SIZE] {
+            let es = from_audit_reader(Cursor::new(log), *chunk_size, AUDIT_WINDOW, None).unwrap();
+            assert_eq!(es.len(), 1);
+            assert_eq!(es[0].perm, fapolicy_rules::Permission::Execute);
+            assert_eq!(es[0].dec, fapolicy_rules::Decision::DenyAudit);
+            assert_eq!(es[0].obj.path().unwrap(), "/usr/bin/ls");
+            assert_eq!(es[0].when.unwrap().timestamp_millis(), 1635790373683);
+        }
+    }
+
+    #[test]
+    fn tail_appended_and_rotated() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("messages");
+        let p = path.to_str().unwrap();
+        let mut tail = Tail::new(Format::Syslog, p);
+
+        fs::write(&path, syslog(2)).unwrap();
+        assert_eq!(tail.read().unwrap().len(), 2);
+        assert_eq!(tail.read().unwrap().len(), 0);
+
+        // append a line and a half
+        let mut f = OpenOptions::new().append(true).open(&path).unwrap();
+        let more = syslog(2);
+        let half = more.len() / 2 + 10;
+        f.write_all(more[..half].as_bytes()).unwrap();
+        assert_eq!(tail.read().unwrap().len(), 1);
+        f.write_all(more[half..].as_bytes()).unwrap();
+        assert_eq!(tail.read().unwrap().len(), 1);
+        assert_eq!(tail.offset(), fs::metadata(&path).unwrap().len());
+
+        // rotate, the new file has a different inode
+        fs::rename(&path, dir.path().join("messages-1")).unwrap();
+        fs::write(&path, syslog(3)).unwrap();
+        assert_eq!(tail.read().unwrap().len(), 3);
+    }
+
+    // one event per second from the time, with a noise line between events
+    fn timed_syslog(from: i64, n: usize) -> String {
+        (0..n as i64)
+            .map(|i| {
+                let t = chrono::NaiveDateTime::from_timestamp(from + i, 0);
+                format!(
+                    "{}.000000+00:00 fedora fapolicyd[{}]: {}\n{}.500000+00:00 fedora kernel: noise\n",
+                    t.format("%Y-%m-%dT%H:%M:%S"),
+                    i,
+                    EVENT,
+                    t.format("%Y-%m-%dT%H:%M:%S"),
+                )
+            })
+            .collect()
+    }
+
+    const T0: i64 = 1640692749;
+
+    #[test]
+    fn seek_window() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("messages");
+        let p = path.to_str().unwrap();
+        fs::write(&path, timed_syslog(T0, 5000)).unwrap();
+
+        let w = Window::new(Some(T0 + 1000), Some(T0 + 1999));
+        let es = from_syslog_window(p, &w).unwrap();
+        assert_eq!(es.len(), 1000);
+        assert_eq!(es[0].when.unwrap().timestamp(), T0 + 1000);
+        assert_eq!(es[999].when.unwrap().timestamp(), T0 + 1999);
+
+        assert_eq!(
+            from_syslog_window(p, &Window::new(Some(T0 + 4990), None))
+                .unwrap()
+                .len(),
+            10
+        );
+        assert_eq!(
+            from_syslog_window(p, &Window::new(None, Some(T0 + 9)))
+                .unwrap()
+                .len(),
+            10
+        );
+        assert!(from_syslog_window(p, &Window::new(Some(T0 + 6000), None))
+            .unwrap()
+            .is_empty());
+        assert_eq!(
+            from_syslog_window(p, &Window::new(None, None))
+                .unwrap()
+                .len(),
+            5000
+        );
+    }
+
+    #[test]
+    fn seek_unstamped_reads_all() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("messages");
+        let p = path.to_str().unwrap();
+        fs::write(&path, syslog(3000)).unwrap();
+
+        let w = Window::new(Some(T0), Some(T0 + 10));
+        assert_eq!(from_syslog_window(p, &w).unwrap().len(), 3000);
+    }
+
+    #[test]
+    fn since_across_rotations() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("messages");
+        let p = path.to_str().unwrap();
+        fs::write(dir.path().join("messages-20211226"), timed_syslog(T0, 1000)).unwrap();
+        fs::write(
+            dir.path().join("messages-20211227"),
+            timed_syslog(T0 + 1000, 1000),
+        )
+        .unwrap();
+        fs::write(dir.path().join("messages-old"), timed_syslog(T0, 1000)).unwrap();
+        fs::write(&path, timed_syslog(T0 + 2000, 1000)).unwrap();
+
+        assert_eq!(source::rotated(p).unwrap().len(), 2);
+
+        let (es, mut tail) = from_syslog_since(p, T0 + 1500).unwrap();
+        assert_eq!(es.len(), 1500);
+        assert!(es.windows(2).all(|w| w[0].when <= w[1].when));
+        assert_eq!(tail.offset(), fs::metadata(&path).unwrap().len());
+        assert!(tail.read().unwrap().is_empty());
+    }
+
+    #[test]
+    fn merge_compressed() {
+        use flate2::write::GzEncoder;
+
+        let dir = tempfile::tempdir().unwrap();
+        let gz = dir.path().join("messages-20211227.gz");
+        let mut enc = GzEncoder::new(fs::File::create(&gz).unwrap(), Default::default());
+        enc.write_all(timed_syslog(T0 + 1000, 1000).as_bytes())
+            .unwrap();
+        enc.finish().unwrap();
+        let plain = dir.path().join("messages-20211226");
+        fs::write(&plain, timed_syslog(T0, 1000)).unwrap();
+
+        let es = from_syslogs(&[gz.clone(), plain.clone()], &Window::new(None, None)).unwrap();
+        assert_eq!(es.len(), 2000);
+        assert!(es.windows(2).all(|w| w[0].when <= w[1].when));
+
+        let w = Window::new(Some(T0 + 900), Some(T0 + 1099));
+        assert_eq!(from_syslogs(&[plain, gz], &w).unwrap().len(), 200);
+    }
+
+    #[test]
+    fn empty_input() {
+        let (es, _) = from_reader(Cursor::new(""), is_syslog_line, CHUNK_SIZE, true, None).unwrap();
+        assert!(es.is_empty());
+    }
 }
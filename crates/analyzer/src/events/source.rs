@@ -0,0 +1,260 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::fs::File;
+use std::io;
+use std::io::{BufRead, BufReader, Read};
+use std::path::{Path, PathBuf};
+use std::process::{Child, ChildStdout, Command, Stdio};
+
+use flate2::read::MultiGzDecoder;
+
+use crate::error::Error;
+use crate::error::Error::{DecompressFailure, DecompressorMissing};
+use crate::events::parse::rfc3339_date;
+
+/// Compression of a log file, determined by its extension
+#[derive(Clone, Copy, Debug, PartialEq)]
+pub enum Compression {
+    None,
+    Gzip,
+    Xz,
+}
+
+impl Compression {
+    pub fn of(path: &Path) -> Self {
+        match path.extension().and_then(|e| e.to_str()) {
+            Some("gz") => Compression::Gzip,
+            Some("xz") => Compression::Xz,
+            _ => Compression::None,
+        }
+    }
+}
+
+/// Open a log file for streaming, decompressing it when needed
+pub fn open(path: &Path) -> Result<Box<dyn Read + Send>, Error> {
+    Ok(match Compression::of(path) {
+        Compression::None => Box::new(File::open(path)?),
+        Compression::Gzip => Box::new(MultiGzDecoder::new(BufReader::new(File::open(path)?))),
+        Compression::Xz => Box::new(XzReader::spawn(path)?),
+    })
+}
+
+/// Check that the logs can be decompressed before any of them is read, so that
+/// a missing xz fails the read up front rather than part way through
+pub fn check(paths: &[PathBuf]) -> Result<(), Error> {
+    if let Some(p) = paths.iter().find(|p| Compression::of(p) == Compression::Xz) {
+        let found = Command::new("xz")
+            .arg("--version")
+            .stdout(Stdio::null())
+            .stderr(Stdio::null())
+            .status()
+            .is_ok();
+        if !found {
+            return Err(DecompressorMissing(
+                "xz".to_string(),
+                p.display().to_string(),
+            ));
+        }
+    }
+    Ok(())
+}
+
+/// Find the rotated siblings of a log, named with a -YYYYMMDD suffix and
+/// optionally compressed, oldest first
+pub fn rotated(path: &str) -> Result<Vec<PathBuf>, Error> {
+    let p = Path::new(path);
+    let (dir, name) = match (p.parent(), p.file_name()) {
+        (Some(d), Some(n)) => (d, n.to_string_lossy().to_string()),
+        _ => return Ok(vec![]),
+    };
+    let prefix = format!("{}-", name);
+
+    let mut found: Vec<PathBuf> = entries(dir)?
+        .into_iter()
+        .filter(|e| {
+            let n = e.file_name().unwrap_or_default().to_string_lossy();
+            let stem = n.trim_end_matches(".gz").trim_end_matches(".xz");
+            stem.strip_prefix(&prefix)
+                .map(|d| d.len() == 8 && d.bytes().all(|b| b.is_ascii_digit()))
+                .unwrap_or(false)
+        })
+        .collect();
+    found.sort();
+    Ok(found)
+}
+
+/// Expand a pattern with * and ? wildcards in the file name, sorted by name
+pub fn glob(pattern: &str) -> Result<Vec<PathBuf>, Error> {
+    let p = Path::new(pattern);
+    let (dir, name) = match (p.parent(), p.file_name()) {
+        (Some(d), Some(n)) => (d, n.to_string_lossy().to_string()),
+        _ => return Ok(vec![]),
+    };
+    let mut found: Vec<PathBuf> = entries(dir)?
+        .into_iter()
+        .filter(|e| {
+            let n = e.file_name().unwrap_or_default().to_string_lossy();
+            wildcard(name.as_bytes(), n.as_bytes())
+        })
+        .collect();
+    found.sort();
+    Ok(found)
+}
+
+/// Timestamp at the start of the first line of a log, decompressing only that line
+pub fn first_time(path: &Path) -> Result<Option<i64>, Error> {
+    let mut line = String::new();
+    let mut r = BufReader::new(open(path)?.take(4096));
+    if r.read_line(&mut line).is_err() {
+        return Ok(None);
+    }
+    Ok(rfc3339_date(&line).ok().map(|(_, t)| t.timestamp()))
+}
+
+/// Regular files in the dir, an empty parent refers to the working dir
+fn entries(dir: &Path) -> Result<Vec<PathBuf>, Error> {
+    let dir = if dir.as_os_str().is_empty() {
+        Path::new(".")
+    } else {
+        dir
+    };
+    let mut found = vec![];
+    for entry in dir.read_dir()? {
+        let entry = entry?;
+        if entry.file_type()?.is_file() {
+            found.push(entry.path());
+        }
+    }
+    Ok(found)
+}
+
+fn wildcard(p: &[u8], s: &[u8]) -> bool {
+    match p.split_first() {
+        None => s.is_empty(),
+        Some((b'*', rest)) => (0..=s.len()).any(|i| wildcard(rest, &s[i..])),
+        Some((b'?', rest)) => !s.is_empty() && wildcard(rest, &s[1..]),
+        Some((c, rest)) => s.first() == Some(c) && wildcard(rest, &s[1..]),
+    }
+}
+
+/// Streams the output of xz, the exit status is checked at the end of the stream
+struct XzReader {
+    path: String,
+    child: Child,
+    stdout: ChildStdout,
+}
+
+impl XzReader {
+    fn spawn(path: &Path) -> Result<Self, Error> {
+        let path = path.display().to_string();
+        let mut child = Command::new("xz")
+            .args(&["-dc", &path])
+            .stdout(Stdio::piped())
+            .stderr(Stdio::null())
+            .spawn()
+            .map_err(|e| match e.kind() {
+                io::ErrorKind::NotFound => DecompressorMissing("xz".to_string(), path.clone()),
+                _ => DecompressFailure(path.clone()),
+            })?;
+        let stdout = match child.stdout.take() {
+            Some(o) => o,
+            None => return Err(DecompressFailure(path)),
+        };
+        Ok(XzReader {
+            path,
+            child,
+            stdout,
+        })
+    }
+}
+
+impl Read for XzReader {
+    fn read(&mut self, buf: &mut [u8]) -> io::Result<usize> {
+        let n = self.stdout.read(buf)?;
+        if n == 0 && !buf.is_empty() && !self.child.wait()?.success() {
+            return Err(io::Error::new(
+                io::ErrorKind::InvalidData,
+                DecompressFailure(self.path.clone()).to_string(),
+            ));
+        }
+        Ok(n)
+    }
+}
+
+impl Drop for XzReader {
+    fn drop(&mut self) {
+        // a reader dropped before the end of the stream leaves xz blocked on the pipe
+        let _ = self.child.kill();
+        let _ = self.child.wait();
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use flate2::write::GzEncoder;
+    use std::fs;
+    use std::io::Write;
+
+    #[test]
+    fn wildcards() {
+        assert!(wildcard(b"messages*", b"messages"));
+        assert!(wildcard(b"messages*", b"messages-20211228.gz"));
+        assert!(wildcard(b"messages-????????", b"messages-20211228"));
+        assert!(!wildcard(b"messages-????????", b"messages-2021122"));
+        assert!(!wildcard(b"*.gz", b"messages-20211228.xz"));
+    }
+
+    #[test]
+    fn discover_rotated() {
+        let dir = tempfile::tempdir().unwrap();
+        for n in &[
+            "messages",
+            "messages-20211227.gz",
+            "messages-20211226",
+            "messages-20211228.xz",
+            "messages-old",
+            "secure-20211226",
+        ] {
+            fs::write(dir.path().join(n), "").unwrap();
+        }
+        let live = dir.path().join("messages");
+        let names: Vec<String> = rotated(live.to_str().unwrap())
+            .unwrap()
+            .iter()
+            .map(|p| p.file_name().unwrap().to_string_lossy().to_string())
+            .collect();
+        assert_eq!(
+            names,
+            vec![
+                "messages-20211226",
+                "messages-20211227.gz",
+                "messages-20211228.xz"
+            ]
+        );
+
+        let pattern = dir.path().join("messages*");
+        assert_eq!(glob(pattern.to_str().unwrap()).unwrap().len(), 5);
+    }
+
+    #[test]
+    fn open_gzip() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("messages-20211226.gz");
+        let mut gz = GzEncoder::new(fs::File::create(&path).unwrap(), Default::default());
+        gz.write_all(b"2021-12-26T11:59:09.388568+00:00 fedora kernel: noise\n")
+            .unwrap();
+        gz.finish().unwrap();
+
+        let mut s = String::new();
+        open(&path).unwrap().read_to_string(&mut s).unwrap();
+        assert!(s.ends_with("noise\n"));
+        assert_eq!(first_time(&path).unwrap(), Some(1640519949));
+    }
+}
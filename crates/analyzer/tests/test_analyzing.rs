@@ -6,8 +6,9 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use fapolicy_analyzer::events::analysis::Analysis;
-use fapolicy_analyzer::events::db::DB as EventDB;
+use chrono::{DateTime, NaiveDateTime, Utc};
+use fapolicy_analyzer::events::analysis::{analyze_in, Analysis, StatusCode, TrustCode, TrustMemo};
+use fapolicy_analyzer::events::db::{AccessCode, Window, DB as EventDB};
 use fapolicy_analyzer::events::event::{Event, Perspective};
 use fapolicy_rules::{Decision, Object, Permission, Subject};
 use fapolicy_trust::db::{Rec, DB as TrustDB};
@@ -80,15 +81,65 @@ fn trust_status() {
     let log = vec![bash_allowed("/foo/bar", uid, 1003)];
 
     let a1 = analyze_from_user(&log, uid, &trust);
-    assert_eq!(a1.subject.trust, "U");
-    assert_eq!(a1.object.trust, "U");
+    assert_eq!(a1.subject.trust, TrustCode::Unknown);
+    assert_eq!(a1.object.trust, TrustCode::Unknown);
 
     trust.put(Rec::from_source(make_trust("/bin/bash"), System));
     trust.put(Rec::from_source(make_trust("/foo/bar"), Ancillary));
 
     let a2 = analyze_from_user(&log, uid, &trust);
-    assert_eq!(a2.subject.trust, "ST");
-    assert_eq!(a2.object.trust, "AT");
+    assert_eq!(a2.subject.trust, TrustCode::System);
+    assert_eq!(a2.object.trust, TrustCode::Ancillary);
+}
+
+#[test]
+fn memoized_trust() {
+    let mut trust = TrustDB::default();
+    trust.put(Rec::from_source(make_trust("/bin/bash"), System));
+
+    let mut memo = TrustMemo::default();
+    let v = memo.get(7, "/bin/bash", &trust).unwrap();
+    assert_eq!(v.trust, TrustCode::System);
+    assert_eq!(v.status, StatusCode::Unknown);
+    assert_eq!(
+        memo.get(2, "/foo/bar", &trust).unwrap().trust,
+        TrustCode::Unknown
+    );
+
+    // verdicts hold for the trust db they were looked up in
+    let changed = TrustDB::default();
+    assert_eq!(memo.get(7, "/bin/bash", &changed).unwrap(), v);
+    let mut memo = TrustMemo::default();
+    assert_eq!(
+        memo.get(7, "/bin/bash", &changed).unwrap().trust,
+        TrustCode::Unknown
+    );
+}
+
+#[test]
+fn memo_follows_trust_generation() {
+    let mut trust = TrustDB::default();
+    let mut memo = TrustMemo::new(1);
+    assert_eq!(
+        memo.get(0, "/bin/bash", &trust).unwrap().trust,
+        TrustCode::Unknown
+    );
+
+    // the same generation keeps its verdicts
+    trust.put(Rec::from_source(make_trust("/bin/bash"), Ancillary));
+    memo.sync(1);
+    assert_eq!(
+        memo.get(0, "/bin/bash", &trust).unwrap().trust,
+        TrustCode::Unknown
+    );
+
+    // a changed trust db is a new generation, which is looked up afresh
+    memo.sync(2);
+    assert_eq!(memo.generation(), 2);
+    assert_eq!(
+        memo.get(0, "/bin/bash", &trust).unwrap().trust,
+        TrustCode::Ancillary
+    );
 }
 
 #[test]
@@ -100,7 +151,7 @@ fn simple_subj_apd_status() {
 
     let a1 = analyze_from_user(&log, uid, &trust);
 
-    assert_eq!(a1.subject.access, "D");
+    assert_eq!(a1.subject.access, AccessCode::Denied);
 
     let mut log = vec![
         bash_allowed("/foo/bin", uid, 1003),
@@ -108,12 +159,12 @@ fn simple_subj_apd_status() {
     ];
     let a2 = analyze_from_user(&log, uid, &trust);
 
-    assert_eq!(a2.subject.access, "A");
+    assert_eq!(a2.subject.access, AccessCode::Allowed);
 
     log.push(bash_denied("/foo/bar", uid, 1003));
     let a3 = analyze_from_user(&log, uid, &trust);
 
-    assert_eq!(a3.subject.access, "P");
+    assert_eq!(a3.subject.access, AccessCode::Partial);
 }
 
 #[test]
@@ -125,10 +176,10 @@ fn simple_obj_ad_status() {
     let e2 = bash_allowed("/foo/bin", uid, 1003);
 
     let a1 = analyze_from_user(&*vec![e1], uid, &trust);
-    assert_eq!(a1.object.access, "D");
+    assert_eq!(a1.object.access, AccessCode::Denied);
 
     let a2 = analyze_from_user(&*vec![e2], uid, &trust);
-    assert_eq!(a2.object.access, "A");
+    assert_eq!(a2.object.access, AccessCode::Allowed);
 }
 
 #[test]
@@ -142,17 +193,17 @@ fn user_subj_apd_status() {
 
     let a1 = analyze_from_user(&*vec![e1.clone()], uid, &trust);
 
-    assert_eq!(a1.subject.access, "D");
+    assert_eq!(a1.subject.access, AccessCode::Denied);
 
     let mut allowed = vec![e2, e3];
     let a2 = analyze_from_user(&allowed, uid, &trust);
 
-    assert_eq!(a2.subject.access, "A");
+    assert_eq!(a2.subject.access, AccessCode::Allowed);
 
     allowed.push(e1);
     let a3 = analyze_from_user(&allowed, uid, &trust);
 
-    assert_eq!(a3.subject.access, "P");
+    assert_eq!(a3.subject.access, AccessCode::Partial);
 }
 
 #[test]
@@ -164,10 +215,10 @@ fn user_obj_ad_status() {
     let e2 = bash_allowed("/foo/bin", uid, 1003);
 
     let a1 = analyze_from_user(&*vec![e1], uid, &trust);
-    assert_eq!(a1.object.access, "D");
+    assert_eq!(a1.object.access, AccessCode::Denied);
 
     let a2 = analyze_from_user(&*vec![e2], uid, &trust);
-    assert_eq!(a2.object.access, "A");
+    assert_eq!(a2.object.access, AccessCode::Allowed);
 }
 
 #[test]
@@ -177,12 +228,12 @@ fn group_subj_apd_status_1() {
     let mut log = vec![bash_denied("/foo/bar", 1, 1003)];
     let a1 = analyze_from_group(&log, 1003, &trust);
 
-    assert_eq!(a1.subject.access, "D");
+    assert_eq!(a1.subject.access, AccessCode::Denied);
 
     log.push(bash_allowed("/foo/bar", 2, 1003));
     let a2 = analyze_from_group(&log, 1003, &trust);
 
-    assert_eq!(a2.subject.access, "P");
+    assert_eq!(a2.subject.access, AccessCode::Partial);
 }
 
 #[test]
@@ -192,17 +243,17 @@ fn group_subj_apd_status_2() {
     let mut log = vec![bash_allowed("/foo/bip", 3, 1004)];
     let a1 = analyze_from_group(&log, 1004, &trust);
 
-    assert_eq!(a1.subject.access, "A");
+    assert_eq!(a1.subject.access, AccessCode::Allowed);
 
     log.push(bash_denied("/foo/bip", 4, 1005));
     let a2 = analyze_from_group(&log, 1004, &trust);
 
-    assert_eq!(a2.subject.access, "A");
+    assert_eq!(a2.subject.access, AccessCode::Allowed);
 
     log.push(bash_denied("/foo/bip", 5, 1004));
     let a2 = analyze_from_group(&log, 1004, &trust);
 
-    assert_eq!(a2.subject.access, "P");
+    assert_eq!(a2.subject.access, AccessCode::Partial);
 }
 
 #[test]
@@ -235,3 +286,31 @@ fn subj_perspective() {
     let a = analyze_from_subject(&log, "/nada", &trust);
     assert_eq!(a.len(), 1);
 }
+
+#[test]
+fn windowed_subj_access() {
+    let trust = TrustDB::default();
+    let at = |e: Event, t: i64| Event {
+        when: Some(DateTime::from_utc(NaiveDateTime::from_timestamp(t, 0), Utc)),
+        ..e
+    };
+
+    let db = EventDB::from(vec![
+        at(bash_denied("/foo", 1, 1), 1),
+        at(bash_allowed("/foo", 1, 1), 2),
+        at(bash_allowed("/bar", 1, 1), 3),
+    ]);
+    let from = Perspective::Subject(BASH_PATH.into());
+
+    let a = analyze_in(&db, from.clone(), &Window::default(), &trust);
+    assert_eq!(a.len(), 3);
+    assert_eq!(a.first().unwrap().subject.access, AccessCode::Partial);
+
+    let a = analyze_in(&db, from.clone(), &Window::new(Some(2), None), &trust);
+    assert_eq!(a.len(), 2);
+    assert_eq!(a.first().unwrap().subject.access, AccessCode::Allowed);
+
+    let a = analyze_in(&db, from, &Window::new(None, Some(1)), &trust);
+    assert_eq!(a.len(), 1);
+    assert_eq!(a.first().unwrap().subject.access, AccessCode::Denied);
+}
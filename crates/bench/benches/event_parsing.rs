@@ -0,0 +1,86 @@
+// Copyright Concurrent Technologies Corporation 2021
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+use std::env;
+use std::fs::File;
+use std::io::{BufWriter, Write};
+use std::time::Duration;
+
+use criterion::{criterion_group, criterion_main, Criterion, Throughput};
+use tempfile::NamedTempFile;
+
+use fapolicy_analyzer::events::read;
+
+// size of the generated log, override with FAPOLICY_BENCH_LOG_MB
+const DEFAULT_LOG_MB: u64 = 2048;
+
+/// Generate a syslog where one in four lines is a fapolicyd event
+fn synthetic_syslog(mb: u64) -> NamedTempFile {
+    let f = NamedTempFile::new().expect("tempfile");
+    let mut w = BufWriter::new(File::create(f.path()).expect("create"));
+    let limit = mb * 1024 * 1024;
+    let mut written = 0;
+    let mut i: u64 = 0;
+    while written < limit {
+        let l = if i % 4 == 0 {
+            format!(
+                "2022-06-01T12:{:02}:{:02}.000000+00:00 fedora fapolicyd[{}]: rule={} dec=allow_syslog perm=execute uid={} gid={},{} pid={} exe=/usr/bin/bash : path=/usr/lib64/lib{}.so ftype=application/x-sharedlib trust=1\n",
+                (i / 60) % 60,
+                i % 60,
+                1000 + i % 32,
+                i % 20,
+                1000 + i % 50,
+                100,
+                1000 + i % 10,
+                i,
+                i % 5000,
+            )
+        } else {
+            format!(
+                "2022-06-01T12:{:02}:{:02}.000000+00:00 fedora systemd[1]: Started session {} of user {}.\n",
+                (i / 60) % 60,
+                i % 60,
+                i,
+                1000 + i % 50
+            )
+        };
+        w.write_all(l.as_bytes()).expect("write");
+        written += l.len() as u64;
+        i += 1;
+    }
+    w.flush().expect("flush");
+    f
+}
+
+fn parse_syslog(c: &mut Criterion) {
+    let mb = env::var("FAPOLICY_BENCH_LOG_MB")
+        .ok()
+        .and_then(|v| v.parse().ok())
+        .unwrap_or(DEFAULT_LOG_MB);
+    let log = synthetic_syslog(mb);
+    let path = log.path().to_string_lossy().to_string();
+
+    let mut g = c.benchmark_group("syslog");
+    g.sample_size(10);
+    g.measurement_time(Duration::from_secs(60));
+    g.throughput(Throughput::Bytes(mb * 1024 * 1024));
+    g.bench_function(format!("parse {}MB", mb), |b| {
+        b.iter(|| read::from_syslog(&path).expect("parse"))
+    });
+    g.finish();
+}
+
+criterion_group!(benches, parse_syslog);
+criterion_main!(benches);
@@ -0,0 +1,72 @@
+// Copyright Concurrent Technologies Corporation 2021
+//
+// This program is free software: you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation, either version 3 of the License, or
+// (at your option) any later version.
+//
+// This program is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+use criterion::{criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+
+use fapolicy_rules::db::{Entry, DB};
+use fapolicy_rules::linter::lint::lint_db;
+use fapolicy_rules::{Decision, DirType, ObjPart, Object, Permission, Rule, SubjPart, Subject};
+
+// policy sizes in rules
+const SIZES: &[usize] = &[1_000, 5_000, 20_000];
+
+/// Generate a policy of n rules where one in ten duplicates an earlier rule and
+/// the rest mix exe, uid and gid subjects with path and dir objects
+fn synthetic_policy(n: usize) -> DB {
+    let rule = |i: usize| {
+        let subj = match i % 3 {
+            0 => vec![SubjPart::Exe(format!("/usr/bin/tool{}", i % 500))],
+            1 => vec![SubjPart::Uid(i as u32), SubjPart::Gid((i % 50) as u32)],
+            _ => vec![SubjPart::All],
+        };
+        let obj = if i % 2 == 0 {
+            vec![ObjPart::Path(format!("/usr/lib64/lib{}.so", i))]
+        } else {
+            vec![ObjPart::Dir(DirType::Path(format!("/opt/app{}/", i % 200)))]
+        };
+        let dec = if i % 4 == 0 {
+            Decision::Deny
+        } else {
+            Decision::Allow
+        };
+        Rule::new(Subject::new(subj), Permission::Open, Object::new(obj), dec)
+    };
+    (0..n)
+        .map(|i| {
+            let r = if i % 10 == 9 { rule(i / 2) } else { rule(i) };
+            (
+                format!("{:02}-generated.rules", i / 1000),
+                Entry::ValidRule(r),
+            )
+        })
+        .collect::<Vec<_>>()
+        .into()
+}
+
+fn lint_policies(c: &mut Criterion) {
+    let mut g = c.benchmark_group("lint");
+    g.sample_size(10);
+    for n in SIZES {
+        let db = synthetic_policy(*n);
+        g.throughput(Throughput::Elements(*n as u64));
+        g.bench_with_input(BenchmarkId::new("rules", n), &db, |b, db| {
+            b.iter(|| lint_db(db.clone()))
+        });
+    }
+    g.finish();
+}
+
+criterion_group!(benches, lint_policies);
+criterion_main!(benches);
@@ -6,48 +6,135 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use std::collections::HashSet;
+use std::collections::HashMap;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::{Arc, Mutex, MutexGuard, RwLock, RwLockReadGuard};
+use std::thread;
+use std::time::Duration;
 
+use pyo3::exceptions::{PyIndexError, PyRuntimeError};
 use pyo3::prelude::*;
+use pyo3::types::PyDict;
+use pyo3::PySequenceProtocol;
 
-use fapolicy_analyzer::events::analysis::{analyze, Analysis, ObjAnalysis, SubjAnalysis};
-use fapolicy_analyzer::events::db::DB as EventDB;
-use fapolicy_analyzer::events::event::{Event, Perspective};
+use fapolicy_analyzer::error::Error;
+use fapolicy_analyzer::events::aggregate::{group_by, histogram, Field, Value};
+use fapolicy_analyzer::events::analysis::{
+    fit_ids, fit_in, verdict, StatusCode, TrustMemo, Verdict,
+};
+use fapolicy_analyzer::events::db::{Access, AccessCode, Window, DB as EventDB};
+use fapolicy_analyzer::events::event::{decision_of, perm_of, Perspective, Record};
+use fapolicy_analyzer::events::export::{self, Format};
+use fapolicy_analyzer::events::graph::{Actor, Graph, Link};
+use fapolicy_analyzer::events::lru::Lru;
+use fapolicy_analyzer::events::process::{processes, Process, REUSE_GAP};
+use fapolicy_analyzer::events::read::{Stats, Tail};
+use fapolicy_rules::Permission;
 use fapolicy_trust::db::DB as TrustDB;
 
-/// An Event parsed from a fapolicyd log
-#[pyclass(module = "log", name = "Event")]
-#[derive(Clone, Debug)]
-pub struct PyEvent {
-    rs: Analysis,
+use crate::system::PySystem;
+
+/// Shared db of an EventLog; record ids are stable, so views stay valid as it grows
+type SharedDB = Arc<RwLock<EventDB>>;
+
+fn read(db: &RwLock<EventDB>) -> RwLockReadGuard<'_, EventDB> {
+    db.read().unwrap_or_else(|e| e.into_inner())
 }
-impl From<Analysis> for PyEvent {
-    fn from(rs: Analysis) -> Self {
-        Self { rs }
-    }
+
+/// Trust db of an EventLog with the verdicts of the paths looked up in it.
+/// Each change of the trust db is a new generation, which starts the memo over;
+/// the views of the log share it, so they see the change too.
+struct TrustCheck {
+    db: RwLock<(u64, Arc<TrustDB>)>,
+    memo: Mutex<TrustMemo>,
 }
-impl From<PyEvent> for Analysis {
-    fn from(py: PyEvent) -> Self {
-        py.rs
+
+type SharedTrust = Arc<TrustCheck>;
+
+impl TrustCheck {
+    fn new(db: TrustDB, generation: u64) -> SharedTrust {
+        Arc::new(TrustCheck {
+            db: RwLock::new((generation, Arc::new(db))),
+            memo: Mutex::new(TrustMemo::new(generation)),
+        })
+    }
+
+    /// The trust db and its generation
+    fn current(&self) -> (u64, Arc<TrustDB>) {
+        let db = self.db.read().unwrap_or_else(|e| e.into_inner());
+        (db.0, db.1.clone())
+    }
+
+    fn generation(&self) -> u64 {
+        self.current().0
+    }
+
+    /// Replace the trust db with another generation of it
+    fn update(&self, db: TrustDB, generation: u64) {
+        *self.db.write().unwrap_or_else(|e| e.into_inner()) = (generation, Arc::new(db));
+    }
+
+    /// Get the verdict of a path, memoized when the path is interned in the log
+    fn verdict(&self, id: Option<u32>, path: &str) -> PyResult<Verdict> {
+        let (generation, db) = self.current();
+        let v = match id {
+            Some(id) => {
+                let mut memo = self.memo.lock().unwrap_or_else(|e| e.into_inner());
+                memo.sync(generation);
+                memo.get(id, path, &db)
+            }
+            None => verdict(path, &db),
+        };
+        v.map_err(|e| PyRuntimeError::new_err(format!("{:?}", e)))
+    }
+
+    /// A copy of the memo at a generation, to be filled without holding the lock
+    fn local_memo(&self, generation: u64) -> TrustMemo {
+        let mut memo = self.memo.lock().unwrap_or_else(|e| e.into_inner()).clone();
+        memo.sync(generation);
+        memo
+    }
+
+    /// Share the verdicts of a local memo, unless the trust changed since
+    fn share_memo(&self, memo: TrustMemo) {
+        let generation = self.generation();
+        if memo.generation() == generation {
+            *self.memo.lock().unwrap_or_else(|e| e.into_inner()) = memo;
+        }
     }
 }
 
-pub(crate) fn expand_on_gid(rs: &Analysis) -> Vec<PyEvent> {
-    let mut r = vec![];
-    for gid in &rs.event.gid {
-        let e = rs.clone().event;
-        r.push(PyEvent {
-            rs: Analysis {
-                event: Event {
-                    gid: vec![*gid],
-                    ..e
-                },
-                subject: rs.subject.clone(),
-                object: rs.object.clone(),
-            },
-        })
+fn shared_path(db: &EventDB, id: u32) -> Arc<str> {
+    db.paths()
+        .shared(id)
+        .cloned()
+        .unwrap_or_else(|| Arc::from(""))
+}
+
+/// A record as seen from a perspective, one per gid of the record
+#[derive(Clone, Copy, Debug)]
+struct Row {
+    id: u32,
+    gid: i32,
+    // access of the subject relative to the perspective
+    access: AccessCode,
+}
+
+/// An Event parsed from a fapolicyd log, a view of a record of the EventLog
+#[pyclass(module = "log", name = "Event")]
+#[derive(Clone)]
+pub struct PyEvent {
+    db: SharedDB,
+    trust: SharedTrust,
+    row: Row,
+}
+
+impl PyEvent {
+    fn with<T>(&self, f: impl FnOnce(&EventDB, &Record) -> T) -> T {
+        let db = read(&self.db);
+        let r = db.get(self.row.id).expect("record of an event view");
+        f(&db, r)
     }
-    r
 }
 
 #[pymethods]
@@ -55,81 +142,175 @@ impl PyEvent {
     /// The user id parsed from the log event
     #[getter]
     fn uid(&self) -> i32 {
-        self.rs.event.uid
+        self.with(|_, r| r.uid)
     }
 
     /// The group id parsed from the log event
     #[getter]
     fn gid(&self) -> i32 {
-        // todo;; unhack this
-        *self.rs.event.gid.get(0).unwrap()
+        self.row.gid
     }
 
     /// The fapolicyd subject parsed from the log event
     #[getter]
     fn subject(&self) -> PySubject {
-        self.rs.subject.clone().into()
+        self.with(|db, r| PySubject {
+            file: shared_path(db, r.subj),
+            id: Some(r.subj),
+            access: self.row.access,
+            trust: self.trust.clone(),
+        })
     }
 
     /// The fapolicyd object parsed from the log event
     #[getter]
     fn object(&self) -> PyObject {
-        self.rs.object.clone().into()
+        self.with(|db, r| PyObject {
+            file: shared_path(db, r.obj),
+            id: Some(r.obj),
+            access: AccessCode::of(&r.dec),
+            perm: r.perm.clone(),
+            trust: self.trust.clone(),
+        })
     }
 
     /// The fapolicyd rule_id parsed from the log event
     #[getter]
     fn rule_id(&self) -> i32 {
-        self.rs.event.rule_id
+        self.with(|_, r| r.rule_id)
     }
 
     fn when(&self) -> Option<i64> {
-        self.rs.event.when.map(|t| t.timestamp())
+        self.with(|_, r| r.when)
+    }
+
+    /// Name of the host the event was logged on, empty when it is not known
+    #[getter]
+    fn host(&self) -> String {
+        self.with(|db, r| db.host(r.host).to_string())
+    }
+
+    /// Number of times the event occurred, more than one when the log collapses duplicates
+    #[getter]
+    fn count(&self) -> usize {
+        read(&self.db).seen(self.row.id).count
+    }
+
+    /// Time the event was first seen
+    fn first_seen(&self) -> Option<i64> {
+        read(&self.db).seen(self.row.id).first
+    }
+
+    /// Time the event was last seen
+    fn last_seen(&self) -> Option<i64> {
+        read(&self.db).seen(self.row.id).last
     }
 }
 
-/// Subject metadata
-#[pyclass(module = "log", name = "Subject")]
-#[derive(Clone)]
-pub struct PySubject {
-    rs: SubjAnalysis,
+/// Events of an EventLog, a sequence of Event views that are created on access
+#[pyclass(module = "log", name = "Events")]
+pub struct PyEvents {
+    db: SharedDB,
+    trust: SharedTrust,
+    rows: Arc<Vec<Row>>,
 }
 
-impl From<SubjAnalysis> for PySubject {
-    fn from(rs: SubjAnalysis) -> Self {
-        Self { rs }
+impl PyEvents {
+    /// Expand records on their gids, keeping the rows that pass the filter
+    fn expand<F>(db: &EventDB, fit: Vec<(u32, AccessCode)>, keep: F) -> Vec<Row>
+    where
+        F: Fn(&Record, i32) -> bool,
+    {
+        let mut rows = Vec::with_capacity(fit.len());
+        for (id, access) in fit {
+            if let Some(r) = db.get(id) {
+                for gid in &r.gid {
+                    if keep(r, *gid) {
+                        rows.push(Row {
+                            id,
+                            gid: *gid,
+                            access,
+                        });
+                    }
+                }
+            }
+        }
+        rows
+    }
+
+    fn len(&self) -> usize {
+        self.rows.len()
+    }
+
+    fn get(&self, idx: isize) -> Option<PyEvent> {
+        let i = if idx < 0 {
+            self.rows.len() as isize + idx
+        } else {
+            idx
+        };
+        if i < 0 {
+            return None;
+        }
+        self.rows.get(i as usize).map(|row| PyEvent {
+            db: self.db.clone(),
+            trust: self.trust.clone(),
+            row: *row,
+        })
     }
 }
-impl From<PySubject> for SubjAnalysis {
-    fn from(py: PySubject) -> Self {
-        py.rs
+
+#[pyproto]
+impl PySequenceProtocol for PyEvents {
+    fn __len__(&self) -> usize {
+        self.len()
+    }
+
+    fn __getitem__(&self, idx: isize) -> PyResult<PyEvent> {
+        self.get(idx)
+            .ok_or_else(|| PyIndexError::new_err("event index out of range"))
     }
 }
 
+/// Subject metadata
+#[pyclass(module = "log", name = "Subject")]
+#[derive(Clone)]
+pub struct PySubject {
+    file: Arc<str>,
+    // interned path id in the log
+    id: Option<u32>,
+    access: AccessCode,
+    trust: SharedTrust,
+}
+
 #[pymethods]
 impl PySubject {
     /// Path of the subject parsed from the log event
     #[getter]
-    fn file(&self) -> String {
-        self.rs.file.clone()
+    fn file(&self) -> &str {
+        &self.file
     }
 
     /// Trust source of the log event subject
     #[getter]
-    fn trust(&self) -> String {
-        self.rs.trust.clone()
+    fn trust(&self) -> PyResult<&'static str> {
+        self.trust
+            .verdict(self.id, &self.file)
+            .map(|v| v.trust.as_str())
     }
 
     /// Trust status of the log event subject
     #[getter]
-    fn trust_status(&self) -> String {
-        self.rs.status.clone()
+    fn trust_status(&self) -> &'static str {
+        self.trust
+            .verdict(self.id, &self.file)
+            .map_or(StatusCode::Unknown, |v| v.status)
+            .as_str()
     }
 
     /// Access status of the log event subject
     #[getter]
-    fn access(&self) -> String {
-        self.rs.access.clone()
+    fn access(&self) -> &'static str {
+        self.access.as_str()
     }
 }
 
@@ -137,88 +318,232 @@ impl PySubject {
 #[pyclass(module = "log", name = "Object")]
 #[derive(Clone)]
 pub struct PyObject {
-    rs: ObjAnalysis,
-}
-
-impl From<ObjAnalysis> for PyObject {
-    fn from(rs: ObjAnalysis) -> Self {
-        Self { rs }
-    }
-}
-impl From<PyObject> for ObjAnalysis {
-    fn from(py: PyObject) -> Self {
-        py.rs
-    }
+    file: Arc<str>,
+    // interned path id in the log
+    id: Option<u32>,
+    access: AccessCode,
+    perm: Permission,
+    trust: SharedTrust,
 }
 
 #[pymethods]
 impl PyObject {
     /// Path of the object parsed from the log event
     #[getter]
-    fn file(&self) -> String {
-        self.rs.file.clone()
+    fn file(&self) -> &str {
+        &self.file
     }
 
     /// Trust source of the log event object
     #[getter]
-    fn trust(&self) -> String {
-        self.rs.trust.clone()
+    fn trust(&self) -> PyResult<&'static str> {
+        self.trust
+            .verdict(self.id, &self.file)
+            .map(|v| v.trust.as_str())
     }
 
     /// Trust status of the log event object
     #[getter]
-    fn trust_status(&self) -> String {
-        self.rs.status.clone()
+    fn trust_status(&self) -> &'static str {
+        self.trust
+            .verdict(self.id, &self.file)
+            .map_or(StatusCode::Unknown, |v| v.status)
+            .as_str()
     }
 
     /// Access status of the log event object
     #[getter]
-    fn access(&self) -> String {
-        self.rs.access.clone()
+    fn access(&self) -> &'static str {
+        self.access.as_str()
     }
 
     /// Perm flag from logged event
     #[getter]
     fn perm(&self) -> String {
-        self.rs.perm.clone()
+        perm_to_display(&self.perm)
+    }
+}
+
+const PERM_SPLIT: usize = "perm=".len();
+
+fn perm_to_display(p: &Permission) -> String {
+    p.to_string().split_at(PERM_SPLIT).1.to_string()
+}
+
+fn to_field(name: &str, bucket: i64) -> PyResult<Field> {
+    match name {
+        "uid" => Ok(Field::Uid),
+        "gid" => Ok(Field::Gid),
+        "subject" => Ok(Field::Subject),
+        "object" => Ok(Field::Object),
+        "rule_id" | "rule" => Ok(Field::RuleId),
+        "perm" => Ok(Field::Perm),
+        "decision" => Ok(Field::Decision),
+        "host" => Ok(Field::Host),
+        "time" if bucket > 0 => Ok(Field::Time(bucket)),
+        "time" => Err(PyRuntimeError::new_err("time bucket must be positive")),
+        _ => Err(PyRuntimeError::new_err(format!("unknown field {}", name))),
+    }
+}
+
+fn value_to_py(py: Python, db: &EventDB, f: &Field, v: &Value) -> PyObject {
+    match (f, v) {
+        (_, Value::Int(i)) => i.to_object(py),
+        (_, Value::Path(id)) => db.path(*id).to_object(py),
+        (_, Value::Host(id)) => db.host(*id).to_object(py),
+        (_, Value::Time(t)) => t.to_object(py),
+        (Field::Decision, Value::Code(c)) => decision_of(*c).map(|d| d.to_string()).to_object(py),
+        (_, Value::Code(c)) => perm_of(*c).map(|p| perm_to_display(&p)).to_object(py),
+    }
+}
+
+/// One lifetime of a pid, with the chain of exes it ran as
+#[pyclass(module = "log", name = "Process")]
+pub struct PyProcess {
+    db: SharedDB,
+    trust: SharedTrust,
+    rs: Process,
+    execs: Vec<Arc<str>>,
+}
+
+#[pymethods]
+impl PyProcess {
+    #[getter]
+    fn pid(&self) -> i32 {
+        self.rs.pid
+    }
+
+    /// Exes the process ran as, in the order they were exec'd
+    #[getter]
+    fn execs(&self) -> Vec<String> {
+        self.execs.iter().map(|p| p.to_string()).collect()
+    }
+
+    #[getter]
+    fn first_seen(&self) -> Option<i64> {
+        self.rs.first
+    }
+
+    #[getter]
+    fn last_seen(&self) -> Option<i64> {
+        self.rs.last
+    }
+
+    /// Events of the process in time order
+    #[getter]
+    fn events(&self) -> PyEvents {
+        let db = read(&self.db);
+        PyEvents {
+            rows: Arc::new(PyEvents::expand(
+                &db,
+                fit_ids(&db, self.rs.ids.clone()),
+                |_, _| true,
+            )),
+            db: self.db.clone(),
+            trust: self.trust.clone(),
+        }
     }
 }
 
+// default interval at which a followed log is checked for new events
+const FOLLOW_INTERVAL_MS: u64 = 1000;
+const ANALYSIS_CACHE_SIZE: usize = 32;
+
+/// Events of the log by perspective, time window, version of the db and
+/// generation of the trust db
+type AnalysisCache = Lru<(Perspective, Window, u64, u64), Arc<Vec<Row>>>;
+
 #[pyclass(module = "log", name = "EventLog")]
 #[derive(Clone)]
 pub struct PyEventLog {
-    pub(crate) rs: EventDB,
-    pub(crate) rs_trust: TrustDB,
+    pub(crate) rs: SharedDB,
+    pub(crate) rs_trust: SharedTrust,
+    cache: Arc<Mutex<AnalysisCache>>,
+    tail: Option<Arc<Mutex<Tail>>>,
+    // statistics of the read the events were loaded with
+    stats: Option<Stats>,
     start: Option<i64>,
     stop: Option<i64>,
 }
 
 impl PyEventLog {
-    pub(crate) fn new(rs: EventDB, trust: TrustDB) -> Self {
+    pub(crate) fn new(rs: EventDB, trust: TrustDB, trust_generation: u64) -> Self {
         Self {
-            rs,
-            rs_trust: trust,
+            rs: Arc::new(RwLock::new(rs)),
+            rs_trust: TrustCheck::new(trust, trust_generation),
+            cache: Arc::new(Mutex::new(Lru::new(ANALYSIS_CACHE_SIZE))),
+            tail: None,
+            stats: None,
             start: None,
             stop: None,
         }
     }
 
-    fn temporal_filter(&self, e: &PyEvent) -> bool {
-        match (e.rs.event.when, self.start, self.stop) {
-            (None, _, _) | (_, None, None) => true,
-            (Some(t), Some(begin), None) => t.timestamp() >= begin,
-            (Some(t), None, Some(end)) => t.timestamp() <= end,
-            (Some(t), Some(begin), Some(end)) => t.timestamp() >= begin && t.timestamp() <= end,
+    /// Attach the reader the events were loaded with, enabling incremental refresh
+    pub(crate) fn with_tail(self, tail: Tail) -> Self {
+        Self {
+            tail: Some(Arc::new(Mutex::new(tail))),
+            ..self
         }
     }
+
+    /// Attach the statistics of the read the events were loaded with
+    pub(crate) fn with_stats(self, stats: Stats) -> Self {
+        Self {
+            stats: Some(stats),
+            ..self
+        }
+    }
+
+    fn db(&self) -> RwLockReadGuard<'_, EventDB> {
+        read(&self.rs)
+    }
+
+    fn window(&self) -> Window {
+        Window::new(self.start, self.stop)
+    }
+
+    /// Get the events that fit the perspective in the time window, one per gid
+    /// of each record that passes the filter
+    fn events<F>(&self, from: Perspective, keep: F) -> PyEvents
+    where
+        F: Fn(&Record, i32) -> bool,
+    {
+        let db = self.db();
+        // entries of an older version of either db are never hit again and age out
+        let key = (
+            from,
+            self.window(),
+            db.version(),
+            self.rs_trust.generation(),
+        );
+        let cached = self.lock_cache().get(&key);
+        let rows = match cached {
+            Some(rows) => rows,
+            None => {
+                let fit = fit_in(&db, &key.0, &key.1);
+                let rows = Arc::new(PyEvents::expand(&db, fit, keep));
+                self.lock_cache().insert(key, rows.clone());
+                rows
+            }
+        };
+        PyEvents {
+            rows,
+            db: self.rs.clone(),
+            trust: self.rs_trust.clone(),
+        }
+    }
+
+    fn lock_cache(&self) -> MutexGuard<'_, AnalysisCache> {
+        self.cache.lock().unwrap_or_else(|e| e.into_inner())
+    }
 }
 
 #[pymethods]
 impl PyEventLog {
     /// Get all subjects from the event log
     fn subjects(&self) -> Vec<String> {
-        let m: HashSet<String> = self.rs.iter().filter_map(|e| e.subj.exe()).collect();
-        m.into_iter().collect()
+        self.db().subjects().map(String::from).collect()
     }
 
     fn begin(&mut self, start: Option<i64>) {
@@ -229,43 +554,507 @@ impl PyEventLog {
         self.stop = stop;
     }
 
-    /// Get events that fit the given subject perspective perspective
-    fn by_subject(&self, path: &str) -> Vec<PyEvent> {
-        analyze(
-            &self.rs,
-            Perspective::Subject(path.to_string()),
-            &self.rs_trust,
-        )
-        .iter()
-        .flat_map(expand_on_gid)
-        .filter(|e| self.temporal_filter(e))
-        .collect()
+    /// Get the relationships between users, groups, subjects and objects
+    /// of the events that fall within the time window
+    fn relations(&self) -> PyRelations {
+        PyRelations {
+            rs: Graph::build(&self.db(), &self.window()),
+            rs_trust: self.rs_trust.clone(),
+        }
     }
 
-    /// Get events that fit the given user perspective
-    fn by_user(&self, uid: i32) -> Vec<PyEvent> {
-        analyze(&self.rs, Perspective::User(uid), &self.rs_trust)
+    /// Aggregate the events in the time window in one pass, grouped by the named fields;
+    /// uid, gid, subject, object, rule_id, perm, decision or time, with time in buckets
+    /// of the given seconds. Returns a dict of equal length lists; one per group by field,
+    /// then count, first and last, then distinct_<field> for each field in distinct.
+    #[args(distinct = "None", bucket = 3600)]
+    fn group_by(
+        &self,
+        py: Python,
+        by: Vec<String>,
+        distinct: Option<Vec<String>>,
+        bucket: i64,
+    ) -> PyResult<PyObject> {
+        let distinct = distinct.unwrap_or_default();
+        let fields = by
             .iter()
-            .flat_map(|e| expand_on_gid(e).into_iter().filter(|e| e.uid() == uid))
-            .filter(|e| self.temporal_filter(e))
+            .map(|n| to_field(n, bucket))
+            .collect::<PyResult<Vec<_>>>()?;
+        let counted = distinct
+            .iter()
+            .map(|n| to_field(n, bucket))
+            .collect::<PyResult<Vec<_>>>()?;
+        let w = self.window();
+        let groups = py.allow_threads(|| group_by(&self.db(), &w, &fields, &counted));
+
+        let db = self.db();
+        let cols = PyDict::new(py);
+        for (i, (name, f)) in by.iter().zip(&fields).enumerate() {
+            let col: Vec<PyObject> = groups
+                .iter()
+                .map(|g| value_to_py(py, &db, f, &g.key[i]))
+                .collect();
+            cols.set_item(name, col)?;
+        }
+        cols.set_item("count", groups.iter().map(|g| g.count).collect::<Vec<_>>())?;
+        cols.set_item("first", groups.iter().map(|g| g.first).collect::<Vec<_>>())?;
+        cols.set_item("last", groups.iter().map(|g| g.last).collect::<Vec<_>>())?;
+        for (i, name) in distinct.iter().enumerate() {
+            let col: Vec<usize> = groups.iter().map(|g| g.distinct[i]).collect();
+            cols.set_item(format!("distinct_{}", name), col)?;
+        }
+        Ok(cols.into())
+    }
+
+    /// Count the events of the whole log into buckets of the given seconds, for an
+    /// overview of when events happened. Returns a dict with the bucket start times,
+    /// the number of events without a timestamp, and the counts per bucket. When
+    /// grouped by decision, rule_id or uid, the group values are listed under the
+    /// field name and counts holds one list per value.
+    #[args(group_by = "None")]
+    fn histogram(
+        &self,
+        py: Python,
+        bucket_seconds: i64,
+        group_by: Option<&str>,
+    ) -> PyResult<PyObject> {
+        if bucket_seconds <= 0 {
+            return Err(PyRuntimeError::new_err("time bucket must be positive"));
+        }
+        let by = match group_by {
+            Some(name) => Some(to_field(name, bucket_seconds)?),
+            None => None,
+        };
+        let h = py.allow_threads(|| histogram(&self.db(), &Window::default(), bucket_seconds, by));
+
+        let cols = PyDict::new(py);
+        let starts: Vec<i64> = match h.start {
+            Some(s) => (0..h.len() as i64).map(|i| s + i * h.bucket).collect(),
+            None => vec![],
+        };
+        cols.set_item("start", starts)?;
+        cols.set_item("untimed", h.untimed)?;
+        match (group_by, by) {
+            (Some(name), Some(f)) => {
+                let db = self.db();
+                let keys: Vec<PyObject> = h
+                    .series
+                    .iter()
+                    .filter_map(|(k, _)| k.as_ref().map(|v| value_to_py(py, &db, &f, v)))
+                    .collect();
+                cols.set_item(name, keys)?;
+                let counts: Vec<Vec<usize>> = h.series.into_iter().map(|(_, c)| c).collect();
+                cols.set_item("counts", counts)?;
+            }
+            _ => {
+                let counts = h.series.into_iter().next().map(|(_, c)| c);
+                cols.set_item("counts", counts.unwrap_or_default())?;
+            }
+        }
+        Ok(cols.into())
+    }
+
+    /// Get events that fit the given subject perspective perspective
+    fn by_subject(&self, path: &str) -> PyEvents {
+        self.events(Perspective::Subject(path.to_string()), |_, _| true)
+    }
+
+    /// Get events on the object at the path, or when dir is true on every
+    /// object at or beneath the directory at the path
+    #[args(dir = "false")]
+    fn by_object(&self, path: &str, dir: bool) -> PyEvents {
+        let from = if dir {
+            Perspective::ObjectDir(path.to_string())
+        } else {
+            Perspective::Object(path.to_string())
+        };
+        self.events(from, |_, _| true)
+    }
+
+    /// Get the events of a pid, across every process that held it
+    fn by_pid(&self, pid: i32) -> PyEvents {
+        self.events(Perspective::Pid(pid), |_, _| true)
+    }
+
+    /// Distinct pids that have events
+    fn pids(&self) -> Vec<i32> {
+        self.db().pids().copied().collect()
+    }
+
+    /// Get the events logged on a host
+    fn by_host(&self, host: &str) -> PyEvents {
+        self.events(Perspective::Host(host.to_string()), |_, _| true)
+    }
+
+    /// Distinct names of the hosts that have events, sorted
+    fn hosts(&self) -> Vec<String> {
+        let mut hosts: Vec<String> = self.db().hosts().map(String::from).collect();
+        hosts.sort();
+        hosts
+    }
+
+    /// Get the processes that held a pid in the time window, in time order.
+    /// The pid is taken to be reused after gap seconds without events, or when
+    /// its exe changes to one that it was not seen executing.
+    #[args(gap = "REUSE_GAP")]
+    fn processes(&self, pid: i32, gap: i64) -> Vec<PyProcess> {
+        let db = self.db();
+        processes(&db, pid, &self.window(), gap)
+            .into_iter()
+            .map(|p| PyProcess {
+                db: self.rs.clone(),
+                trust: self.rs_trust.clone(),
+                execs: p.execs.iter().map(|id| shared_path(&db, *id)).collect(),
+                rs: p,
+            })
             .collect()
     }
 
+    /// Get events that fit the given user perspective
+    fn by_user(&self, uid: i32) -> PyEvents {
+        self.events(Perspective::User(uid), |r, _| r.uid == uid)
+    }
+
     /// Get events that fit the given group perspective
-    fn by_group(&self, gid: i32) -> Vec<PyEvent> {
-        analyze(&self.rs, Perspective::Group(gid), &self.rs_trust)
+    fn by_group(&self, gid: i32) -> PyEvents {
+        self.events(Perspective::Group(gid), |_, g| g == gid)
+    }
+
+    /// Replace the trust db of the log with that of the system when the system
+    /// holds another generation of it, such as after trust was checked, merged or
+    /// changed; the trust of each path is then looked up afresh
+    fn update_trust(&self, system: &PySystem) {
+        if system.trust_generation() != self.rs_trust.generation() {
+            self.rs_trust
+                .update(system.rs.trust_db.clone(), system.trust_generation());
+        }
+    }
+
+    /// Generation of the trust db that the log looks up trust in
+    #[getter]
+    fn trust_generation(&self) -> u64 {
+        self.rs_trust.generation()
+    }
+
+    /// Statistics of the analysis cache as a dict of hits, misses, size and capacity
+    fn cache_info(&self, py: Python) -> PyResult<PyObject> {
+        let cache = self.lock_cache();
+        let info = PyDict::new(py);
+        info.set_item("hits", cache.hits())?;
+        info.set_item("misses", cache.misses())?;
+        info.set_item("size", cache.len())?;
+        info.set_item("capacity", cache.capacity())?;
+        Ok(info.into())
+    }
+
+    /// Statistics of the read the log was loaded with as a dict of bytes, lines,
+    /// matched, parsed and rejected counts, elapsed seconds, bytes_per_sec and
+    /// rejects, a sample of the rejected lines as (line, reason) tuples.
+    /// None when the log was not loaded from a file.
+    fn ingest_stats(&self, py: Python) -> PyResult<Option<PyObject>> {
+        let stats = match &self.stats {
+            Some(s) => s,
+            None => return Ok(None),
+        };
+        let info = PyDict::new(py);
+        info.set_item("bytes", stats.bytes)?;
+        info.set_item("lines", stats.lines)?;
+        info.set_item("matched", stats.matched)?;
+        info.set_item("parsed", stats.parsed)?;
+        info.set_item("rejected", stats.rejected)?;
+        info.set_item("elapsed", stats.elapsed.as_secs_f64())?;
+        info.set_item("bytes_per_sec", stats.rate())?;
+        let rejects: Vec<(&str, &str)> = stats
+            .rejects
             .iter()
-            .flat_map(|e| expand_on_gid(e).into_iter().filter(|e| e.gid() == gid))
-            .filter(|e| self.temporal_filter(e))
+            .map(|r| (r.line.as_str(), r.reason.as_str()))
+            .collect();
+        info.set_item("rejects", rejects)?;
+        Ok(Some(info.into()))
+    }
+
+    /// Read the events that were appended to the log since it was loaded or
+    /// last refreshed, returning the number of events that were added or updated
+    fn refresh(&self, py: Python) -> PyResult<usize> {
+        match &self.tail {
+            Some(tail) => py
+                .allow_threads(|| append_from_tail(&self.rs, tail))
+                .map(|xs| xs.len())
+                .map_err(|e| PyRuntimeError::new_err(format!("{:?}", e))),
+            None => Ok(0),
+        }
+    }
+
+    /// Export the events in the time window with the trust of their subjects and
+    /// objects to a file, as csv or an sql script that loads into sqlite.
+    /// Returns the number of events that were written.
+    #[args(format = "\"csv\"")]
+    fn export(&self, py: Python, path: &str, format: &str) -> PyResult<usize> {
+        let format = Format::of(format).map_err(|e| PyRuntimeError::new_err(format!("{:?}", e)))?;
+        let w = self.window();
+        py.allow_threads(|| {
+            let db = self.db();
+            let (generation, trust) = self.rs_trust.current();
+            let mut memo = self.rs_trust.local_memo(generation);
+            let written = export::to_file(path, format, &db, &w, &trust, &mut memo);
+            self.rs_trust.share_memo(memo);
+            written
+        })
+        .map_err(|e| PyRuntimeError::new_err(format!("{:?}", e)))
+    }
+
+    /// Follow the log, appending new events as they are written and passing
+    /// them to the callback as a sequence of Event
+    fn follow(&self, callback: pyo3::PyObject, interval_ms: Option<u64>) -> PyResult<PyLogFollow> {
+        let tail = match &self.tail {
+            Some(t) => t.clone(),
+            None => return Err(PyRuntimeError::new_err("log does not support follow")),
+        };
+        let db = self.rs.clone();
+        let trust = self.rs_trust.clone();
+        let interval = Duration::from_millis(interval_ms.unwrap_or(FOLLOW_INTERVAL_MS));
+
+        let handle = PyLogFollow::default();
+        let stop = handle.stop_flag.clone();
+        let alive = handle.alive_flag.clone();
+        alive.store(true, Ordering::Relaxed);
+
+        thread::spawn(move || {
+            while !stop.load(Ordering::Relaxed) {
+                thread::sleep(interval);
+                let ids = match append_from_tail(&db, &tail) {
+                    Ok(ids) if ids.is_empty() => continue,
+                    Ok(ids) => ids,
+                    Err(e) => {
+                        log::warn!("failed to read followed log: {:?}", e);
+                        continue;
+                    }
+                };
+                let rows = {
+                    let db = read(&db);
+                    // subject access of new events is that of the whole log
+                    let fit = ids
+                        .iter()
+                        .filter_map(|id| db.get(*id).map(|r| (*id, r.subj)))
+                        .map(|(id, subj)| {
+                            let a = db.access_of(subj).copied().unwrap_or_default();
+                            (id, a.code())
+                        })
+                        .collect();
+                    Arc::new(PyEvents::expand(&db, fit, |_, _| true))
+                };
+                let events = PyEvents {
+                    db: db.clone(),
+                    trust: trust.clone(),
+                    rows,
+                };
+                Python::with_gil(|py| {
+                    if callback.call1(py, (events,)).is_err() {
+                        log::error!("failed to make 'follow' callback");
+                    }
+                });
+            }
+            alive.store(false, Ordering::Relaxed);
+        });
+
+        Ok(handle)
+    }
+}
+
+/// Read new events from the tail into the db, returning the ids of the records
+/// that were added or updated
+fn append_from_tail(db: &RwLock<EventDB>, tail: &Mutex<Tail>) -> Result<Vec<u32>, Error> {
+    let xs = tail.lock().unwrap_or_else(|e| e.into_inner()).read()?;
+    if xs.is_empty() {
+        return Ok(vec![]);
+    }
+    Ok(db.write().unwrap_or_else(|e| e.into_inner()).append(xs))
+}
+
+/// Handle to a followed EventLog, returned to python
+#[derive(Default, Clone)]
+#[pyclass(module = "log", name = "LogFollow")]
+pub struct PyLogFollow {
+    stop_flag: Arc<AtomicBool>,
+    alive_flag: Arc<AtomicBool>,
+}
+
+#[pymethods]
+impl PyLogFollow {
+    #[getter]
+    fn running(&self) -> bool {
+        self.alive_flag.load(Ordering::Relaxed)
+    }
+
+    fn stop(&self) {
+        self.stop_flag.store(true, Ordering::Relaxed);
+    }
+}
+
+/// Relationships between the users, groups, subjects and objects of an EventLog
+#[pyclass(module = "log", name = "Relations")]
+#[derive(Clone)]
+pub struct PyRelations {
+    rs: Graph,
+    rs_trust: SharedTrust,
+}
+
+impl PyRelations {
+    fn ids(&self, user: bool) -> Vec<i32> {
+        self.rs
+            .actors()
+            .filter_map(|a| match (a, user) {
+                (Actor::User(id), true) | (Actor::Group(id), false) => Some(*id),
+                _ => None,
+            })
+            .collect()
+    }
+
+    fn subject(&self, path: &Arc<str>, access: &Access) -> PySubject {
+        PySubject {
+            file: path.clone(),
+            id: self.rs.paths().id(path),
+            access: access.code(),
+            trust: self.rs_trust.clone(),
+        }
+    }
+
+    fn subjects_of(&self, actor: Actor) -> Vec<PySubject> {
+        self.rs
+            .subjects_of(&actor)
+            .into_iter()
+            .map(|(p, a)| self.subject(p, a))
+            .collect()
+    }
+
+    fn actors_of(actors: Option<&HashMap<Actor, Access>>, user: bool) -> Vec<(i32, usize)> {
+        actors
+            .map(|m| {
+                m.iter()
+                    .filter_map(|(a, acc)| match (a, user) {
+                        (Actor::User(id), true) | (Actor::Group(id), false) => {
+                            Some((*id, acc.allowed + acc.denied))
+                        }
+                        _ => None,
+                    })
+                    .collect()
+            })
+            .unwrap_or_default()
+    }
+
+    fn object(&self, path: &Arc<str>, link: &Link) -> (i32, PyObject) {
+        let o = PyObject {
+            file: path.clone(),
+            id: self.rs.paths().id(path),
+            access: AccessCode::of(&link.dec),
+            perm: link.perm.clone(),
+            trust: self.rs_trust.clone(),
+        };
+        (link.rule_id, o)
+    }
+
+    fn objects_of(&self, subject: &str, actor: Actor) -> Vec<(i32, PyObject)> {
+        self.rs
+            .objects_of(&actor, subject)
+            .into_iter()
+            .map(|(p, l)| self.object(p, l))
+            .collect()
+    }
+}
+
+#[pymethods]
+impl PyRelations {
+    /// Ids of the users that have events
+    fn users(&self) -> Vec<i32> {
+        self.ids(true)
+    }
+
+    /// Ids of the groups that have events
+    fn groups(&self) -> Vec<i32> {
+        self.ids(false)
+    }
+
+    /// All subjects, with access rolled up over all of their events
+    fn subjects(&self) -> Vec<PySubject> {
+        self.rs
+            .subjects()
+            .map(|(p, n)| self.subject(p, &n.access))
+            .collect()
+    }
+
+    /// Subjects of a user, with access relative to that user
+    fn subjects_by_user(&self, uid: i32) -> Vec<PySubject> {
+        self.subjects_of(Actor::User(uid))
+    }
+
+    /// Subjects of a group, with access relative to that group
+    fn subjects_by_group(&self, gid: i32) -> Vec<PySubject> {
+        self.subjects_of(Actor::Group(gid))
+    }
+
+    /// Users of a subject as a list of (uid, event count)
+    fn users_by_subject(&self, path: &str) -> Vec<(i32, usize)> {
+        PyRelations::actors_of(self.rs.subject(path).map(|n| &n.actors), true)
+    }
+
+    /// Groups of a subject as a list of (gid, event count)
+    fn groups_by_subject(&self, path: &str) -> Vec<(i32, usize)> {
+        PyRelations::actors_of(self.rs.subject(path).map(|n| &n.actors), false)
+    }
+
+    /// Objects of a subject for a user as a list of (rule_id, Object)
+    fn objects_by_user(&self, subject: &str, uid: i32) -> Vec<(i32, PyObject)> {
+        self.objects_of(subject, Actor::User(uid))
+    }
+
+    /// Objects of a subject for a group as a list of (rule_id, Object)
+    fn objects_by_group(&self, subject: &str, gid: i32) -> Vec<(i32, PyObject)> {
+        self.objects_of(subject, Actor::Group(gid))
+    }
+
+    /// All objects as a list of (rule_id, Object), with the rule and access of
+    /// the most recent event on each
+    fn objects(&self) -> Vec<(i32, PyObject)> {
+        self.rs
+            .objects()
+            .map(|(p, n)| self.object(p, &n.link))
             .collect()
     }
+
+    /// Subjects that accessed an object, with access relative to that object
+    fn subjects_by_object(&self, path: &str) -> Vec<PySubject> {
+        self.rs
+            .subjects_by_object(path)
+            .into_iter()
+            .map(|(p, a)| self.subject(p, a))
+            .collect()
+    }
+
+    /// Users of an object as a list of (uid, event count)
+    fn users_by_object(&self, path: &str) -> Vec<(i32, usize)> {
+        PyRelations::actors_of(self.rs.object(path).map(|n| &n.actors), true)
+    }
+
+    /// Groups of an object as a list of (gid, event count)
+    fn groups_by_object(&self, path: &str) -> Vec<(i32, usize)> {
+        PyRelations::actors_of(self.rs.object(path).map(|n| &n.actors), false)
+    }
+
+    /// True if any event of the subject has no timestamp
+    fn untimed(&self, subject: &str) -> bool {
+        self.rs.subject(subject).map(|n| n.untimed).unwrap_or(false)
+    }
 }
 
 #[cfg(test)]
 mod tests {
     use super::*;
     use chrono::{DateTime, NaiveDateTime, Utc};
-    use fapolicy_rules::{Decision, Object, Permission, Subject};
+    use fapolicy_analyzer::events::event::Event;
+    use fapolicy_rules::{Decision, Object, Subject};
+    use fapolicy_trust::db::Rec;
+    use fapolicy_trust::source::TrustSource;
+    use fapolicy_trust::Trust;
 
     const TEST_PATH: &str = "/bin/bash";
 
@@ -298,12 +1087,9 @@ mod tests {
     fn temporal_filtering() {
         let e = events();
         let all = e.len();
-        let mut log = PyEventLog {
-            rs: e,
-            rs_trust: Default::default(),
-            start: Some(0),
-            stop: Some(5),
-        };
+        let mut log = PyEventLog::new(e, Default::default(), 0);
+        log.begin(Some(0));
+        log.until(Some(5));
         assert_eq!(all, log.by_subject(TEST_PATH).len());
 
         log.begin(Some(1));
@@ -325,12 +1111,154 @@ mod tests {
         log.until(Some(3));
         assert_eq!(all - 2, log.by_subject(TEST_PATH).len());
     }
+
+    #[test]
+    fn event_views() {
+        let log = PyEventLog::new(events(), Default::default(), 0);
+        let es = log.by_group(0);
+        assert_eq!(es.len(), 6);
+        assert!(es.get(6).is_none());
+
+        let last = es.get(-1).unwrap();
+        assert_eq!(last.rule_id(), 5);
+        assert_eq!(last.when(), Some(5));
+        assert_eq!(last.subject().file(), TEST_PATH);
+        assert_eq!(last.subject().access(), "A");
+        assert_eq!(last.object().perm(), "any");
+        assert_eq!(last.object().trust_status(), "U");
+    }
+
+    #[test]
+    fn relations_in_window() {
+        let mut log = PyEventLog::new(events(), Default::default(), 0);
+        log.begin(Some(3));
+
+        let r = log.relations();
+        assert_eq!(r.users(), vec![0]);
+        assert_eq!(r.groups(), vec![0]);
+        assert_eq!(r.users_by_subject(TEST_PATH), vec![(0, 3)]);
+
+        let objs = r.objects_by_user(TEST_PATH, 0);
+        assert_eq!(objs.len(), 1);
+        assert_eq!(objs[0].0, 5);
+        assert!(!r.untimed(TEST_PATH));
+    }
+
+    #[test]
+    fn process_timelines() {
+        let log = PyEventLog::new(events(), Default::default(), 0);
+        assert_eq!(log.pids(), vec![0]);
+        assert_eq!(log.by_pid(0).len(), log.db().len());
+        assert_eq!(log.by_pid(1).len(), 0);
+
+        let ps = log.processes(0, REUSE_GAP);
+        assert_eq!(ps[0].execs(), vec![TEST_PATH]);
+        assert!(ps[0].events().len() > 0);
+    }
+
+    #[test]
+    fn cached_analysis() {
+        let mut log = PyEventLog::new(events(), Default::default(), 0);
+        let a = log.by_user(0);
+        let b = log.by_user(0);
+        assert!(Arc::ptr_eq(&a.rows, &b.rows));
+        {
+            let cache = log.lock_cache();
+            assert_eq!((cache.hits(), cache.misses()), (1, 1));
+        }
+
+        // a new window is a new entry
+        log.begin(Some(3));
+        assert_eq!(log.by_user(0).len(), 3);
+        assert_eq!(log.lock_cache().misses(), 2);
+
+        // as is a change to the db
+        log.rs.write().unwrap().append(vec![Event {
+            rule_id: 9,
+            dec: Decision::Allow,
+            perm: Permission::Any,
+            uid: 0,
+            gid: vec![0],
+            pid: 0,
+            subj: Subject::from_exe(TEST_PATH),
+            obj: Object::from_path(TEST_PATH),
+            when: Some(DateTime::from_utc(NaiveDateTime::from_timestamp(9, 0), Utc)),
+        }]);
+        assert_eq!(log.by_user(0).len(), 4);
+        assert_eq!(log.lock_cache().misses(), 3);
+    }
+
+    #[test]
+    fn verdicts_follow_trust_generation() {
+        let log = PyEventLog::new(events(), Default::default(), 1);
+        let subject = log.by_user(0).get(0).unwrap().subject();
+        assert_eq!(subject.trust().unwrap(), "U");
+        assert_eq!(log.lock_cache().misses(), 1);
+
+        let mut trust = TrustDB::default();
+        trust.put(Rec::from_source(
+            Trust {
+                path: TEST_PATH.to_string(),
+                size: 0,
+                hash: String::new(),
+            },
+            TrustSource::System,
+        ));
+        log.rs_trust.update(trust, 2);
+        assert_eq!(log.trust_generation(), 2);
+
+        // views of the log see the new generation, and the analysis is redone for it
+        assert_eq!(subject.trust().unwrap(), "ST");
+        assert_eq!(
+            log.by_user(0).get(0).unwrap().subject().trust().unwrap(),
+            "ST"
+        );
+        assert_eq!(log.lock_cache().misses(), 2);
+    }
+
+    #[test]
+    fn local_memo_is_shared_at_its_generation() {
+        let check = TrustCheck::new(TrustDB::default(), 1);
+        let mut memo = check.local_memo(1);
+        memo.get(0, TEST_PATH, &TrustDB::default()).unwrap();
+
+        // verdicts of a generation that was replaced are not shared
+        check.update(TrustDB::default(), 2);
+        check.verdict(Some(1), TEST_PATH).unwrap();
+        check.share_memo(memo);
+        assert_eq!(check.memo.lock().unwrap().generation(), 2);
+
+        let mut memo = check.local_memo(2);
+        memo.get(0, TEST_PATH, &TrustDB::default()).unwrap();
+        let expected = format!("{:?}", memo);
+        check.share_memo(memo);
+        assert_eq!(format!("{:?}", *check.memo.lock().unwrap()), expected);
+    }
+
+    #[test]
+    fn object_perspective() {
+        let log = PyEventLog::new(events(), Default::default(), 0);
+        let r = log.relations();
+        let objs = r.objects();
+        assert!(!objs.is_empty());
+
+        let obj = objs[0].1.file().to_string();
+        assert_eq!(r.subjects_by_object(&obj)[0].file(), TEST_PATH);
+        assert_eq!(r.users_by_object(&obj)[0].0, 0);
+        assert!(log.by_object(&obj, false).len() > 0);
+        assert_eq!(log.by_object("/", true).len(), log.db().len());
+        assert_eq!(log.by_object("/nonexistent", true).len(), 0);
+    }
 }
 
 pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PyEvent>()?;
+    m.add_class::<PyEvents>()?;
     m.add_class::<PySubject>()?;
     m.add_class::<PyObject>()?;
+    m.add_class::<PyProcess>()?;
     m.add_class::<PyEventLog>()?;
+    m.add_class::<PyRelations>()?;
+    m.add_class::<PyLogFollow>()?;
     Ok(())
 }
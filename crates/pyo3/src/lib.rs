@@ -17,6 +17,7 @@ pub mod profiler;
 pub mod rules;
 pub mod system;
 pub mod trust;
+pub mod watch;
 
 #[pymodule]
 fn rust(_py: Python, m: &PyModule) -> PyResult<()> {
@@ -31,5 +32,6 @@ fn rust(_py: Python, m: &PyModule) -> PyResult<()> {
     rules::init_module(_py, m)?;
     system::init_module(_py, m)?;
     trust::init_module(_py, m)?;
+    watch::init_module(_py, m)?;
     Ok(())
 }
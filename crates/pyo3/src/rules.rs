@@ -6,12 +6,16 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use std::sync::Arc;
+use std::time::Duration;
+
 use pyo3::prelude::*;
 use pyo3::{exceptions, PyObjectProtocol};
 
 use fapolicy_rules::db::Entry::*;
 use fapolicy_rules::db::{Entry, DB};
 use fapolicy_rules::error::Error::{MalformedFileMarker, ZeroRulesDefined};
+use fapolicy_rules::linter::stat::StatCache;
 use fapolicy_rules::ops::Changeset;
 use fapolicy_rules::parser::parse::StrTrace;
 use fapolicy_rules::parser::rule::parse_with_error_message;
@@ -145,8 +149,18 @@ impl PyChangeset {
         to_vec(self.rs.get())
     }
 
-    pub fn parse(&mut self, text: &str) -> PyResult<()> {
-        match self.rs.set(text.trim()) {
+    /// Parse and lint the rules text. A RuleStatCache shared across parses saves
+    /// looking up the same rule paths on the filesystem each time.
+    #[args(stat_cache = "None")]
+    pub fn parse(
+        &mut self,
+        py: Python,
+        text: &str,
+        stat_cache: Option<PyRef<PyStatCache>>,
+    ) -> PyResult<()> {
+        let cache = stat_cache.map(|c| c.rs.clone());
+        let rs = &mut self.rs;
+        match py.allow_threads(|| rs.set_with(text.trim(), cache.as_deref()).map(|_| ())) {
             Ok(_) => Ok(()),
             Err(MalformedFileMarker(lnum, txt)) => Err(exceptions::PyRuntimeError::new_err(
                 format!("{}:malformed-file-marker:{}", lnum, txt),
@@ -164,6 +178,33 @@ impl PyChangeset {
     }
 }
 
+/// Filesystem metadata of the paths in rules, kept for a time to live in seconds
+/// and shared by the RuleChangesets that are parsed with it
+#[pyclass(module = "rules", name = "RuleStatCache")]
+#[derive(Clone)]
+pub struct PyStatCache {
+    rs: Arc<StatCache>,
+}
+
+#[pymethods]
+impl PyStatCache {
+    #[new]
+    pub fn new(ttl: f64) -> Self {
+        Self {
+            rs: Arc::new(StatCache::new(Duration::from_secs_f64(ttl.max(0.0)))),
+        }
+    }
+
+    /// Drop the cached metadata, such as after files were added or removed
+    pub fn clear(&self) {
+        self.rs.clear()
+    }
+
+    pub fn size(&self) -> usize {
+        self.rs.len()
+    }
+}
+
 #[pyfunction]
 fn rule_text_error_check(txt: &str) -> Option<String> {
     match parse_with_error_message(StrTrace::new(txt)) {
@@ -237,6 +278,7 @@ pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PyRule>()?;
     m.add_class::<PyRuleInfo>()?;
     m.add_class::<PyChangeset>()?;
+    m.add_class::<PyStatCache>()?;
     m.add_function(wrap_pyfunction!(rule_text_error_check, m)?)?;
     Ok(())
 }
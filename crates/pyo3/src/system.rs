@@ -6,12 +6,26 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use std::fs;
+use std::path::{Path, PathBuf};
+use std::sync::atomic::{AtomicU64, Ordering};
+use std::sync::mpsc::{self, RecvTimeoutError};
+use std::sync::Arc;
+use std::thread;
+use std::time::{Duration, Instant};
+
 use pyo3::prelude::*;
 use pyo3::{exceptions, PyResult};
 use similar::{ChangeTag, TextDiff};
 
+use fapolicy_analyzer::error::Error;
 use fapolicy_analyzer::events;
-use fapolicy_analyzer::events::db::DB as EventDB;
+use fapolicy_analyzer::events::cache::Cache;
+use fapolicy_analyzer::events::db::{Window, DB as EventDB};
+use fapolicy_analyzer::events::event::Event;
+use fapolicy_analyzer::events::ingest;
+use fapolicy_analyzer::events::ingest::{Log, Source};
+use fapolicy_analyzer::events::read::{Format, Progress, Stats, Tail};
 use fapolicy_app::app::State;
 use fapolicy_app::cfg;
 use fapolicy_app::sys::deploy_app_state;
@@ -25,16 +39,31 @@ use crate::{daemon, rules};
 
 use super::trust::PyTrust;
 
+// interval at which the progress of a background load is reported
+const PROGRESS_INTERVAL_MS: u64 = 250;
+
+// source of the generations of trust dbs, each change of a trust db takes the next
+static TRUST_GENERATION: AtomicU64 = AtomicU64::new(0);
+
+fn next_trust_generation() -> u64 {
+    TRUST_GENERATION.fetch_add(1, Ordering::Relaxed) + 1
+}
+
 #[pyclass(module = "app", name = "System")]
 #[derive(Clone)]
 /// An immutable view of host system state.
 /// This only a container for state, it has to be applied to the host system.
 pub struct PySystem {
     pub(crate) rs: State,
+    // generation of the trust db, which event logs compare to know when to update
+    trust_generation: u64,
 }
 impl From<State> for PySystem {
     fn from(rs: State) -> Self {
-        Self { rs }
+        Self {
+            rs,
+            trust_generation: next_trust_generation(),
+        }
     }
 }
 impl From<PySystem> for State {
@@ -98,7 +127,18 @@ impl PySystem {
     /// Apply the changeset to the state of this System, produces a new System
     fn apply_rule_changes(&self, change: rules::PyChangeset) -> PySystem {
         log::debug!("apply_rule_changes");
-        self.rs.apply_rule_changes(change.into()).into()
+        // the trust db is unchanged
+        PySystem {
+            rs: self.rs.apply_rule_changes(change.into()),
+            trust_generation: self.trust_generation,
+        }
+    }
+
+    /// Generation of the trust db of this System, which changes with each change
+    /// of the trust db, such as a merge or an applied changeset
+    #[getter]
+    pub fn trust_generation(&self) -> u64 {
+        self.trust_generation
     }
 
     /// Update the host system with this state of this System and signal fapolicyd to reload trust
@@ -132,20 +172,131 @@ impl PySystem {
         self.rs.groups.iter().map(|g| g.clone().into()).collect()
     }
 
-    /// Parse events from debug mode log at the specified path
-    fn load_debuglog(&self, log: &str) -> PyResult<PyEventLog> {
+    /// Parse events from debug mode log at the specified path.
+    /// Parsed events are cached in the data dir and reused while the log is unchanged.
+    /// With dedup set, duplicate events are collapsed into occurrence counts.
+    #[args(dedup = "false")]
+    fn load_debuglog(&self, py: Python, log: &str, dedup: bool) -> PyResult<PyEventLog> {
         log::debug!("load_debuglog");
-        let xs = events::read::from_debug(log)
+        let data_dir = self.rs.config.data_dir();
+        let ((xs, _), stats) = py
+            .allow_threads(|| measure(log, |p| read_debuglog(data_dir, log, Some(p))))
             .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
-        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()))
+        Ok(self.event_log(event_db(xs, dedup)).with_stats(stats))
     }
 
-    /// Parse events from syslog at the specified path
-    fn load_syslog(&self) -> PyResult<PyEventLog> {
+    /// Parse the decisions fapolicyd logged to the audit log at the specified path.
+    /// With dedup set, duplicate events are collapsed into occurrence counts.
+    #[args(dedup = "false")]
+    fn load_auditlog(&self, py: Python, log: &str, dedup: bool) -> PyResult<PyEventLog> {
+        log::debug!("load_auditlog");
+        let (xs, stats) = py
+            .allow_threads(|| measure(log, |p| events::read::from_auditlog_with(log, Some(p))))
+            .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
+        Ok(self.event_log(event_db(xs, dedup)).with_stats(stats))
+    }
+
+    /// Parse events from syslog at the specified path.
+    /// When a start time is given only the events from that time on are read,
+    /// seeking into the log and its rotated predecessors.
+    /// Events parsed from the live log are cached in the data dir, so that
+    /// later loads only parse the lines appended since.
+    /// With dedup set, duplicate events are collapsed into occurrence counts.
+    #[args(start = "None", dedup = "false")]
+    fn load_syslog(&self, py: Python, start: Option<i64>, dedup: bool) -> PyResult<PyEventLog> {
         log::debug!("load_syslog");
-        let xs = events::read::from_syslog(&self.rs.config.system.syslog_file_path)
+        let path = &self.rs.config.system.syslog_file_path;
+        let data_dir = self.rs.config.data_dir();
+        let ((xs, tail), stats) = py
+            .allow_threads(|| measure(path, |p| read_syslog(data_dir, path, start, Some(p))))
+            .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
+        Ok(self
+            .event_log(event_db(xs, dedup))
+            .with_tail(tail)
+            .with_stats(stats))
+    }
+
+    /// Parse events from a set of syslogs given as a list of paths or a glob
+    /// pattern. Compressed logs are decompressed while they are read and the
+    /// events of all logs are merged in time order.
+    /// With dedup set, duplicate events are collapsed into occurrence counts.
+    #[args(start = "None", stop = "None", dedup = "false")]
+    fn load_syslogs(
+        &self,
+        py: Python,
+        paths: &PyAny,
+        start: Option<i64>,
+        stop: Option<i64>,
+        dedup: bool,
+    ) -> PyResult<PyEventLog> {
+        log::debug!("load_syslogs");
+        let paths: Vec<PathBuf> = match paths.extract::<String>() {
+            Ok(pattern) => events::source::glob(&pattern)
+                .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?,
+            Err(_) => paths
+                .extract::<Vec<String>>()?
+                .into_iter()
+                .map(PathBuf::from)
+                .collect(),
+        };
+        let w = Window::new(start, stop);
+        let (xs, stats) = py
+            .allow_threads(|| {
+                measure("syslogs", |p| {
+                    events::read::from_syslogs_with(&paths, &w, Some(p))
+                })
+            })
+            .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
+        Ok(self.event_log(event_db(xs, dedup)).with_stats(stats))
+    }
+
+    /// Parse the events of logs collected from many hosts, given as a directory
+    /// holding a directory of logs per host, or as a list of (host, path, log type)
+    /// where the log type is one of "debug", "syslog" or "audit".
+    /// The logs are parsed in parallel and their events merged in time order,
+    /// each tagged with its host.
+    /// With dedup set, duplicate events of a host are collapsed into occurrence counts.
+    #[args(start = "None", stop = "None", dedup = "false")]
+    fn load_hosts(
+        &self,
+        py: Python,
+        sources: &PyAny,
+        start: Option<i64>,
+        stop: Option<i64>,
+        dedup: bool,
+    ) -> PyResult<PyEventLog> {
+        log::debug!("load_hosts");
+        let sources: Vec<Source> = match sources.extract::<String>() {
+            Ok(dir) => ingest::sources_in(Path::new(&dir))
+                .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?,
+            Err(_) => sources
+                .extract::<Vec<(String, String, String)>>()?
+                .into_iter()
+                .map(|(host, path, log)| {
+                    let log = match log.as_str() {
+                        "debug" => Log::Debug,
+                        "syslog" => Log::Syslog,
+                        "audit" => Log::Audit,
+                        t => {
+                            return Err(exceptions::PyRuntimeError::new_err(format!(
+                                "unsupported log type {}",
+                                t
+                            )))
+                        }
+                    };
+                    Ok(Source::new(&host, Path::new(&path), log))
+                })
+                .collect::<PyResult<_>>()?,
+        };
+        let w = Window::new(start, stop);
+        let (db, stats) = py
+            .allow_threads(|| {
+                measure("hosts", |p| {
+                    ingest::ingest_with(&sources, &w, dedup, Some(p))
+                })
+            })
             .map_err(|e| exceptions::PyRuntimeError::new_err(format!("{:?}", e)))?;
-        Ok(PyEventLog::new(EventDB::from(xs), self.rs.trust_db.clone()))
+        Ok(self.event_log(db).with_stats(stats))
     }
 
     fn rules(&self) -> Vec<PyRule> {
@@ -161,6 +312,7 @@ impl PySystem {
     // we rely on the gil to keep this synced up
     fn merge(&mut self, trust: Vec<PyTrust>) {
         log::trace!("merging {} entries", trust.len());
+        self.trust_generation = next_trust_generation();
         for t in trust {
             if let Some(e) = self.rs.trust_db.get_mut(&t.rs_trust.path) {
                 match (t.status.as_str(), t.rs_actual) {
@@ -174,6 +326,218 @@ impl PySystem {
     }
 }
 
+impl PySystem {
+    /// An event log of the db that looks up trust in the trust db of this System
+    fn event_log(&self, db: EventDB) -> PyEventLog {
+        PyEventLog::new(db, self.rs.trust_db.clone(), self.trust_generation)
+    }
+}
+
+fn read_debuglog(
+    data_dir: &str,
+    log: &str,
+    progress: Option<&Progress>,
+) -> Result<(Vec<Event>, Tail), Error> {
+    Cache::new(data_dir).load_with(Format::Debug, log, None, progress)
+}
+
+fn read_syslog(
+    data_dir: &str,
+    path: &str,
+    start: Option<i64>,
+    progress: Option<&Progress>,
+) -> Result<(Vec<Event>, Tail), Error> {
+    let cache = Cache::new(data_dir);
+    match start {
+        Some(t) => {
+            let mut xs = events::read::from_rotated_since_with(path, t, progress)?;
+            let (live, tail) = cache.load_with(Format::Syslog, path, start, progress)?;
+            xs.extend(live);
+            Ok((xs, tail))
+        }
+        None => cache.load_with(Format::Syslog, path, None, progress),
+    }
+}
+
+/// Read with a progress that accounts for the lines read, returning the
+/// ingest statistics of the read, which are logged
+fn measure<T, F>(source: &str, read: F) -> Result<(T, Stats), Error>
+where
+    F: FnOnce(&Progress) -> Result<T, Error>,
+{
+    let progress = Progress::default();
+    let started = Instant::now();
+    let t = read(&progress)?;
+    Ok((t, logged(source, progress.stats(started.elapsed()))))
+}
+
+/// Log the ingest statistics of a source, and the sample of rejected lines
+fn logged(source: &str, stats: Stats) -> Stats {
+    log::info!("read {}: {}", source, stats);
+    for r in &stats.rejects {
+        log::warn!("rejected line of {}, {}: {}", source, r.reason, r.line);
+    }
+    stats
+}
+
+/// Index the events, collapsing duplicates into occurrence counts when dedup is set
+fn event_db(xs: Vec<Event>, dedup: bool) -> EventDB {
+    if dedup {
+        EventDB::deduplicated(xs)
+    } else {
+        EventDB::from(xs)
+    }
+}
+
+/// Handle to events being loaded in the background, returned to python
+#[pyclass(module = "app", name = "EventLoad")]
+#[derive(Clone)]
+pub struct PyEventLoad {
+    progress: Arc<Progress>,
+    total: u64,
+}
+
+#[pymethods]
+impl PyEventLoad {
+    /// Size in bytes of the log being loaded
+    #[getter]
+    fn total(&self) -> u64 {
+        self.total
+    }
+
+    /// Number of bytes parsed so far
+    #[getter]
+    fn bytes(&self) -> u64 {
+        self.progress.bytes()
+    }
+
+    /// Number of lines parsed so far
+    #[getter]
+    fn lines(&self) -> u64 {
+        self.progress.lines()
+    }
+
+    #[getter]
+    fn cancelled(&self) -> bool {
+        self.progress.is_cancelled()
+    }
+
+    /// Stop the load, the done callback is made without a log
+    fn cancel(&self) {
+        self.progress.cancel();
+    }
+}
+
+/// Load events in the background without holding the GIL, from the debug or
+/// audit log at file, or from the syslog starting at start.
+/// While parsing, update is called with the bytes and lines parsed so far.
+/// On completion done is called with the EventLog and None, or with None and
+/// the error message when the load failed. A cancelled load passes None for both.
+#[pyfunction(file = "None", start = "None", dedup = "false")]
+fn load_events(
+    system: &PySystem,
+    log_type: &str,
+    update: PyObject,
+    done: PyObject,
+    file: Option<String>,
+    start: Option<i64>,
+    dedup: bool,
+) -> PyResult<PyEventLoad> {
+    log::debug!("load_events");
+    let path = match (log_type, file) {
+        ("debug", Some(f)) | ("audit", Some(f)) => f,
+        ("debug", None) | ("audit", None) => {
+            return Err(exceptions::PyRuntimeError::new_err(format!(
+                "{} log requires a file",
+                log_type
+            )))
+        }
+        ("syslog", _) => system.rs.config.system.syslog_file_path.clone(),
+        (t, _) => {
+            return Err(exceptions::PyRuntimeError::new_err(format!(
+                "unsupported log type {}",
+                t
+            )))
+        }
+    };
+    let log_type = log_type.to_string();
+    let data_dir = system.rs.config.data_dir().to_string();
+    let trust = system.rs.trust_db.clone();
+    let trust_generation = system.trust_generation;
+
+    let handle = PyEventLoad {
+        progress: Arc::new(Progress::default()),
+        total: fs::metadata(&path).map(|m| m.len()).unwrap_or(0),
+    };
+    let progress = handle.progress.clone();
+
+    thread::spawn(move || {
+        let started = Instant::now();
+        // the reporter wakes on each interval, or as soon as the load finishes
+        let (finished, wake) = mpsc::channel::<()>();
+        let reporter = {
+            let progress = progress.clone();
+            thread::spawn(move || {
+                let interval = Duration::from_millis(PROGRESS_INTERVAL_MS);
+                while let Err(RecvTimeoutError::Timeout) = wake.recv_timeout(interval) {
+                    callback_on_progress(&update, &progress);
+                }
+                update
+            })
+        };
+
+        // only the syslog is followed, so the others drop their tail
+        let loaded = match log_type.as_str() {
+            "syslog" => read_syslog(&data_dir, &path, start, Some(&progress))
+                .map(|(xs, tail)| (xs, Some(tail))),
+            "audit" => {
+                events::read::from_auditlog_with(&path, Some(&progress)).map(|xs| (xs, None))
+            }
+            _ => read_debuglog(&data_dir, &path, Some(&progress)).map(|(xs, _)| (xs, None)),
+        };
+        drop(finished);
+        if let Ok(update) = reporter.join() {
+            callback_on_progress(&update, &progress);
+        }
+
+        let result = match loaded {
+            Ok((xs, tail)) => {
+                let stats = logged(&path, progress.stats(started.elapsed()));
+                let log =
+                    PyEventLog::new(event_db(xs, dedup), trust, trust_generation).with_stats(stats);
+                let log = match tail {
+                    Some(tail) => log.with_tail(tail),
+                    None => log,
+                };
+                (Some(log), None)
+            }
+            Err(Error::Cancelled) => (None, None),
+            Err(e) => (None, Some(format!("{:?}", e))),
+        };
+        Python::with_gil(|py| {
+            if done.call1(py, result).is_err() {
+                log::error!("failed to make 'done' callback");
+            }
+        });
+    });
+
+    Ok(handle)
+}
+
+fn callback_on_progress(update: &PyObject, progress: &Progress) {
+    if progress.is_cancelled() {
+        return;
+    }
+    Python::with_gil(|py| {
+        if update
+            .call1(py, (progress.bytes(), progress.lines()))
+            .is_err()
+        {
+            log::error!("failed to make 'update' callback");
+        }
+    })
+}
+
 #[pyfunction]
 fn rules_difference(lhs: &PySystem, rhs: &PySystem) -> String {
     log::debug!("rules_difference");
@@ -209,6 +573,8 @@ fn checked_system(py: Python) -> PyResult<PySystem> {
 
 pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_class::<PySystem>()?;
+    m.add_class::<PyEventLoad>()?;
+    m.add_function(wrap_pyfunction!(load_events, m)?)?;
     m.add_function(wrap_pyfunction!(rules_difference, m)?)?;
     m.add_function(wrap_pyfunction!(checked_system, m)?)?;
     Ok(())
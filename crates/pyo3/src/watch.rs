@@ -0,0 +1,123 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::path::PathBuf;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::Arc;
+use std::thread;
+
+use pyo3::exceptions::PyRuntimeError;
+use pyo3::prelude::*;
+
+use fapolicy_trust::watch::{refresh, Watch, DEFAULT_MAX_DIRS};
+
+use crate::system::PySystem;
+use crate::trust::PyTrust;
+
+// interval at which the watch thread checks for cancellation
+const POLL_INTERVAL_MS: i32 = 500;
+
+/// Handle to a running trust watch, returned to python
+#[derive(Default, Clone)]
+#[pyclass(module = "trust", name = "TrustWatch")]
+pub struct PyTrustWatch {
+    stop_flag: Arc<AtomicBool>,
+    alive_flag: Arc<AtomicBool>,
+}
+
+#[pymethods]
+impl PyTrustWatch {
+    #[getter]
+    fn running(&self) -> bool {
+        self.alive_flag.load(Ordering::Relaxed)
+    }
+
+    fn stop(&self) {
+        self.stop_flag.store(true, Ordering::Relaxed);
+    }
+}
+
+/// Watch the trust sources and trusted files of the system for changes.
+/// Affected records are re-verified and passed to the update callback
+/// as a list of updated Trust and a list of paths that are no longer trusted.
+#[pyfunction]
+fn watch_trust(
+    system: &PySystem,
+    update: PyObject,
+    max_dirs: Option<usize>,
+) -> PyResult<PyTrustWatch> {
+    let mut db = system.rs.trust_db.clone();
+    let trust_d = PathBuf::from(&system.rs.config.system.trust_dir_path);
+    let trust_file = PathBuf::from(&system.rs.config.system.trust_file_path);
+
+    let mut watch = Watch::new(
+        &db,
+        &trust_d,
+        Some(&trust_file),
+        max_dirs.unwrap_or(DEFAULT_MAX_DIRS),
+    )
+    .map_err(|e| PyRuntimeError::new_err(format!("{:?}", e)))?;
+
+    let handle = PyTrustWatch::default();
+    let stop = handle.stop_flag.clone();
+    let alive = handle.alive_flag.clone();
+    alive.store(true, Ordering::Relaxed);
+
+    thread::spawn(move || {
+        while !stop.load(Ordering::Relaxed) {
+            let changes = match watch.poll(POLL_INTERVAL_MS) {
+                Ok(c) if c.is_empty() => continue,
+                Ok(c) => c,
+                Err(e) => {
+                    log::error!("trust watch failed: {:?}", e);
+                    break;
+                }
+            };
+            log::debug!("trust watch observed {} changes", changes.len());
+
+            let r = match refresh(&db, &changes, &trust_d, Some(&trust_file)) {
+                Ok(r) if r.is_empty() => continue,
+                Ok(r) => r,
+                Err(e) => {
+                    log::warn!("failed to refresh trust: {:?}", e);
+                    continue;
+                }
+            };
+            r.merge_into(&mut db);
+            // files newly trusted by a source are watched from now on
+            for p in &r.removed {
+                watch.untrack(p);
+            }
+            for rec in &r.updated {
+                if let Err(e) = watch.track(&rec.trusted.path) {
+                    log::warn!("failed to watch {}: {:?}", rec.trusted.path, e);
+                }
+            }
+
+            let updated: Vec<PyTrust> = r
+                .updated
+                .into_iter()
+                .map(|r| PyTrust::from_status_opt(r.status, r.trusted))
+                .collect();
+            Python::with_gil(|py| {
+                if update.call1(py, (updated, r.removed)).is_err() {
+                    log::error!("failed to make 'update' callback");
+                }
+            });
+        }
+        alive.store(false, Ordering::Relaxed);
+    });
+
+    Ok(handle)
+}
+
+pub fn init_module(_py: Python, m: &PyModule) -> PyResult<()> {
+    m.add_class::<PyTrustWatch>()?;
+    m.add_function(wrap_pyfunction!(watch_trust, m)?)?;
+    Ok(())
+}
@@ -24,6 +24,13 @@ pub struct RuleEntry {
     _fk: usize,
 }
 
+impl RuleEntry {
+    /// Get the fk of the entry in the db model
+    pub(crate) fn fk(&self) -> usize {
+        self._fk
+    }
+}
+
 #[derive(Clone, Debug)]
 pub struct SetEntry {
     pub name: String,
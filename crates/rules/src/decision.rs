@@ -17,7 +17,7 @@ use std::fmt::{Display, Formatter};
 ///
 /// Regardless of the notification, any rule with a deny in the keyword will deny access and any with an allow in the keyword will allow access.
 ///
-#[derive(Clone, Debug, PartialEq)]
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
 pub enum Decision {
     AllowAudit,
     AllowSyslog,
@@ -7,6 +7,7 @@
  */
 
 pub use self::decision::Decision;
+pub use self::dir_type::DirType;
 pub use self::file_type::Rvalue;
 pub use self::object::Object;
 pub use self::object::Part as ObjPart;
@@ -24,7 +25,7 @@ pub mod parser;
 mod decision;
 mod dir_type;
 mod file_type;
-mod linter;
+pub mod linter;
 mod object;
 
 pub mod db;
@@ -6,11 +6,9 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
-use crate::db::{Entry, DB};
 use crate::dir_type::DirType;
+use crate::linter::index::Index;
 use crate::Rule;
-use is_executable::IsExecutable;
-use std::path::PathBuf;
 
 pub(crate) const L001_MESSAGE: &str = "Using any+all+all here will short-circuit all other rules";
 pub(crate) const L002_MESSAGE: &str = "The subject exe not exist at";
@@ -21,9 +19,9 @@ pub(crate) const L005_MESSAGE: &str = "Directory should have trailing slash";
 pub(crate) const L006_MESSAGE: &str = "The subject exe is a directory";
 pub(crate) const L007_MESSAGE: &str = "The subject exe is not executable";
 
-pub fn l001(fk: usize, r: &Rule, db: &DB) -> Option<String> {
-    let id = db.rule_rev(fk).map(|e| e.id).unwrap();
-    if id < db.rules().len() // rules are indexed from 1
+pub fn l001(fk: usize, r: &Rule, idx: &Index) -> Option<String> {
+    let id = idx.id(fk).unwrap();
+    if id < idx.rule_count() // rules are indexed from 1
         && r.perm.is_any()
         && r.subj.is_all()
         && r.obj.is_all()
@@ -34,34 +32,13 @@ pub fn l001(fk: usize, r: &Rule, db: &DB) -> Option<String> {
     }
 }
 
-pub fn l002_subject_path_missing(_: usize, r: &Rule, _db: &DB) -> Option<String> {
-    if let Some(path) = r.subj.exe().map(PathBuf::from) {
-        if !path.exists() {
-            Some(format!("{} {}", L002_MESSAGE, path.display()))
-        } else {
-            None
-        }
-    } else {
-        None
+pub fn l002_subject_path_missing(_: usize, r: &Rule, idx: &Index) -> Option<String> {
+    match r.subj.exe() {
+        Some(path) if !idx.stat(&path).exists => Some(format!("{} {}", L002_MESSAGE, path)),
+        _ => None,
     }
 }
 
-fn is_missing(p: &str) -> bool {
-    !PathBuf::from(p).exists()
-}
-
-fn is_dir(p: &str) -> bool {
-    PathBuf::from(p).is_dir()
-}
-
-fn is_file(p: &str) -> bool {
-    PathBuf::from(p).is_file()
-}
-
-fn is_executable(p: &str) -> bool {
-    PathBuf::from(p).is_executable()
-}
-
 fn path_does_not_exist_message(t: &str, p: &str) -> String {
     format!("{} {} {}", t, L003_MESSAGE_A, p)
 }
@@ -78,9 +55,10 @@ fn wrong_type_message(t: &str) -> String {
     format!("{} {}", L003_MESSAGE_B, t)
 }
 
-pub fn l003_object_path_missing(_: usize, r: &Rule, _db: &DB) -> Option<String> {
+pub fn l003_object_path_missing(_: usize, r: &Rule, idx: &Index) -> Option<String> {
     use crate::object::Part;
 
+    let is_missing = |p: &str| !idx.stat(p).exists;
     r.obj
         .parts
         .iter()
@@ -90,8 +68,10 @@ pub fn l003_object_path_missing(_: usize, r: &Rule, _db: &DB) -> Option<String>
             Part::Dir(DirType::Path(p)) if is_missing(p) => {
                 Some(path_does_not_exist_message("dir", p))
             }
-            Part::Dir(DirType::Path(p)) if !is_dir(p) => Some(wrong_type_message("dir")),
-            Part::Device(p) | Part::Path(p) if !is_file(p) => Some(wrong_type_message("file")),
+            Part::Dir(DirType::Path(p)) if !idx.stat(p).dir => Some(wrong_type_message("dir")),
+            Part::Device(p) | Part::Path(p) if !idx.stat(p).file => {
+                Some(wrong_type_message("file"))
+            }
             _ => None,
         })
         .collect::<Vec<String>>()
@@ -99,21 +79,12 @@ pub fn l003_object_path_missing(_: usize, r: &Rule, _db: &DB) -> Option<String>
         .cloned()
 }
 
-pub fn l004_duplicate_rule(fk: usize, r: &Rule, db: &DB) -> Option<String> {
-    db.iter()
-        .filter_map(|(&fk2, (_, e))| match e {
-            Entry::ValidRule(other) if fk != fk2 && other == r => {
-                let dupe = db.rule_rev(fk2).map(|e| e.id).unwrap();
-                Some(format!("{} {}", L004_MESSAGE, dupe))
-            }
-            _ => None,
-        })
-        .collect::<Vec<String>>()
-        .first()
-        .cloned()
+pub fn l004_duplicate_rule(fk: usize, _: &Rule, idx: &Index) -> Option<String> {
+    idx.duplicate_of(fk)
+        .map(|dupe| format!("{} {}", L004_MESSAGE, dupe))
 }
 
-pub fn l005_object_dir_missing_trailing_slash(_: usize, r: &Rule, _db: &DB) -> Option<String> {
+pub fn l005_object_dir_missing_trailing_slash(_: usize, r: &Rule, _: &Index) -> Option<String> {
     use crate::object::Part;
 
     r.obj
@@ -128,15 +99,15 @@ pub fn l005_object_dir_missing_trailing_slash(_: usize, r: &Rule, _db: &DB) -> O
         .cloned()
 }
 
-pub fn l006_l007_subject_exe(_: usize, r: &Rule, _db: &DB) -> Option<String> {
+pub fn l006_l007_subject_exe(_: usize, r: &Rule, idx: &Index) -> Option<String> {
     use crate::subject::Part;
 
     r.subj
         .parts
         .iter()
         .filter_map(|p| match p {
-            Part::Exe(p) if is_dir(p) => Some(exe_is_a_directory(p)),
-            Part::Exe(p) if !is_executable(p) => Some(exe_is_not_executable(p)),
+            Part::Exe(p) if idx.stat(p).dir => Some(exe_is_a_directory(p)),
+            Part::Exe(p) if !idx.stat(p).executable => Some(exe_is_not_executable(p)),
             _ => None,
         })
         .collect::<Vec<String>>()
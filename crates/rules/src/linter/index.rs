@@ -0,0 +1,205 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::hash_map::DefaultHasher;
+use std::collections::{HashMap, HashSet};
+use std::hash::{Hash, Hasher};
+
+use rayon::prelude::*;
+
+use crate::db::{Entry, DB};
+use crate::dir_type::DirType;
+use crate::linter::stat::{Stat, StatCache};
+use crate::{ObjPart, Rule, SubjPart};
+
+/// Lookups shared by the lints of a db, built once per lint run so that
+/// each lint is a constant time check of a rule
+pub struct Index {
+    // metadata of each distinct path named by the rules
+    stats: HashMap<String, Stat>,
+    // rule id by fk
+    ids: HashMap<usize, usize>,
+    // id of the rule that a rule duplicates, by fk
+    dupes: HashMap<usize, usize>,
+    rule_count: usize,
+}
+
+impl Index {
+    /// Index the db, taking path metadata from the cache when one is given
+    pub fn new(db: &DB, cache: Option<&StatCache>) -> Self {
+        let rules = db.rules();
+        let ids: HashMap<usize, usize> = rules.iter().map(|e| (e.fk(), e.id)).collect();
+        let dupes = duplicates(db, &ids);
+        Index {
+            stats: stats(db, cache),
+            ids,
+            dupes,
+            rule_count: rules.len(),
+        }
+    }
+
+    /// Get the metadata of a path named by a rule of the db
+    pub fn stat(&self, path: &str) -> Stat {
+        match self.stats.get(path) {
+            Some(s) => *s,
+            None => Stat::of(path),
+        }
+    }
+
+    /// Get the rule id of an fk
+    pub fn id(&self, fk: usize) -> Option<usize> {
+        self.ids.get(&fk).copied()
+    }
+
+    /// Get the id of the first other rule that is the same as the rule at the fk
+    pub fn duplicate_of(&self, fk: usize) -> Option<usize> {
+        self.dupes.get(&fk).copied()
+    }
+
+    /// Number of rules in the db, valid or not
+    pub fn rule_count(&self) -> usize {
+        self.rule_count
+    }
+}
+
+/// Stat each distinct path that the valid rules name, in parallel
+fn stats(db: &DB, cache: Option<&StatCache>) -> HashMap<String, Stat> {
+    let mut paths: HashSet<&str> = HashSet::new();
+    for (_, (_, e)) in db.iter() {
+        if let Entry::ValidRule(r) = e {
+            for p in &r.subj.parts {
+                if let SubjPart::Exe(p) = p {
+                    paths.insert(p);
+                }
+            }
+            for p in &r.obj.parts {
+                match p {
+                    ObjPart::Device(p) | ObjPart::Path(p) | ObjPart::Dir(DirType::Path(p)) => {
+                        paths.insert(p);
+                    }
+                    _ => {}
+                }
+            }
+        }
+    }
+    paths
+        .into_par_iter()
+        .map(|p| {
+            let s = match cache {
+                Some(c) => c.get(p),
+                None => Stat::of(p),
+            };
+            (p.to_string(), s)
+        })
+        .collect()
+}
+
+/// Find the duplicate rules of the db by bucketing the rules on a hash of their
+/// normalized form and then comparing only within a bucket. Each rule that has a
+/// duplicate maps to the lowest other rule it equals.
+fn duplicates(db: &DB, ids: &HashMap<usize, usize>) -> HashMap<usize, usize> {
+    let mut buckets: HashMap<u64, Vec<(usize, &Rule)>> = HashMap::new();
+    for (fk, (_, e)) in db.iter() {
+        if let Entry::ValidRule(r) = e {
+            buckets.entry(rule_hash(r)).or_default().push((*fk, r));
+        }
+    }
+
+    let mut dupes = HashMap::new();
+    for bucket in buckets.values().filter(|b| b.len() > 1) {
+        // equal rules of the bucket in fk order; a bucket rarely holds more than one class
+        let mut classes: Vec<Vec<(usize, &Rule)>> = vec![];
+        for (fk, r) in bucket {
+            match classes.iter_mut().find(|c| c[0].1 == *r) {
+                Some(c) => c.push((*fk, r)),
+                None => classes.push(vec![(*fk, r)]),
+            }
+        }
+        for class in classes.iter().filter(|c| c.len() > 1) {
+            let (first, second) = (class[0].0, class[1].0);
+            for (fk, _) in class {
+                let other = if *fk == first { second } else { first };
+                if let Some(id) = ids.get(&other) {
+                    dupes.insert(*fk, *id);
+                }
+            }
+        }
+    }
+    dupes
+}
+
+/// Hash of a rule that ignores the order of its subject and object parts, which
+/// is consistent with rule equality
+fn rule_hash(r: &Rule) -> u64 {
+    let mut h = DefaultHasher::new();
+    r.dec.hash(&mut h);
+    r.perm.hash(&mut h);
+    unordered(&r.subj.parts).hash(&mut h);
+    unordered(&r.obj.parts).hash(&mut h);
+    h.finish()
+}
+
+/// Combine the hashes of the items so that their order does not matter
+fn unordered<T: Hash>(items: &[T]) -> u64 {
+    items
+        .iter()
+        .map(|i| {
+            let mut h = DefaultHasher::new();
+            i.hash(&mut h);
+            h.finish()
+        })
+        .fold(0, u64::wrapping_add)
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use crate::{Decision, ObjPart, Object, Permission, SubjPart, Subject};
+
+    fn rule(uid: u32, gid: u32) -> Rule {
+        Rule::new(
+            Subject::new(vec![SubjPart::Uid(uid), SubjPart::Gid(gid)]),
+            Permission::Any,
+            Object::new(vec![ObjPart::All]),
+            Decision::Deny,
+        )
+    }
+
+    #[test]
+    fn duplicates_by_hash() {
+        let entry = |uid, gid| ("a".to_string(), Entry::ValidRule(rule(uid, gid)));
+        let db: DB = vec![
+            entry(1, 2),
+            ("a".to_string(), Entry::Comment("c".to_string())),
+            entry(2, 1),
+            entry(2, 1),
+            entry(1, 2),
+            entry(1, 2),
+        ]
+        .into();
+        let idx = Index::new(&db, None);
+        assert_eq!(idx.rule_count(), 5);
+        assert_eq!(idx.id(2), Some(2));
+
+        // rules 1, 4 and 5 are the same, as are rules 2 and 3
+        assert_eq!(idx.duplicate_of(0), Some(4));
+        assert_eq!(idx.duplicate_of(4), Some(1));
+        assert_eq!(idx.duplicate_of(5), Some(1));
+        assert_eq!(idx.duplicate_of(2), Some(3));
+        assert_eq!(idx.duplicate_of(3), Some(2));
+        assert_eq!(idx.duplicate_of(1), None);
+    }
+
+    #[test]
+    fn hash_ignores_part_order() {
+        let mut r = rule(1, 2);
+        r.subj.parts.reverse();
+        assert_eq!(rule_hash(&r), rule_hash(&rule(1, 2)));
+        assert_ne!(rule_hash(&rule(1, 2)), rule_hash(&rule(2, 1)));
+    }
+}
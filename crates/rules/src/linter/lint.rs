@@ -6,13 +6,25 @@
  * file, You can obtain one at https://mozilla.org/MPL/2.0/.
  */
 
+use rayon::prelude::*;
+
 use crate::db::{Entry, DB};
 use crate::linter::findings::*;
+use crate::linter::index::Index;
+use crate::linter::stat::StatCache;
 use crate::Rule;
 
-type LintFn = fn(usize, &Rule, &DB) -> Option<String>;
+type LintFn = fn(usize, &Rule, &Index) -> Option<String>;
 
+/// Lint the valid rules of the db, marking each rule that has findings with the first of them.
+/// The lookups the lints need are indexed once up front, so linting is linear in the db size.
 pub fn lint_db(db: DB) -> DB {
+    lint_db_with(db, None)
+}
+
+/// Lint the db, taking the metadata of the paths in its rules from the cache when one is
+/// given. Each distinct path is stat'd once per run, and the rules are linted in parallel.
+pub fn lint_db_with(db: DB, cache: Option<&StatCache>) -> DB {
     let lints: Vec<LintFn> = vec![
         l001,
         l002_subject_path_missing,
@@ -22,10 +34,13 @@ pub fn lint_db(db: DB) -> DB {
         l006_l007_subject_exe,
     ];
 
-    db.iter()
+    let idx = Index::new(&db, cache);
+    let entries: Vec<_> = db.iter().collect();
+    entries
+        .par_iter()
         .map(|(&fk, (source, def))| match def {
             Entry::ValidRule(r) => {
-                let x: Vec<String> = lints.iter().filter_map(|f| f(fk, r, &db)).collect();
+                let x: Vec<String> = lints.iter().filter_map(|f| f(fk, r, &idx)).collect();
                 if x.is_empty() {
                     (source.clone(), Entry::ValidRule(r.clone()))
                 } else {
@@ -7,4 +7,6 @@
  */
 
 mod findings;
+mod index;
 pub mod lint;
+pub mod stat;
@@ -0,0 +1,168 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::HashMap;
+use std::fs;
+use std::os::unix::fs::PermissionsExt;
+use std::sync::{Mutex, MutexGuard};
+use std::time::{Duration, Instant};
+
+/// Filesystem metadata of a path that the lints check, symlinks are followed
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub struct Stat {
+    pub exists: bool,
+    pub dir: bool,
+    pub file: bool,
+    pub executable: bool,
+}
+
+impl Stat {
+    /// Stat a path; only a symlink takes a second call, to stat its target
+    pub fn of(path: &str) -> Stat {
+        let m = match fs::symlink_metadata(path) {
+            Ok(m) if m.file_type().is_symlink() => fs::metadata(path),
+            m => m,
+        };
+        match m {
+            Ok(m) => Stat {
+                exists: true,
+                dir: m.is_dir(),
+                file: m.is_file(),
+                executable: m.is_file() && m.permissions().mode() & 0o111 != 0,
+            },
+            // a dangling symlink does not exist
+            Err(_) => Stat::default(),
+        }
+    }
+}
+
+/// Cache of path metadata that outlives a lint run, so that validating rules
+/// over and over does not stat the same paths each time. An entry is reused
+/// until it is older than the ttl, and expired entries are pruned at most once
+/// per ttl as paths are added.
+#[derive(Debug)]
+pub struct StatCache {
+    ttl: Duration,
+    entries: Mutex<Entries>,
+}
+
+#[derive(Debug)]
+struct Entries {
+    pruned: Instant,
+    stats: HashMap<String, (Instant, Stat)>,
+}
+
+impl StatCache {
+    pub fn new(ttl: Duration) -> Self {
+        StatCache {
+            ttl,
+            entries: Mutex::new(Entries {
+                pruned: Instant::now(),
+                stats: HashMap::new(),
+            }),
+        }
+    }
+
+    /// Get the metadata of a path, from the cache while its entry is fresh
+    pub fn get(&self, path: &str) -> Stat {
+        let now = Instant::now();
+        if let Some((at, s)) = self.lock().stats.get(path) {
+            if now.duration_since(*at) < self.ttl {
+                return *s;
+            }
+        }
+        // stat without the lock so that paths are looked up concurrently
+        let s = Stat::of(path);
+        let mut entries = self.lock();
+        if now.saturating_duration_since(entries.pruned) >= self.ttl {
+            let ttl = self.ttl;
+            entries
+                .stats
+                .retain(|_, (at, _)| now.saturating_duration_since(*at) < ttl);
+            entries.pruned = now;
+        }
+        entries.stats.insert(path.to_string(), (now, s));
+        s
+    }
+
+    /// Drop all entries, such as after the filesystem was changed
+    pub fn clear(&self) {
+        self.lock().stats.clear();
+    }
+
+    pub fn len(&self) -> usize {
+        self.lock().stats.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.lock().stats.is_empty()
+    }
+
+    fn lock(&self) -> MutexGuard<'_, Entries> {
+        self.entries.lock().unwrap_or_else(|e| e.into_inner())
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::os::unix::fs::symlink;
+
+    #[test]
+    fn stat_follows_symlinks() -> Result<(), Box<dyn std::error::Error>> {
+        let dir = tempfile::tempdir()?;
+        let exe = dir.path().join("exe");
+        fs::write(&exe, "#!/bin/sh")?;
+        fs::set_permissions(&exe, fs::Permissions::from_mode(0o755))?;
+        let link = dir.path().join("link");
+        symlink(&exe, &link)?;
+        let dangling = dir.path().join("dangling");
+        symlink(dir.path().join("missing"), &dangling)?;
+
+        let s = Stat::of(link.to_str().unwrap());
+        assert!(s.exists && s.file && s.executable && !s.dir);
+        assert!(Stat::of(dir.path().to_str().unwrap()).dir);
+        assert_eq!(Stat::of(dangling.to_str().unwrap()), Stat::default());
+        Ok(())
+    }
+
+    #[test]
+    fn cache_entries_expire() -> Result<(), Box<dyn std::error::Error>> {
+        let dir = tempfile::tempdir()?;
+        let path = dir.path().join("file");
+        let p = path.to_str().unwrap();
+
+        let cache = StatCache::new(Duration::from_secs(3600));
+        assert!(!cache.get(p).exists);
+        fs::write(&path, "")?;
+        // still the cached entry
+        assert!(!cache.get(p).exists);
+        assert_eq!(cache.len(), 1);
+        cache.clear();
+        assert!(cache.get(p).exists);
+
+        let cache = StatCache::new(Duration::from_secs(0));
+        assert!(cache.get(p).exists);
+        fs::remove_file(&path)?;
+        assert!(!cache.get(p).exists);
+        Ok(())
+    }
+
+    #[test]
+    fn expired_entries_are_pruned() {
+        let cache = StatCache::new(Duration::from_millis(200));
+        for i in 0..10 {
+            cache.get(&format!("/nonexistent/{}", i));
+        }
+        assert_eq!(cache.len(), 10);
+
+        std::thread::sleep(Duration::from_millis(250));
+        cache.get("/nonexistent/new");
+        assert_eq!(cache.len(), 1);
+    }
+}
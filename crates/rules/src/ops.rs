@@ -10,7 +10,8 @@ use crate::db::{RuleEntry, DB};
 
 use crate::error::Error;
 use crate::error::Error::ZeroRulesDefined;
-use crate::read::deserialize_rules_db;
+use crate::linter::stat::StatCache;
+use crate::read::deserialize_rules_db_with;
 
 // Mutable
 #[derive(Default, Clone, Debug)]
@@ -29,7 +30,12 @@ impl Changeset {
     }
 
     pub fn set(&mut self, text: &str) -> Result<&DB, Error> {
-        match deserialize_rules_db(text) {
+        self.set_with(text, None)
+    }
+
+    /// Set the rules text, linting with path metadata from the cache when one is given
+    pub fn set_with(&mut self, text: &str, cache: Option<&StatCache>) -> Result<&DB, Error> {
+        match deserialize_rules_db_with(text, cache) {
             Ok(r) if r.is_empty_rules() => Err(ZeroRulesDefined),
             Ok(r) => {
                 self.db = r;
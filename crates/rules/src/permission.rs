@@ -11,7 +11,7 @@ use std::fmt::{Display, Formatter};
 /// # Permission
 /// Describes what kind permission is being asked for. The permission is either
 ///
-#[derive(Clone, Debug, PartialEq)]
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
 pub enum Permission {
     Any,
     Open,
@@ -16,7 +16,8 @@ use nom::sequence::tuple;
 
 use crate::db::{Entry, DB};
 use crate::error::Error;
-use crate::linter::lint::lint_db;
+use crate::linter::lint::lint_db_with;
+use crate::linter::stat::StatCache;
 use crate::load::RuleFrom::{Disk, Mem};
 use crate::load::RuleSource;
 use crate::parser::parse::{StrTrace, TraceResult};
@@ -78,14 +79,19 @@ fn blank_line(i: StrTrace) -> TraceResult<StrTrace> {
 }
 
 pub fn deserialize_rules_db(text: &str) -> Result<DB, Error> {
-    read_rules_db(load::rules_from(Mem(text.to_string()))?)
+    deserialize_rules_db_with(text, None)
+}
+
+/// Deserialize rules text, linting with path metadata from the cache when one is given
+pub fn deserialize_rules_db_with(text: &str, cache: Option<&StatCache>) -> Result<DB, Error> {
+    read_rules_db(load::rules_from(Mem(text.to_string()))?, cache)
 }
 
 pub fn load_rules_db(path: &str) -> Result<DB, Error> {
-    read_rules_db(load::rules_from(Disk(PathBuf::from(path)))?)
+    read_rules_db(load::rules_from(Disk(PathBuf::from(path)))?, None)
 }
 
-fn read_rules_db(xs: Vec<RuleSource>) -> Result<DB, Error> {
+fn read_rules_db(xs: Vec<RuleSource>, cache: Option<&StatCache>) -> Result<DB, Error> {
     let lookup: Vec<(String, Entry)> = xs
         .iter()
         .map(relativized_path)
@@ -111,7 +117,7 @@ fn read_rules_db(xs: Vec<RuleSource>) -> Result<DB, Error> {
         })
         .collect();
 
-    Ok(lint_db(DB::from_sources(lookup)))
+    Ok(lint_db_with(DB::from_sources(lookup), cache))
 }
 
 fn relativized_path(i: &(PathBuf, String)) -> (String, &String) {
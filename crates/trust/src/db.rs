@@ -82,6 +82,11 @@ impl DB {
         self.lookup.insert(v.trusted.path.clone(), v)
     }
 
+    /// Remove a record from the lookup table using the path to the trusted file
+    pub fn remove(&mut self, k: &str) -> Option<Rec> {
+        self.lookup.remove(k)
+    }
+
     /// Get a record from the lookup table using the path to the trusted file
     pub fn get_mut(&mut self, k: &str) -> Option<&mut Rec> {
         self.lookup.get_mut(k)
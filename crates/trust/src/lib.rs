@@ -18,4 +18,5 @@ pub mod parse;
 pub mod check;
 pub mod load;
 pub mod read;
+pub mod watch;
 pub mod write;
@@ -0,0 +1,517 @@
+/*
+ * Copyright Concurrent Technologies Corporation 2021
+ *
+ * This Source Code Form is subject to the terms of the Mozilla Public
+ * License, v. 2.0. If a copy of the MPL was not distributed with this
+ * file, You can obtain one at https://mozilla.org/MPL/2.0/.
+ */
+
+use std::collections::{HashMap, HashSet};
+use std::ffi::CString;
+use std::io;
+use std::os::unix::ffi::OsStrExt;
+use std::os::unix::io::RawFd;
+use std::path::{Path, PathBuf};
+
+use crate::db::{Rec, DB};
+use crate::error::Error;
+use crate::read;
+use crate::source::TrustSource;
+
+/// Default bound on the number of trusted file parent directories to watch
+/// Each directory costs one inotify watch, which is a limited per-user resource
+pub const DEFAULT_MAX_DIRS: usize = 1024;
+
+const WATCH_MASK: u32 = libc::IN_CLOSE_WRITE
+    | libc::IN_CREATE
+    | libc::IN_DELETE
+    | libc::IN_MOVED_FROM
+    | libc::IN_MOVED_TO
+    | libc::IN_ATTRIB;
+
+// inotify_event header; wd, mask, cookie, len
+const EVENT_HEADER_LEN: usize = 16;
+const EVENT_BUFFER_LEN: usize = 64 * 1024;
+
+/// A filesystem change that invalidates trust state
+#[derive(Clone, Debug, PartialEq, Eq, Hash)]
+pub enum Change {
+    /// A trust source changed; fapolicyd.trust or a trust.d file
+    Source(PathBuf),
+    /// A trusted file changed
+    File(String),
+    /// The kernel event queue overflowed, changes were lost
+    Overflow,
+}
+
+/// The records affected by a set of changes
+#[derive(Debug, Default)]
+pub struct Refresh {
+    /// Records that were added or re-verified
+    pub updated: Vec<Rec>,
+    /// Paths that are no longer trusted
+    pub removed: Vec<String>,
+}
+
+impl Refresh {
+    pub fn is_empty(&self) -> bool {
+        self.updated.is_empty() && self.removed.is_empty()
+    }
+
+    /// Push the refreshed records into a trust database
+    pub fn merge_into(&self, db: &mut DB) {
+        for p in &self.removed {
+            db.remove(p);
+        }
+        for r in &self.updated {
+            db.put(r.clone());
+        }
+    }
+}
+
+/// Inotify backed watch over the trust sources and the parent directories of trusted files
+pub struct Watch {
+    fd: RawFd,
+    trust_d: PathBuf,
+    trust_file: Option<PathBuf>,
+    dirs: HashMap<i32, PathBuf>,
+    // the watched dirs, for constant time lookup by path
+    watched: HashSet<PathBuf>,
+    // number of trusted file dirs that can still be watched
+    budget: usize,
+    tracked: HashSet<String>,
+}
+
+impl Watch {
+    /// Create a watch on the trust sources and up to `max_dirs` trusted file directories
+    /// Ancillary trust is given priority over system trust when the bound is reached
+    pub fn new(
+        db: &DB,
+        trust_d: &Path,
+        trust_file: Option<&Path>,
+        max_dirs: usize,
+    ) -> Result<Watch, Error> {
+        let fd = unsafe { libc::inotify_init1(libc::IN_NONBLOCK | libc::IN_CLOEXEC) };
+        if fd < 0 {
+            return Err(io::Error::last_os_error().into());
+        }
+
+        let mut w = Watch {
+            fd,
+            trust_d: trust_d.to_path_buf(),
+            trust_file: trust_file.map(Path::to_path_buf),
+            dirs: HashMap::new(),
+            watched: HashSet::new(),
+            budget: max_dirs,
+            tracked: HashSet::new(),
+        };
+
+        // the sources are always watched, the file is watched through its parent
+        // so that replacement by rename is observed
+        w.add(trust_d)?;
+        if let Some(parent) = trust_file.and_then(Path::parent) {
+            w.add(parent)?;
+        }
+
+        let mut recs: Vec<&Rec> = db.values();
+        recs.sort_by_key(|r| !r.is_ancillary());
+
+        for r in recs {
+            w.track(&r.trusted.path)?;
+        }
+
+        log::debug!(
+            "watching {} directories covering {} trusted files",
+            w.dirs.len(),
+            w.tracked.len()
+        );
+        Ok(w)
+    }
+
+    /// Number of directories being watched
+    pub fn len(&self) -> usize {
+        self.dirs.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.dirs.is_empty()
+    }
+
+    /// Track a trusted file, such as one newly trusted by a source, watching its
+    /// parent directory while fewer than `max_dirs` are watched.
+    /// Returns false when the file could not be tracked.
+    pub fn track(&mut self, path: &str) -> Result<bool, Error> {
+        let parent = match Path::new(path).parent() {
+            Some(p) => p,
+            None => return Ok(false),
+        };
+        if !self.watched.contains(parent) {
+            if self.budget == 0 || !self.add(parent)? {
+                return Ok(false);
+            }
+            self.budget -= 1;
+        }
+        self.tracked.insert(path.to_string());
+        Ok(true)
+    }
+
+    /// Stop tracking a file that is no longer trusted, its directory stays watched
+    pub fn untrack(&mut self, path: &str) {
+        self.tracked.remove(path);
+    }
+
+    // returns false when the path could not be watched but watching should continue
+    fn add(&mut self, dir: &Path) -> Result<bool, Error> {
+        if self.watched.contains(dir) {
+            return Ok(true);
+        }
+        let cpath = match CString::new(dir.as_os_str().as_bytes()) {
+            Ok(p) => p,
+            Err(_) => return Ok(false),
+        };
+        let wd = unsafe { libc::inotify_add_watch(self.fd, cpath.as_ptr(), WATCH_MASK) };
+        if wd < 0 {
+            let e = io::Error::last_os_error();
+            return match e.raw_os_error() {
+                Some(libc::ENOENT) | Some(libc::EACCES) | Some(libc::ENOTDIR) => {
+                    log::debug!("unable to watch {}: {}", dir.display(), e);
+                    Ok(false)
+                }
+                Some(libc::ENOSPC) => {
+                    log::warn!("inotify watch limit reached at {}", dir.display());
+                    Ok(false)
+                }
+                _ => Err(e.into()),
+            };
+        }
+        self.dirs.insert(wd, dir.to_path_buf());
+        self.watched.insert(dir.to_path_buf());
+        Ok(true)
+    }
+
+    /// Wait up to `timeout_ms` for changes
+    /// Returns an empty Vec when the timeout expires without change
+    pub fn poll(&mut self, timeout_ms: i32) -> Result<Vec<Change>, Error> {
+        let mut pfd = libc::pollfd {
+            fd: self.fd,
+            events: libc::POLLIN,
+            revents: 0,
+        };
+        let ready = unsafe { libc::poll(&mut pfd, 1, timeout_ms) };
+        if ready < 0 {
+            let e = io::Error::last_os_error();
+            return match e.kind() {
+                io::ErrorKind::Interrupted => Ok(vec![]),
+                _ => Err(e.into()),
+            };
+        }
+
+        let mut changes = vec![];
+        let mut buffer = vec![0u8; EVENT_BUFFER_LEN];
+        loop {
+            let n = unsafe {
+                libc::read(
+                    self.fd,
+                    buffer.as_mut_ptr() as *mut libc::c_void,
+                    buffer.len(),
+                )
+            };
+            if n < 0 {
+                let e = io::Error::last_os_error();
+                match e.kind() {
+                    io::ErrorKind::WouldBlock => break,
+                    io::ErrorKind::Interrupted => continue,
+                    _ => return Err(e.into()),
+                }
+            }
+            if n == 0 {
+                break;
+            }
+            for (wd, mask, name) in parse_events(&buffer[..n as usize]) {
+                if let Some(c) = self.classify(wd, mask, name) {
+                    if !changes.contains(&c) {
+                        changes.push(c);
+                    }
+                }
+            }
+        }
+        Ok(changes)
+    }
+
+    fn classify(&self, wd: i32, mask: u32, name: &[u8]) -> Option<Change> {
+        if mask & libc::IN_Q_OVERFLOW != 0 {
+            return Some(Change::Overflow);
+        }
+        let dir = self.dirs.get(&wd)?;
+        let path = dir.join(std::ffi::OsStr::from_bytes(name));
+
+        if dir == &self.trust_d && path.extension().map_or(false, |x| x == "trust") {
+            return Some(Change::Source(path));
+        }
+        if matches!(&self.trust_file, Some(f) if f == &path) {
+            return Some(Change::Source(path));
+        }
+        let path = path.display().to_string();
+        if self.tracked.contains(&path) {
+            Some(Change::File(path))
+        } else {
+            None
+        }
+    }
+}
+
+impl Drop for Watch {
+    fn drop(&mut self) {
+        unsafe { libc::close(self.fd) };
+    }
+}
+
+// split a read buffer into (wd, mask, name) tuples
+fn parse_events(buf: &[u8]) -> Vec<(i32, u32, &[u8])> {
+    let mut events = vec![];
+    let mut i = 0;
+    while i + EVENT_HEADER_LEN <= buf.len() {
+        let word = |o: usize| [buf[i + o], buf[i + o + 1], buf[i + o + 2], buf[i + o + 3]];
+        let wd = i32::from_ne_bytes(word(0));
+        let mask = u32::from_ne_bytes(word(4));
+        let len = u32::from_ne_bytes(word(12)) as usize;
+        let start = i + EVENT_HEADER_LEN;
+        let end = (start + len).min(buf.len());
+        // the name is nul padded to alignment
+        let name = &buf[start..end];
+        let name = match name.iter().position(|b| *b == 0) {
+            Some(nul) => &name[..nul],
+            None => name,
+        };
+        events.push((wd, mask, name));
+        i = start + len;
+    }
+    events
+}
+
+/// Re-verify only the records affected by the changes
+pub fn refresh(
+    db: &DB,
+    changes: &[Change],
+    trust_d: &Path,
+    trust_file: Option<&Path>,
+) -> Result<Refresh, Error> {
+    let overflow = changes.contains(&Change::Overflow);
+    let sources: Vec<TrustSource> = changes
+        .iter()
+        .filter_map(|c| match c {
+            Change::Source(p) if Some(p.as_path()) == trust_file => Some(TrustSource::Ancillary),
+            Change::Source(p) => Some(TrustSource::DFile(p.display().to_string())),
+            _ => None,
+        })
+        .collect();
+
+    let mut refresh = Refresh::default();
+    let mut seen: HashSet<String> = HashSet::new();
+
+    if overflow || !sources.is_empty() {
+        let affected = |s: &TrustSource| overflow || sources.contains(s);
+        let entries: Vec<(TrustSource, crate::Trust)> = read::file_trust(trust_d, trust_file)?
+            .into_iter()
+            .filter(|(s, _)| affected(s))
+            .collect();
+
+        let current: HashSet<&str> = entries.iter().map(|(_, t)| t.path.as_str()).collect();
+        for r in db.values() {
+            if matches!(&r.source, Some(s) if affected(s))
+                && !current.contains(r.trusted.path.as_str())
+            {
+                refresh.removed.push(r.trusted.path.clone());
+            }
+        }
+
+        for (s, t) in entries {
+            let unchanged = matches!(db.get(&t.path), Some(r) if r.trusted == t && r.source.as_ref() == Some(&s));
+            if !unchanged {
+                seen.insert(t.path.clone());
+                check_into(Rec::from_source(t, s), &mut refresh);
+            }
+        }
+    }
+
+    for c in changes {
+        let path = match c {
+            Change::File(path) => path,
+            _ => continue,
+        };
+        if seen.insert(path.clone()) {
+            if let Some(r) = db.get(path) {
+                check_into(r.clone(), &mut refresh);
+            }
+        }
+    }
+
+    if overflow {
+        for (path, r) in db.iter() {
+            if !seen.contains(path) && r.is_ancillary() {
+                check_into(r.clone(), &mut refresh);
+            }
+        }
+    }
+
+    Ok(refresh)
+}
+
+fn check_into(r: Rec, refresh: &mut Refresh) {
+    let path = r.trusted.path.clone();
+    match Rec::status_check(r) {
+        Ok(r) => refresh.updated.push(r),
+        Err(e) => log::warn!("failed to check {}: {}", path, e),
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use std::fs;
+    use std::io::Write;
+
+    use crate::stat::Status;
+    use crate::Trust;
+
+    use super::*;
+
+    fn trusted_rec(p: &Path, s: TrustSource) -> Rec {
+        Rec::from_source(Trust::new(&p.display().to_string(), 0, "00"), s)
+    }
+
+    #[test]
+    fn parse_event_buffer() {
+        let mut buf = vec![];
+        buf.extend_from_slice(&7i32.to_ne_bytes());
+        buf.extend_from_slice(&libc::IN_CLOSE_WRITE.to_ne_bytes());
+        buf.extend_from_slice(&0u32.to_ne_bytes());
+        buf.extend_from_slice(&8u32.to_ne_bytes());
+        buf.extend_from_slice(b"foo\0\0\0\0\0");
+        buf.extend_from_slice(&9i32.to_ne_bytes());
+        buf.extend_from_slice(&libc::IN_DELETE.to_ne_bytes());
+        buf.extend_from_slice(&0u32.to_ne_bytes());
+        buf.extend_from_slice(&0u32.to_ne_bytes());
+
+        let events = parse_events(&buf);
+        assert_eq!(events.len(), 2);
+        assert_eq!(events[0], (7, libc::IN_CLOSE_WRITE, &b"foo"[..]));
+        assert_eq!(events[1], (9, libc::IN_DELETE, &b""[..]));
+    }
+
+    #[test]
+    fn watch_trusted_file() -> Result<(), Box<dyn std::error::Error>> {
+        let dir = tempfile::tempdir()?;
+        let trust_d = dir.path().join("trust.d");
+        fs::create_dir(&trust_d)?;
+        let bin = dir.path().join("bin");
+        fs::create_dir(&bin)?;
+        let exe = bin.join("foo");
+        fs::write(&exe, "foo")?;
+
+        let mut db = DB::new();
+        db.put(trusted_rec(&exe, TrustSource::Ancillary));
+
+        let mut w = Watch::new(&db, &trust_d, None, DEFAULT_MAX_DIRS)?;
+        assert_eq!(w.len(), 2);
+
+        fs::write(&exe, "bar")?;
+        let changes = w.poll(1000)?;
+        assert_eq!(changes, vec![Change::File(exe.display().to_string())]);
+
+        let r = refresh(&db, &changes, &trust_d, None)?;
+        assert_eq!(r.updated.len(), 1);
+        assert!(matches!(
+            r.updated[0].status,
+            Some(Status::Discrepancy(_, _))
+        ));
+        Ok(())
+    }
+
+    #[test]
+    fn watch_trust_source() -> Result<(), Box<dyn std::error::Error>> {
+        let dir = tempfile::tempdir()?;
+        let trust_d = dir.path().join("trust.d");
+        fs::create_dir(&trust_d)?;
+        let trust_file = dir.path().join("fapolicyd.trust");
+        let exe = dir.path().join("foo");
+        fs::write(&exe, "foo")?;
+        fs::write(&trust_file, "")?;
+
+        let db = DB::new();
+        let mut w = Watch::new(&db, &trust_d, Some(&trust_file), DEFAULT_MAX_DIRS)?;
+
+        let mut f = fs::OpenOptions::new().append(true).open(&trust_file)?;
+        writeln!(f, "{} 3 abc", exe.display())?;
+        drop(f);
+
+        let changes = w.poll(1000)?;
+        assert!(changes.contains(&Change::Source(trust_file.clone())));
+
+        let mut db = db;
+        let r = refresh(&db, &changes, &trust_d, Some(&trust_file))?;
+        assert_eq!(r.updated.len(), 1);
+        assert!(r.removed.is_empty());
+
+        r.merge_into(&mut db);
+        assert!(db.get(&exe.display().to_string()).is_some());
+        Ok(())
+    }
+
+    #[test]
+    fn bounded_dirs() -> Result<(), Box<dyn std::error::Error>> {
+        let dir = tempfile::tempdir()?;
+        let trust_d = dir.path().join("trust.d");
+        fs::create_dir(&trust_d)?;
+
+        let mut db = DB::new();
+        for i in 0..4 {
+            let d = dir.path().join(format!("d{}", i));
+            fs::create_dir(&d)?;
+            db.put(trusted_rec(&d.join("x"), TrustSource::System));
+        }
+        let mut w = Watch::new(&db, &trust_d, None, 2)?;
+        assert_eq!(w.len(), 3);
+        assert_eq!(w.tracked.len(), 2);
+
+        // a file in a watched dir is tracked, one in a new dir is over the bound
+        let watched = w.tracked.iter().next().unwrap().replace("/x", "/y");
+        assert!(w.track(&watched)?);
+        assert!(!w.track(&dir.path().join("d9/x").display().to_string())?);
+        assert_eq!(w.len(), 3);
+        assert_eq!(w.tracked.len(), 3);
+        Ok(())
+    }
+
+    #[test]
+    fn track_newly_trusted() -> Result<(), Box<dyn std::error::Error>> {
+        let dir = tempfile::tempdir()?;
+        let trust_d = dir.path().join("trust.d");
+        fs::create_dir(&trust_d)?;
+        let trust_file = dir.path().join("fapolicyd.trust");
+        fs::write(&trust_file, "")?;
+        let bin = dir.path().join("bin");
+        fs::create_dir(&bin)?;
+        let exe = bin.join("foo");
+        fs::write(&exe, "foo")?;
+
+        let mut db = DB::new();
+        let mut w = Watch::new(&db, &trust_d, Some(&trust_file), DEFAULT_MAX_DIRS)?;
+        fs::write(&trust_file, format!("{} 3 abc\n", exe.display()))?;
+        let changes = w.poll(1000)?;
+        let r = refresh(&db, &changes, &trust_d, Some(&trust_file))?;
+        r.merge_into(&mut db);
+        for rec in &r.updated {
+            assert!(w.track(&rec.trusted.path)?);
+        }
+
+        // edits to the newly trusted file are observed
+        fs::write(&exe, "bar")?;
+        let changes = w.poll(1000)?;
+        assert_eq!(changes, vec![Change::File(exe.display().to_string())]);
+
+        w.untrack(&exe.display().to_string());
+        fs::write(&exe, "baz")?;
+        assert!(w.poll(100)?.is_empty());
+        Ok(())
+    }
+}
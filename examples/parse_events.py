@@ -28,7 +28,7 @@ def main():
     parser.add_argument("--starting", type=int, required=False, help="Bound results to this starting point, as seconds since epoch. Negative numbers will be treated as relative to now.")
     parser.add_argument("--until", type=int, required=False, help="Bound results to this ending point, as seconds since epoch. Negative numbers will be treated as relative to now.")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose mode")
-    parser.add_argument("-i", "--input", default="syslog", help="Specify the fapolicyd event debug source. Use 'syslog' or a path to debug log. [default: 'syslog']")
+    parser.add_argument("-i", "--input", default="syslog", help="Specify the fapolicyd event debug source. Use 'syslog', a path to debug log, a path to an audit log as audit:<path>, or a glob of syslogs which may be compressed. [default: 'syslog']")
 
     args = parser.parse_args()
 
@@ -57,6 +57,10 @@ def main():
 
     if args.input == "syslog":
         event_log = s1.load_syslog()
+    elif args.input.startswith("audit:"):
+        event_log = s1.load_auditlog(args.input[len("audit:"):])
+    elif "*" in args.input or "?" in args.input:
+        event_log = s1.load_syslogs(args.input)
     else:
         event_log = s1.load_debuglog(args.input)
 
@@ -22,6 +22,7 @@ BuildRequires: desktop-file-utils
 BuildRequires: rust-packaging
 BuildRequires: python3dist(setuptools-rust)
 
+BuildRequires: rust-adler2-devel
 BuildRequires: rust-assert_matches-devel
 BuildRequires: rust-autocfg-devel
 BuildRequires: rust-bitflags-devel
@@ -31,6 +32,7 @@ BuildRequires: rust-cc-devel
 BuildRequires: rust-cfg-if-devel
 BuildRequires: rust-chrono-devel
 BuildRequires: rust-confy-devel
+BuildRequires: rust-crc32fast-devel
 BuildRequires: rust-crossbeam-channel-devel
 BuildRequires: rust-crossbeam-deque-devel
 BuildRequires: rust-crossbeam-epoch-devel
@@ -41,9 +43,9 @@ BuildRequires: rust-directories-devel
 BuildRequires: rust-dirs-sys-devel
 BuildRequires: rust-either-devel
 BuildRequires: rust-fastrand-devel
+BuildRequires: rust-flate2-devel
 BuildRequires: rust-getrandom-devel
 BuildRequires: rust-iana-time-zone-devel
-BuildRequires: rust-is_executable-devel
 BuildRequires: rust-instant-devel
 BuildRequires: rust-lazy_static-devel
 BuildRequires: rust-libc-devel
@@ -54,6 +56,7 @@ BuildRequires: rust-log-devel
 BuildRequires: rust-memchr-devel
 BuildRequires: rust-memoffset-devel
 BuildRequires: rust-minimal-lexical-devel
+BuildRequires: rust-miniz_oxide-devel
 BuildRequires: rust-nom-devel
 BuildRequires: rust-num-integer-devel
 BuildRequires: rust-num-traits-devel
@@ -100,6 +103,7 @@ Requires:      python3-more-itertools
 Requires:      python3-rx
 Requires:      python3-importlib-metadata
 Requires:      python3-toml 
+Requires:      xz
 
 Requires:      gtk3
 Requires:      gtksourceview3
@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from functools import partial
 from importlib import reload
 from unittest.mock import MagicMock, call
 
@@ -28,6 +29,7 @@ from fapolicy_analyzer.ui.actions import (
     SYSTEM_RECEIVED,
     ancillary_trust_load_started,
     apply_changesets,
+    cancel_events,
     deploy_system,
     error_ancillary_trust,
     error_events,
@@ -41,6 +43,7 @@ from fapolicy_analyzer.ui.actions import (
     received_rules,
     received_rules_text,
     received_users,
+    refresh_events,
     request_ancillary_trust,
     request_events,
     request_groups,
@@ -170,8 +173,6 @@ def test_apply_changset_epic_error(mocker):
 @pytest.mark.parametrize(
     "action_to_dispatch, payload, system_fn_to_mock, receive_action_to_mock",
     [
-        (request_events, ("debug", MagicMock()), "load_debuglog", received_events),
-        (request_events, ("syslog", None), "load_syslog", received_events),
         (request_users, None, "users", received_users),
         (request_groups, None, "groups", received_groups),
         (request_rules, None, "rules", received_rules),
@@ -198,8 +199,6 @@ def test_request_epic(
 @pytest.mark.parametrize(
     "action_to_dispatch, payload, system_fn_to_mock, error_action_to_mock",
     [
-        (request_events, ("debug", MagicMock()), "load_debuglog", error_events),
-        (request_events, ("syslog", None), "load_syslog", error_events),
         (request_users, None, "users", error_users),
         (request_groups, None, "groups", error_groups),
         (request_rules, None, "rules", error_rules),
@@ -282,6 +281,126 @@ def test_request_trust_error(
     mock_error_action.assert_called_with(f"{system_fn_to_mock} error")
 
 
+@pytest.mark.parametrize(
+    "payload, file, start",
+    [
+        (("debug", "foo"), "foo", None),
+        (("audit", "foo"), "foo", None),
+        (("syslog", None), None, None),
+        (("syslog", None, 1), None, 1),
+    ],
+)
+def test_request_events(payload, file, start, mocker):
+    mock_load = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.load_events",
+        return_value=MagicMock(total=10),
+    )
+    mock_started_action = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.events_load_started"
+    )
+    mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.time.time", return_value=1
+    )
+    mock_system = MagicMock()
+    init_store(mock_system)
+    dispatch(request_events(*payload))
+
+    mock_load.assert_called_with(
+        mock_system,
+        payload[0],
+        InstanceOf(partial),
+        InstanceOf(partial),
+        file=file,
+        start=start,
+    )
+    mock_started_action.assert_called_with(10, 1)
+
+
+def test_request_events_progress_and_done(mocker):
+    mock_log = MagicMock()
+
+    def load(system, log_type, update, done, **kwargs):
+        update(5, 1)
+        done(mock_log, None)
+        return MagicMock(total=10)
+
+    mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.load_events", side_effect=load
+    )
+    mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.time.time", return_value=1
+    )
+    mock_progress_action = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.received_events_progress"
+    )
+    mock_received_action = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.received_events"
+    )
+    init_store(MagicMock())
+    dispatch(request_events("debug", "foo"))
+
+    mock_progress_action.assert_called_with(5, 1, 1)
+    mock_received_action.assert_called_with(mock_log)
+
+
+def test_request_events_error(mocker):
+    def load(system, log_type, update, done, **kwargs):
+        done(None, "load error")
+        return MagicMock(total=0)
+
+    mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.load_events", side_effect=load
+    )
+    mock_error_action = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.error_events"
+    )
+    init_store(MagicMock())
+    dispatch(request_events("syslog"))
+    mock_error_action.assert_called_with("load error")
+
+
+def test_cancel_events(mocker):
+    mock_handle = MagicMock(total=10)
+    mock_load = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.load_events",
+        return_value=mock_handle,
+    )
+    mock_received_action = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.received_events"
+    )
+    init_store(MagicMock())
+    dispatch(request_events("syslog"))
+    dispatch(cancel_events())
+    mock_handle.cancel.assert_called()
+
+    # callbacks of the cancelled load are ignored
+    _, _, update, done = mock_load.call_args[0]
+    done(MagicMock(), None)
+    mock_received_action.assert_not_called()
+
+
+def test_refresh_events(mocker):
+    mock_log = MagicMock()
+    mock_received_action = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.received_events"
+    )
+    init_store(MagicMock())
+    dispatch(refresh_events(mock_log))
+    mock_log.refresh.assert_called()
+    mock_received_action.assert_called_with(mock_log)
+
+
+def test_refresh_events_error(mocker):
+    mock_log = MagicMock()
+    mock_log.refresh.side_effect = RuntimeError("refresh error")
+    mock_error_action = mocker.patch(
+        "fapolicy_analyzer.ui.features.system_feature.error_events"
+    )
+    init_store(MagicMock())
+    dispatch(refresh_events(mock_log))
+    mock_error_action.assert_called_with("refresh error")
+
+
 def test_request_events_epic_bad_request(mocker):
     mock_received_action = mocker.patch(
         "fapolicy_analyzer.ui.features.system_feature.received_events"
@@ -64,12 +64,45 @@ def mock_events():
     ]
 
 
+def mock_relations(events):
+    def subjects(es):
+        return list({e.subject.file: e.subject for e in es}.values())
+
+    def objects(es):
+        return list({e.object.file: (e.rule_id, e.object) for e in es}.values())
+
+    return MagicMock(
+        users=lambda: list({e.uid for e in events}),
+        groups=lambda: list({e.gid for e in events}),
+        subjects=lambda: subjects(events),
+        subjects_by_user=lambda id: subjects([e for e in events if e.uid == id]),
+        subjects_by_group=lambda id: subjects([e for e in events if e.gid == id]),
+        users_by_subject=lambda f: [(e.uid, 1) for e in events if e.subject.file == f],
+        groups_by_subject=lambda f: [(e.gid, 1) for e in events if e.subject.file == f],
+        objects_by_user=lambda f, id: objects(
+            [e for e in events if e.subject.file == f and e.uid == id]
+        ),
+        objects_by_group=lambda f, id: objects(
+            [e for e in events if e.subject.file == f and e.gid == id]
+        ),
+        objects=lambda: objects(events),
+        subjects_by_object=lambda f: subjects(
+            [e for e in events if e.object.file == f]
+        ),
+        users_by_object=lambda f: [(e.uid, 1) for e in events if e.object.file == f],
+        groups_by_object=lambda f: [(e.gid, 1) for e in events if e.object.file == f],
+        untimed=lambda f: False,
+    )
+
+
 def mock_log():
     return MagicMock(
         subjects=lambda: [e.subject.file for e in mock_events()],
         by_subject=lambda f: [e for e in mock_events() if e.subject.file == f],
         by_user=lambda id: [e for e in mock_events() if e.uid == id],
         by_group=lambda id: [e for e in mock_events() if e.gid == id],
+        by_object=lambda f, dir=False: [e for e in mock_events() if e.object.file == f],
+        relations=lambda: mock_relations(mock_events()),
     )
 
 
@@ -18,8 +18,11 @@ import pytest
 from unittest.mock import MagicMock
 from fapolicy_analyzer.ui.reducers.event_reducer import (
     EventState,
+    handle_cancel_events,
     handle_error_events,
+    handle_events_load_started,
     handle_received_events,
+    handle_received_events_progress,
     handle_request_events,
 )
 
@@ -42,3 +45,33 @@ def test_handle_received_events(initial_state):
 def test_handle_error_events(initial_state):
     result = handle_error_events(initial_state, MagicMock(payload="foo"))
     assert result == EventState(error="foo", log=[], loading=False)
+
+
+def test_handle_events_load_started(initial_state):
+    result = handle_events_load_started(initial_state, MagicMock(payload=(200, 1)))
+    assert result == EventState(
+        error=None,
+        log=[],
+        loading=True,
+        percent_complete=0,
+        lines=0,
+        total=200,
+        timestamp=1,
+    )
+
+
+def test_handle_received_events_progress(initial_state):
+    state = handle_events_load_started(initial_state, MagicMock(payload=(200, 1)))
+    result = handle_received_events_progress(state, MagicMock(payload=(50, 3, 1)))
+    assert (result.percent_complete, result.lines) == (25, 3)
+
+    # progress of an older load is ignored
+    result = handle_received_events_progress(result, MagicMock(payload=(200, 9, 0)))
+    assert (result.percent_complete, result.lines) == (25, 3)
+
+
+def test_handle_cancel_events(initial_state):
+    state = handle_events_load_started(initial_state, MagicMock(payload=(200, 1)))
+    result = handle_cancel_events(state, MagicMock())
+    assert not result.loading
+    assert result.percent_complete == -1
@@ -25,6 +25,7 @@ from fapolicy_analyzer.ui.actions import (
     ANCILLARY_TRUST_LOAD_COMPLETE,
     ANCILLARY_TRUST_LOAD_STARTED,
     APPLY_CHANGESETS,
+    CANCEL_EVENTS,
     CLEAR_CHANGESETS,
     DEPLOY_SYSTEM,
     ERROR_ANCILLARY_TRUST,
@@ -38,6 +39,7 @@ from fapolicy_analyzer.ui.actions import (
     ERROR_SYSTEM_INITIALIZATION,
     ERROR_SYSTEM_TRUST,
     ERROR_USERS,
+    EVENTS_LOAD_STARTED,
     INIT_SYSTEM,
     MODIFY_RULES_TEXT,
     PROFILER_CLEAR_STATE_CMD,
@@ -51,11 +53,13 @@ from fapolicy_analyzer.ui.actions import (
     RECEIVED_ANCILLARY_TRUST_UPDATE,
     RECEIVED_APP_CONFIG,
     RECEIVED_EVENTS,
+    RECEIVED_EVENTS_PROGRESS,
     RECEIVED_GROUPS,
     RECEIVED_RULES,
     RECEIVED_RULES_TEXT,
     RECEIVED_SYSTEM_TRUST_UPDATE,
     RECEIVED_USERS,
+    REFRESH_EVENTS,
     REMOVE_NOTIFICATION,
     REQUEST_ANCILLARY_TRUST,
     REQUEST_APP_CONFIG,
@@ -81,6 +85,7 @@ from fapolicy_analyzer.ui.actions import (
     ancillary_trust_load_complete,
     ancillary_trust_load_started,
     apply_changesets,
+    cancel_events,
     clear_changesets,
     clear_profiler_state,
     deploy_system,
@@ -94,6 +99,7 @@ from fapolicy_analyzer.ui.actions import (
     error_rules_text,
     error_system_trust,
     error_users,
+    events_load_started,
     init_system,
     modify_rules_text,
     profiler_done,
@@ -104,11 +110,13 @@ from fapolicy_analyzer.ui.actions import (
     received_ancillary_trust_update,
     received_app_config,
     received_events,
+    received_events_progress,
     received_groups,
     received_rules,
     received_rules_text,
     received_system_trust_update,
     received_users,
+    refresh_events,
     remove_notification,
     request_ancillary_trust,
     request_app_config,
@@ -310,14 +318,21 @@ def test_request_sys_log_events():
     action = request_events("syslog")
     assert type(action) is Action
     assert action.type == REQUEST_EVENTS
-    assert action.payload == ("syslog", None)
+    assert action.payload == ("syslog", None, None)
+
+
+def test_request_sys_log_events_since():
+    action = request_events("syslog", start=1640692749)
+    assert type(action) is Action
+    assert action.type == REQUEST_EVENTS
+    assert action.payload == ("syslog", None, 1640692749)
 
 
 def test_request_debug_log_events():
     action = request_events("debug", "foo")
     assert type(action) is Action
     assert action.type == REQUEST_EVENTS
-    assert action.payload == ("debug", "foo")
+    assert action.payload == ("debug", "foo", None)
 
 
 def test_received_events():
@@ -328,6 +343,35 @@ def test_received_events():
     assert action.payload == events
 
 
+def test_refresh_events():
+    log = MagicMock()
+    action = refresh_events(log)
+    assert type(action) is Action
+    assert action.type == REFRESH_EVENTS
+    assert action.payload == log
+
+
+def test_events_load_started():
+    action = events_load_started(100, 1)
+    assert type(action) is Action
+    assert action.type == EVENTS_LOAD_STARTED
+    assert action.payload == (100, 1)
+
+
+def test_received_events_progress():
+    action = received_events_progress(50, 2, 1)
+    assert type(action) is Action
+    assert action.type == RECEIVED_EVENTS_PROGRESS
+    assert action.payload == (50, 2, 1)
+
+
+def test_cancel_events():
+    action = cancel_events()
+    assert type(action) is Action
+    assert action.type == CANCEL_EVENTS
+    assert not action.payload
+
+
 def test_error_events():
     action = error_events("foo")
     assert type(action) is Action
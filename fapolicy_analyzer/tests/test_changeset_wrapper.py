@@ -17,9 +17,11 @@ from unittest.mock import MagicMock
 
 import pytest
 from fapolicy_analyzer.ui.changeset_wrapper import (
+    RULE_STAT_TTL,
     Changeset,
     RuleChangeset,
     TrustChangeset,
+    rule_stat_cache,
 )
 
 
@@ -53,9 +55,23 @@ def test_RuleChangeset_parse(mocker):
     mock = mocker.patch(
         "fapolicy_analyzer.ui.changeset_wrapper.fapolicy_analyzer.RuleChangeset"
     )
+    cache = mocker.patch(
+        "fapolicy_analyzer.ui.changeset_wrapper.rule_stat_cache",
+        return_value="cache",
+    )
     sut = RuleChangeset()
     sut.parse("foo")
-    mock().parse.assert_called_with("foo")
+    mock().parse.assert_called_with("foo", stat_cache="cache")
+    cache.assert_called_once()
+
+
+def test_rule_stat_cache_is_shared(mocker):
+    mock = mocker.patch(
+        "fapolicy_analyzer.ui.changeset_wrapper.fapolicy_analyzer.RuleStatCache"
+    )
+    mocker.patch("fapolicy_analyzer.ui.changeset_wrapper._rule_stat_cache", None)
+    assert rule_stat_cache() is rule_stat_cache()
+    mock.assert_called_once_with(RULE_STAT_TTL)
 
 
 def test_RuleChangeset_rules(mocker):
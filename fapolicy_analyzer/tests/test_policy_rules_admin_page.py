@@ -19,12 +19,21 @@ from unittest.mock import MagicMock
 import gi
 import pytest
 from callee import Attrs, InstanceOf
-from mocks import mock_events, mock_groups, mock_log, mock_System, mock_users
+from mocks import (
+    mock_events,
+    mock_groups,
+    mock_log,
+    mock_relations,
+    mock_System,
+    mock_users,
+)
 from rx.subject import Subject
 
 from fapolicy_analyzer.redux import Action
 from fapolicy_analyzer.ui.actions import (
     ADD_NOTIFICATION,
+    CANCEL_EVENTS,
+    REFRESH_EVENTS,
     REQUEST_EVENTS,
     REQUEST_GROUPS,
     REQUEST_USERS,
@@ -154,7 +163,8 @@ def test_loads_debug_file(mock_dispatch):
     init_store(mock_System())
     PolicyRulesAdminPage(audit_file=_mock_file)
     mock_dispatch.assert_any_call(
-        InstanceOf(Action) & Attrs(type=REQUEST_EVENTS, payload=("debug", _mock_file))
+        InstanceOf(Action)
+        & Attrs(type=REQUEST_EVENTS, payload=("debug", _mock_file, None))
     )
 
 
@@ -162,7 +172,8 @@ def test_loads_syslog(mock_dispatch):
     init_store(mock_System())
     PolicyRulesAdminPage(use_syslog=True)
     mock_dispatch.assert_any_call(
-        InstanceOf(Action) & Attrs(type=REQUEST_EVENTS, payload=("syslog", None))
+        InstanceOf(Action)
+        & Attrs(type=REQUEST_EVENTS, payload=("syslog", None, InstanceOf(int)))
     )
 
 
@@ -231,6 +242,30 @@ def test_loads_subjects_primary(subjectListView, activeSwitcherButton, mock_disp
         assert [a[2] for a in actualSubjects if expectedSubject.file == a[2]]
 
 
+def test_loads_objects_primary(
+    widget, activeSwitcherButton, objectListView, subjectListView, userListView
+):
+    objectColumn = widget.get_object("objectPanel")
+    subjectColumn = widget.get_object("subjectPanel")
+    aclColumn = widget.get_object("userPanel")
+    activeSwitcherButton.clicked()
+    next(iter(widget.subject_list.get_action_buttons())).clicked()
+    children = widget.get_ref().get_children()[0].get_children()[1].get_children()
+    assert children == [objectColumn, subjectColumn, aclColumn]
+    assert len(objectListView.get_model()) == 3
+    assert len(subjectListView.get_model()) == 0
+
+    objectListView.get_selection().select_path(Gtk.TreePath.new_first())
+    assert len(subjectListView.get_model()) == 1
+    assert len(userListView.get_model()) == 1
+
+    # cycles back around to the users and groups
+    next(iter(widget.object_list.get_action_buttons())).clicked()
+    children = widget.get_ref().get_children()[0].get_children()[1].get_children()
+    assert children == [aclColumn, subjectColumn, objectColumn]
+    assert len(objectListView.get_model()) == 0
+
+
 @pytest.mark.parametrize(
     "view", [pytest.lazy_fixture("userListView"), pytest.lazy_fixture("groupListView")]
 )
@@ -380,6 +415,43 @@ def test_reloads_views_after_refresh(
     assert prev_selected_objects == cur_selected_objects
 
 
+def test_refreshes_syslog_in_background(mock_dispatch, mock_system_features, mocker):
+    init_store(mock_System())
+    widget = PolicyRulesAdminPage(use_syslog=True)
+    log = mock_log()
+    mock_system_features.on_next(
+        _build_state(
+            events={"log": log},
+            groups={"groups": mock_groups()},
+            users={"users": mock_users()},
+        )
+    )
+    mock_dispatch.reset_mock()
+
+    widget.on_refresh_clicked()
+    mock_dispatch.assert_any_call(
+        InstanceOf(Action) & Attrs(type=REFRESH_EVENTS, payload=log)
+    )
+    mock_dispatch.assert_not_any_call(InstanceOf(Action) & Attrs(type=REQUEST_EVENTS))
+    log.refresh.assert_not_called()
+
+    # the users and groups are loaded before the log is refreshed
+    mock_system_features.on_next(
+        _build_state(
+            events={"loading": True, "log": log, "percent_complete": -1},
+            groups={"groups": mock_groups()},
+            users={"users": mock_users()},
+        )
+    )
+    load_store = mocker.spy(widget.user_list, "load_store")
+    log.begin.reset_mock()
+
+    # the refreshed log is the same log, so the views are populated explicitly
+    mock_system_features.on_next(_build_state(events={"log": log}))
+    log.begin.assert_called()
+    load_store.assert_called()
+
+
 @pytest.mark.parametrize(
     "aclListView",
     [pytest.lazy_fixture("userListView"), pytest.lazy_fixture("groupListView")],
@@ -426,6 +498,7 @@ def test_handles_data_changed_after_refresh(
                     by_subject=lambda f: [e for e in new_events if e.subject.file == f],
                     by_user=lambda id: [e for e in new_events if e.uid == id],
                     by_group=lambda id: [e for e in new_events if e.gid == id],
+                    relations=lambda: mock_relations(new_events),
                 )
             },
             groups={"groups": mock_groups()},
@@ -677,6 +750,73 @@ def test_groups_loading_w_exception(mock_system_features, states, mock_dispatch)
     )
 
 
+def test_updates_log_trust(widget, mock_system_features, states):
+    log = states[0]["events"].log
+    log.trust_generation = 1
+
+    # not while trust is being loaded
+    system = MagicMock(trust_generation=2)
+    mock_system_features.on_next(
+        {
+            **states[0],
+            "system": MagicMock(system=system),
+            "system_trust": MagicMock(loading=True, trust=[]),
+        }
+    )
+    log.update_trust.assert_not_called()
+
+    mock_system_features.on_next({**states[0], "system": MagicMock(system=system)})
+    log.update_trust.assert_called_once_with(system)
+
+    # the same generation is not updated again
+    log.update_trust.reset_mock()
+    log.trust_generation = 2
+    mock_system_features.on_next({**states[0], "system": MagicMock(system=system)})
+    log.update_trust.assert_not_called()
+
+
+def _loading_events(state, percent_complete):
+    return {
+        **state,
+        "events": MagicMock(
+            loading=True, error=None, percent_complete=percent_complete, lines=10
+        ),
+    }
+
+
+def test_shows_events_progress(widget, mock_system_features, states):
+    progress_box = widget.get_object("eventsProgressBox")
+    progress_bar = widget.get_object("eventsProgressBar")
+    assert progress_box.get_visible() is False
+
+    widget.on_refresh_clicked()
+    mock_system_features.on_next(_loading_events(states[0], 50))
+    assert progress_box.get_visible() is True
+    assert progress_bar.get_fraction() == 0.5
+
+    mock_system_features.on_next(_build_state(events={"log": mock_log()}))
+    assert progress_box.get_visible() is False
+
+
+def test_cancels_events_load(widget, mock_dispatch, mock_system_features, states):
+    widget.on_refresh_clicked()
+    mock_system_features.on_next(_loading_events(states[0], 50))
+    widget.get_object("cancelEventsBtn").clicked()
+    mock_dispatch.assert_any_call(InstanceOf(Action) & Attrs(type=CANCEL_EVENTS))
+
+    # the cancelled load leaves the previous log in place
+    mock_system_features.on_next(
+        _build_state(
+            events={"log": states[0]["events"].log},
+            groups={"groups": mock_groups()},
+            users={"users": mock_users()},
+        )
+    )
+    assert widget.get_object("eventsProgressBox").get_visible() is False
+    view_stack = widget.user_list.get_object("viewStack")
+    assert view_stack.get_visible_child_name() == "treeView"
+
+
 def test_time_not_displayed(mocker, widget):
     time_display = widget.get_object("time_bar")
     assert time_display.get_visible() is False
@@ -722,5 +862,5 @@ def test_open_file_button_clicked(widget, mock_dispatch, mocker):
     on_click()
     mock_get_Filename.assert_called()
     mock_dispatch.assert_any_call(
-        InstanceOf(Action) & Attrs(type=REQUEST_EVENTS, payload=("debug", "foo"))
+        InstanceOf(Action) & Attrs(type=REQUEST_EVENTS, payload=("debug", "foo", None))
     )
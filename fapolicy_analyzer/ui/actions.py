@@ -17,7 +17,16 @@ from enum import Enum
 from itertools import count
 from typing import Any, Dict, Iterator, NamedTuple, Optional, Sequence
 
-from fapolicy_analyzer import Changeset, Event, Group, Rule, System, Trust, User
+from fapolicy_analyzer import (
+    Changeset,
+    Event,
+    EventLog,
+    Group,
+    Rule,
+    System,
+    Trust,
+    User,
+)
 from fapolicy_analyzer.redux import Action, create_action
 
 INIT_SYSTEM = "INIT_SYSTEM"
@@ -53,7 +62,11 @@ SYSTEM_DEPLOYED = "SYSTEM_DEPLOYED"
 ERROR_DEPLOYING_SYSTEM = "ERROR_DEPLOYING_SYSTEM"
 
 REQUEST_EVENTS = "REQUEST_EVENTS"
+REFRESH_EVENTS = "REFRESH_EVENTS"
+EVENTS_LOAD_STARTED = "EVENTS_LOAD_STARTED"
+RECEIVED_EVENTS_PROGRESS = "RECEIVED_EVENTS_PROGRESS"
 RECEIVED_EVENTS = "RECEIVED_EVENTS"
+CANCEL_EVENTS = "CANCEL_EVENTS"
 ERROR_EVENTS = "ERROR_EVENTS"
 
 REQUEST_USERS = "REQUEST_USERS"
@@ -209,14 +222,32 @@ def restore_system_checkpoint() -> Action:
     return _create_action(RESTORE_SYSTEM_CHECKPOINT)
 
 
-def request_events(log_type: str, file: str = None) -> Action:
-    return _create_action(REQUEST_EVENTS, (log_type, file))
+def request_events(log_type: str, file: str = None, start: int = None) -> Action:
+    return _create_action(REQUEST_EVENTS, (log_type, file, start))
+
+
+def refresh_events(log: EventLog) -> Action:
+    return _create_action(REFRESH_EVENTS, log)
+
+
+def events_load_started(total: int, timestamp: float) -> Action:
+    return _create_action(EVENTS_LOAD_STARTED, (total, timestamp))
+
+
+def received_events_progress(
+    bytes_read: int, lines: int, timestamp: float
+) -> Action:
+    return _create_action(RECEIVED_EVENTS_PROGRESS, (bytes_read, lines, timestamp))
 
 
 def received_events(events: Sequence[Event]) -> Action:
     return _create_action(RECEIVED_EVENTS, events)
 
 
+def cancel_events() -> Action:
+    return _create_action(CANCEL_EVENTS)
+
+
 def error_events(error: str) -> Action:
     return _create_action(ERROR_EVENTS, error)
 
@@ -21,6 +21,18 @@ from fapolicy_analyzer import System
 
 T = TypeVar("T", Dict[str, str], str)
 
+# seconds that the metadata of the paths in rules is reused between validations
+RULE_STAT_TTL = 5.0
+_rule_stat_cache = None
+
+
+def rule_stat_cache():
+    """The path metadata cache that rule changesets share while parsing"""
+    global _rule_stat_cache
+    if _rule_stat_cache is None:
+        _rule_stat_cache = fapolicy_analyzer.RuleStatCache(RULE_STAT_TTL)
+    return _rule_stat_cache
+
 
 class Changeset(ABC, Generic[T]):
     @abstractmethod
@@ -54,7 +66,7 @@ class RuleChangeset(Changeset[str]):
         self.__wrapped = fapolicy_analyzer.RuleChangeset()
 
     def parse(self, change: str):
-        self.__wrapped.parse(change)
+        self.__wrapped.parse(change, stat_cache=rule_stat_cache())
 
     def rules(self):
         return self.__wrapped.rules()
@@ -18,7 +18,7 @@ import time
 from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from threading import Event
-from typing import Callable, Dict, Sequence
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
 
 import gi
 from rx import of
@@ -30,6 +30,7 @@ from fapolicy_analyzer import (
     Trust,
     check_ancillary_trust,
     check_system_trust,
+    load_events,
     rollback_fapolicyd,
 )
 from fapolicy_analyzer.redux import (
@@ -42,7 +43,9 @@ from fapolicy_analyzer.redux import (
 )
 from fapolicy_analyzer.ui.actions import (
     APPLY_CHANGESETS,
+    CANCEL_EVENTS,
     DEPLOY_SYSTEM,
+    REFRESH_EVENTS,
     REQUEST_ANCILLARY_TRUST,
     REQUEST_EVENTS,
     REQUEST_GROUPS,
@@ -64,9 +67,11 @@ from fapolicy_analyzer.ui.actions import (
     error_rules_text,
     error_system_trust,
     error_users,
+    events_load_started,
     init_system,
     received_ancillary_trust_update,
     received_events,
+    received_events_progress,
     received_groups,
     received_rules,
     received_rules_text,
@@ -106,6 +111,10 @@ def create_system_feature(
 
     system_trust_checks: Dict[System, Event] = {}
     ancillary_trust_checks: Dict[System, Event] = {}
+    # the cancel flag and handle of the events load in progress
+    events_load: Optional[Tuple[Event, Any]] = None
+    # logs are refreshed one at a time, off of the UI thread
+    events_refresh = ThreadPoolExecutor(max_workers=1)
 
     def _init_system() -> Action:
         def execute_system():
@@ -273,15 +282,64 @@ def create_system_feature(
         rollback_fapolicyd(_system)
         return system_received(_system)
 
+    def _load_events_update(
+        bytes_read: int, lines: int, event: Event, timestamp: float
+    ):
+        if not event.is_set():
+            _idle_dispatch(received_events_progress(bytes_read, lines, timestamp))
+
+    def _load_events_complete(
+        log: Any, error: Optional[str], flag_fn: Callable[[], None], event: Event
+    ):
+        # a cancelled load completes without a log or an error
+        if not event.is_set():
+            if error:
+                _idle_dispatch(error_events(error))
+            elif log is not None:
+                _idle_dispatch(received_events(log))
+        flag_fn()
+
+    def _cancel_events(action: Action) -> Action:
+        nonlocal events_load
+        if events_load:
+            event, handle = events_load
+            event.set()
+            handle.cancel()
+            events_load = None
+        return action
+
     def _get_events(action: Action) -> Action:
-        log_type, file = action.payload
-        if log_type == "debug":
-            events = _system.load_debuglog(file)
-        elif log_type == "syslog":
-            events = _system.load_syslog()
-        else:
-            events = []
-        return received_events(events)
+        nonlocal events_load
+        log_type, file, start = action.payload
+        if log_type not in ("audit", "debug", "syslog"):
+            return received_events([])
+
+        # a new request replaces the load in progress
+        _cancel_events(action)
+
+        event = Event()
+        timestamp = time.time()
+
+        # done can be called before the handle is returned, so a finished load
+        # is flagged on its event rather than removed
+        update = partial(_load_events_update, event=event, timestamp=timestamp)
+        done = partial(_load_events_complete, flag_fn=event.set, event=event)
+        handle = load_events(_system, log_type, update, done, file=file, start=start)
+        events_load = (event, handle)
+        return events_load_started(handle.total, timestamp)
+
+    def _refresh_events(action: Action) -> Action:
+        log = action.payload
+
+        def execute_refresh():
+            try:
+                log.refresh()
+                _idle_dispatch(received_events(log))
+            except RuntimeError as e:
+                _idle_dispatch(error_events(str(e)))
+
+        events_refresh.submit(execute_refresh)
+        return action
 
     def _get_users(_: Action) -> Action:
         users = _system.users()
@@ -346,6 +404,18 @@ def create_system_feature(
         catch(lambda ex, source: of(error_events(str(ex)))),
     )
 
+    cancel_events_epic = pipe(
+        of_type(CANCEL_EVENTS),
+        map(_cancel_events),
+        filter(lambda a: a.type != CANCEL_EVENTS),
+    )
+
+    refresh_events_epic = pipe(
+        of_type(REFRESH_EVENTS),
+        map(_refresh_events),
+        filter(lambda a: a.type != REFRESH_EVENTS),
+    )
+
     request_users_epic = pipe(
         of_type(REQUEST_USERS),
         map(_get_users),
@@ -373,7 +443,9 @@ def create_system_feature(
     system_epic = combine_epics(
         init_epic,
         apply_changesets_epic,
+        cancel_events_epic,
         deploy_system_epic,
+        refresh_events_epic,
         request_ancillary_trust_epic,
         request_events_epic,
         request_groups_epic,
@@ -25,6 +25,8 @@ from fapolicy_analyzer.ui.acl_list import ACLList
 from fapolicy_analyzer.ui.actions import (
     NotificationType,
     add_notification,
+    cancel_events,
+    refresh_events,
     request_events,
     request_groups,
     request_users,
@@ -33,6 +35,7 @@ from fapolicy_analyzer.ui.file_chooser_dialog import FileChooserDialog
 from fapolicy_analyzer.ui.object_list import ObjectList
 from fapolicy_analyzer.ui.store import dispatch, get_system_feature
 from fapolicy_analyzer.ui.strings import (
+    EVENTS_LOADING_PROGRESS,
     GET_GROUPS_LOG_ERROR_MSG,
     GET_USERS_ERROR_MSG,
     GROUP_LABEL,
@@ -113,11 +116,15 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         self.__n_changesets = 0
 
         self.__log: Optional[Sequence[EventLog]] = None
+        self.__relations = None
         self.__events_loading = False
+        self.__events_refreshing = False
+        self.__events_percent = -1
         self.__users: Sequence[User] = []
         self.__users_loading = False
         self.__groups: Sequence[Group] = []
         self.__groups_loading = False
+        self.__object_first = False
         self.__system_trust: Sequence[Trust] = []
         self.__ancillary_trust: Sequence[Trust] = []
         self.__selection_state = {
@@ -141,11 +148,6 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
 
         object_tabs = self.get_object("objectTabs")
         self.object_list = ObjectList()
-        self.object_list.file_selection_changed += partial(
-            self.on_file_selection_changed,
-            type="objects",
-            details_widget_name="objectDetails",
-        )
         object_tabs.append_page(self.object_list.get_ref(), Gtk.Label(label="Object"))
 
         self.get_object("delayDisplay").set_text("1 Hour")
@@ -203,23 +205,49 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
                     ),
                 ),
             ),
+            self.Switcher(
+                self.get_object("objectPanel"),
+                self.__populate_objects_first,
+                (
+                    self.object_list,
+                    "file_selection_changed",
+                    partial(
+                        self.on_file_selection_changed,
+                        type="objects",
+                        details_widget_name="objectDetails",
+                        secondary_action=self.__populate_from_object,
+                    ),
+                    partial(
+                        self.on_file_selection_changed,
+                        type="objects",
+                        details_widget_name="objectDetails",
+                    ),
+                ),
+            ),
         ]
         for s in self.__switchers:
             s.buttonClicked += self.on_switcher_button_clicked
 
         self.__refresh()
 
-    def __refresh(self):
+    def __refresh(self, reload_events=True):
         self.__users_loading = True
         self.__groups_loading = True
         dispatch(request_users())
         dispatch(request_groups())
-        if self.__use_syslog:
+        if self.__use_syslog and self.__log and not reload_events:
+            # only the lines appended to the syslog since the last read are parsed
             self.__events_loading = True
-            dispatch(request_events("syslog"))
+            self.__events_refreshing = True
+            dispatch(refresh_events(self.__log))
+        elif self.__use_syslog:
+            self.__events_loading = True
+            self.__events_percent = -1
+            dispatch(request_events("syslog", start=self.__window_start()))
             self.get_object("time_bar").set_visible(True)
         elif self.__audit_file:
             self.__events_loading = True
+            self.__events_percent = -1
             dispatch(request_events("debug", self.__audit_file))
 
     def __populate_list(
@@ -295,13 +323,9 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         if self.__is_any_data_loading() or not self.__log:
             return
 
-        users = users or list(
-            {
-                e.uid: {"id": u.id, "name": u.name}
-                for u in self.__users
-                for e in self.__log.by_user(u.id)
-            }.values()
-        )
+        if not users:
+            uids = set(self.__relations.users())
+            users = [{"id": u.id, "name": u.name} for u in self.__users if u.id in uids]
         self.__populate_list(
             self.user_list,
             users,
@@ -310,13 +334,11 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
             self.user_list.get_selected_row_by_acl_id,
         )
 
-        groups = groups or list(
-            {
-                e.gid: {"id": g.id, "name": g.name}
-                for g in self.__groups
-                for e in self.__log.by_group(g.id)
-            }.values()
-        )
+        if not groups:
+            gids = set(self.__relations.groups())
+            groups = [
+                {"id": g.id, "name": g.name} for g in self.__groups if g.id in gids
+            ]
         self.__populate_list(
             self.group_list,
             groups,
@@ -332,22 +354,10 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
             return
 
         last_selection = self.__selection_state["subjects"][-1]
-        users = list(
-            {
-                e.uid: {"id": u.id, "name": u.name}
-                for e in self.__log.by_subject(last_selection)
-                for u in self.__users
-                if e.uid == u.id
-            }.values()
-        )
-        groups = list(
-            {
-                e.gid: {"id": g.id, "name": g.name}
-                for e in self.__log.by_subject(last_selection)
-                for g in self.__groups
-                if e.gid == g.id
-            }.values()
-        )
+        uids = {uid for uid, _ in self.__relations.users_by_subject(last_selection)}
+        users = [{"id": u.id, "name": u.name} for u in self.__users if u.id in uids]
+        gids = {gid for gid, _ in self.__relations.groups_by_subject(last_selection)}
+        groups = [{"id": g.id, "name": g.name} for g in self.__groups if g.id in gids]
 
         self.__populate_acls(users=users, groups=groups)
 
@@ -355,13 +365,7 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         if self.__users_loading or self.__groups_loading or not self.__log:
             return
 
-        subjects = subjects or list(
-            {
-                e.subject.file: e.subject
-                for s in self.__log.subjects()
-                for e in self.__log.by_subject(s)
-            }.values()
-        )
+        subjects = subjects or self.__relations.subjects()
         self.__populate_list(
             self.subject_list,
             subjects,
@@ -380,37 +384,67 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
             self.__populate_list(self.subject_list, [], "subjects")
             return
 
-        subjects = list(
-            {
-                e.subject.file: e.subject
-                for e in (
-                    self.__log.by_user(self.__selection_state["user"])
-                    if self.__selection_state["user"] is not None
-                    else self.__log.by_group(self.__selection_state["group"])
-                    if self.__selection_state["group"] is not None
-                    else []
-                )
-            }.values()
+        subjects = (
+            self.__relations.subjects_by_user(self.__selection_state["user"])
+            if self.__selection_state["user"] is not None
+            else self.__relations.subjects_by_group(self.__selection_state["group"])
         )
         self.__populate_subjects(subjects=subjects)
 
+    def __populate_from_object(self):
+        if not self.__selection_state["objects"]:
+            self.__populate_list(self.subject_list, [], "subjects")
+            self.__populate_list(self.user_list, [], "user")
+            self.__populate_list(self.group_list, [], "group")
+            return
+
+        last_selection = self.__selection_state["objects"][-1]
+        self.__populate_subjects(
+            subjects=self.__relations.subjects_by_object(last_selection)
+        )
+        uids = {uid for uid, _ in self.__relations.users_by_object(last_selection)}
+        users = [{"id": u.id, "name": u.name} for u in self.__users if u.id in uids]
+        gids = {gid for gid, _ in self.__relations.groups_by_object(last_selection)}
+        groups = [{"id": g.id, "name": g.name} for g in self.__groups if g.id in gids]
+
+        self.__populate_acls(users=users, groups=groups)
+
+    def __populate_objects_first(self):
+        if self.__is_any_data_loading() or not self.__log:
+            return
+
+        data = [{rule_id: o} for rule_id, o in self.__relations.objects()]
+        self.__populate_list(
+            self.object_list,
+            data,
+            "objects",
+            True,
+            self.object_list.get_selected_row_by_file,
+            systemTrust=self.__system_trust,
+            ancillaryTrust=self.__ancillary_trust,
+        )
+
     def __populate_objects(self):
+        # objects are the primary list when viewing from the object first
+        if self.__object_first:
+            return
+
         if self.__selection_state["subjects"] and (
             self.__selection_state["user"] is not None
             or self.__selection_state["group"] is not None
         ):
             last_subject = self.__selection_state["subjects"][-1]
-            self.when_none = any(
-                [e.when() is None for e in self.__log.by_subject(last_subject)]
-            )
-            data = list(
-                {
-                    e.object.file: {e.rule_id: e.object}
-                    for e in self.__log.by_subject(last_subject)
-                    if e.uid == self.__selection_state["user"]
-                    or e.gid == self.__selection_state["group"]
-                }.values()
+            self.when_none = self.__relations.untimed(last_subject)
+            objects = (
+                self.__relations.objects_by_user(
+                    last_subject, self.__selection_state["user"]
+                )
+                if self.__selection_state["user"] is not None
+                else self.__relations.objects_by_group(
+                    last_subject, self.__selection_state["group"]
+                )
             )
+            data = [{rule_id: o} for rule_id, o in objects]
 
             self.__populate_list(
                 self.object_list,
@@ -424,6 +458,44 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         else:
             self.__populate_list(self.object_list, [], "objects")
 
+    def __update_trust(self, systemState) -> bool:
+        system = systemState.system if systemState else None
+        if not self.__log or not system:
+            return False
+        if self.__log.trust_generation == system.trust_generation:
+            return False
+        self.__log.update_trust(system)
+        return True
+
+    def __update_events_progress(self, eventsState):
+        # the progress is shown from the start of a load until it completes
+        percent = (
+            eventsState.percent_complete
+            if self.__events_loading and eventsState.loading
+            else -1
+        )
+        if percent == self.__events_percent:
+            return
+
+        self.__events_percent = percent
+        self.get_object("eventsProgressBox").set_visible(percent >= 0)
+        if percent >= 0:
+            progress_bar = self.get_object("eventsProgressBar")
+            progress_bar.set_fraction(percent / 100)
+            progress_bar.set_text(
+                EVENTS_LOADING_PROGRESS.format(lines=eventsState.lines)
+            )
+
+    def __window_start(self) -> int:
+        # syslog timestamps are compared as local time
+        tzdelta = int(time.localtime().tm_gmtoff)
+        delay = 3600 if self._time_delay < 0 else self._time_delay
+        return int(time.time()) + tzdelta - delay
+
+    def __apply_time_window(self):
+        self.__log.begin(self.__window_start())
+        self.__relations = self.__log.relations()
+
     def __get_audit_file(self) -> Optional[str]:
         fcd = FileChooserDialog(
             title=OPEN_FILE_LABEL,
@@ -445,13 +517,18 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         eventsState = system.get("events")
         groupState = system.get("groups")
         userState = system.get("users")
+        systemState = system.get("system")
 
         # these should already be loaded in state from the initial DB Admin Tool load
         self.__system_trust = system.get("system_trust").trust
         self.__ancillary_trust = system.get("ancillary_trust").trust
+        trust_loading = (
+            system.get("system_trust").loading or system.get("ancillary_trust").loading
+        )
 
         if eventsState.error and not eventsState.loading and self.__events_loading:
             self.__events_loading = False
+            self.__events_refreshing = False
             dispatch(
                 add_notification(
                     PARSE_EVENT_LOG_ERROR_MSG,
@@ -461,16 +538,15 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         elif (
             self.__events_loading
             and not eventsState.loading
-            and self.__log != eventsState.log
+            and (self.__events_refreshing or self.__log != eventsState.log)
         ):
+            # a refreshed log is the same log with the appended events
             self.__events_loading = False
+            self.__events_refreshing = False
             self.__log = eventsState.log
-            tzdelta = int(time.localtime().tm_gmtoff)
-            if self._time_delay < 0:
-                self.__log.begin(int(time.time()) + tzdelta - 3600)
-            else:
-                self.__log.begin(int(time.time()) + tzdelta - self._time_delay)
+            self.__apply_time_window()
             exec_primary_data_func()
+        self.__update_events_progress(eventsState)
 
         if userState.error and not userState.loading and self.__users_loading:
             self.__users_loading = False
@@ -506,6 +582,11 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
             self.__groups = groupState.groups
             exec_primary_data_func()
 
+        # the trust of the log follows that of the system, which changes as trust
+        # is checked and merged and as changesets are applied
+        if not trust_loading and self.__update_trust(systemState):
+            exec_primary_data_func()
+
         self.user_list.set_loading(
             self.__events_loading or self.__users_loading or self.__groups_loading
         )
@@ -554,10 +635,24 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
             secondary_action()
 
     def on_switcher_button_clicked(self, switcher):
-        switcher.set_as_secondary()
-        rest = [x for x in self.__switchers if x != switcher]
-        for s in rest:
-            s.set_as_primary()
+        # the primary panel cycles from users, to subjects, to objects
+        idx = self.__switchers.index(switcher)
+        primary = self.__switchers[(idx + 1) % len(self.__switchers)]
+        for s in self.__switchers:
+            if s != primary:
+                s.set_as_secondary()
+        self.__object_first = primary == self.__switchers[-1]
+        primary.set_as_primary()
+
+        # objects lead to their subjects and then to the users and groups
+        order = (
+            self.__switchers[::-1]
+            if self.__object_first
+            else [primary, *[s for s in self.__switchers if s != primary]]
+        )
+        for position, s in enumerate(order):
+            s.set_position(position)
+
         self.__selection_state = dict.fromkeys(self.__selection_state, None)
         self.__populate_objects()
 
@@ -568,7 +663,13 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
             self.group_list.unselect_all_rows()
 
     def on_refresh_clicked(self, *args):
-        self.__refresh()
+        self.__refresh(reload_events=False)
+
+    def on_cancelEventsBtn_clicked(self, *args):
+        # the events already shown are kept when a load is cancelled
+        self.__events_loading = False
+        self.__events_refreshing = False
+        dispatch(cancel_events())
 
     def on_timeSelectBtn_clicked(self, *args):
         def plural(count):
@@ -646,9 +747,12 @@ class PolicyRulesAdminPage(UIConnectedWidget, UIPage):
         def get_is_primary(self):
             return self.__primary
 
+        def set_position(self, position):
+            self.__panel.get_parent().reorder_child(self.__panel, position)
+
         def set_as_primary(self):
             self.__primary = True
-            self.__panel.get_parent().reorder_child(self.__panel, 0)
+            self.set_position(0)
             for x in self.__lists:
                 lst = x["list"]
                 lst.set_action_buttons(*lst.get_action_buttons(), x["button"])
@@ -13,10 +13,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from typing import Any, NamedTuple, Optional, Sequence, cast
+from typing import Any, NamedTuple, Optional, Sequence, Tuple, cast
 
 from fapolicy_analyzer import EventLog
-from fapolicy_analyzer.ui.actions import ERROR_EVENTS, RECEIVED_EVENTS, REQUEST_EVENTS
+from fapolicy_analyzer.ui.actions import (
+    CANCEL_EVENTS,
+    ERROR_EVENTS,
+    EVENTS_LOAD_STARTED,
+    RECEIVED_EVENTS,
+    RECEIVED_EVENTS_PROGRESS,
+    REFRESH_EVENTS,
+    REQUEST_EVENTS,
+)
 from fapolicy_analyzer.redux import Action, Reducer, handle_actions
 
 
@@ -24,6 +32,10 @@ class EventState(NamedTuple):
     error: Optional[str]
     loading: bool
     log: Sequence[EventLog]
+    percent_complete: float = -1
+    lines: int = 0
+    total: int = 0
+    timestamp: float = 0
 
 
 def _create_state(state: EventState, **kwargs: Optional[Any]) -> EventState:
@@ -31,7 +43,33 @@ def _create_state(state: EventState, **kwargs: Optional[Any]) -> EventState:
 
 
 def handle_request_events(state: EventState, action: Action) -> EventState:
-    return _create_state(state, loading=True, error=None)
+    return _create_state(state, loading=True, percent_complete=-1, error=None)
+
+
+def handle_events_load_started(state: EventState, action: Action) -> EventState:
+    total, timestamp = cast(Tuple[int, float], action.payload)
+    if timestamp < state.timestamp:
+        return state
+
+    return _create_state(
+        state,
+        loading=True,
+        percent_complete=0,
+        lines=0,
+        total=total,
+        error=None,
+        timestamp=timestamp,
+    )
+
+
+def handle_received_events_progress(state: EventState, action: Action) -> EventState:
+    bytes_read, lines, timestamp = cast(Tuple[int, int, float], action.payload)
+    if timestamp < state.timestamp:
+        return state
+
+    # a log that grew after the load started can read past the total
+    percent_complete = min(bytes_read / state.total * 100, 100) if state.total else -1
+    return _create_state(state, percent_complete=percent_complete, lines=lines)
 
 
 def handle_received_events(state: EventState, action: Action) -> EventState:
@@ -39,6 +77,10 @@ def handle_received_events(state: EventState, action: Action) -> EventState:
     return _create_state(state, log=payload, error=None, loading=False)
 
 
+def handle_cancel_events(state: EventState, _: Action) -> EventState:
+    return _create_state(state, loading=False, percent_complete=-1)
+
+
 def handle_error_events(state: EventState, action: Action) -> EventState:
     payload = cast(str, action.payload)
     return _create_state(state, error=payload, loading=False)
@@ -47,7 +89,11 @@ def handle_error_events(state: EventState, action: Action) -> EventState:
 event_reducer: Reducer = handle_actions(
     {
         REQUEST_EVENTS: handle_request_events,
+        REFRESH_EVENTS: handle_request_events,
+        EVENTS_LOAD_STARTED: handle_events_load_started,
+        RECEIVED_EVENTS_PROGRESS: handle_received_events_progress,
         RECEIVED_EVENTS: handle_received_events,
+        CANCEL_EVENTS: handle_cancel_events,
         ERROR_EVENTS: handle_error_events,
     },
     EventState(error=None, log=None, loading=False),
@@ -138,6 +138,7 @@ AUTOSAVE_RESTORE_ERROR_MSG = _(
 )
 
 LOADER_MESSAGE = _("Loading...")
+EVENTS_LOADING_PROGRESS = _("Parsed {lines} lines")
 
 FILE_LABEL = _("file")
 FILES_LABEL = _("files")